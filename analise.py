@@ -0,0 +1,238 @@
+from datetime import datetime, timedelta
+
+import database as db
+
+# =============================================================================
+# ANÁLISE DE UTILIZAÇÃO E RENTABILIDADE DA FROTA
+# =============================================================================
+# Tudo é calculado em SQL, sem trazer as linhas de aluguel para o Python.
+# Para um período [data_inicio, data_fim] (datas inclusivas, 'AAAA-MM-DD'):
+#   dias_alugados     = dias de aluguel dentro do período (aluguéis ativos contam até agora)
+#   dias_manutencao   = dias parados em manutenção dentro do período
+#   dias_disponiveis  = dias do período - dias_manutencao
+#   utilizacao        = dias_alugados / dias_disponiveis
+#   receita           = soma de valor_total dos aluguéis devolvidos no período
+#   custo_manutencao  = soma de custo das manutenções iniciadas no período
+#   margem            = receita - custo_manutencao
+
+# Intervalos de aluguel e manutenção recortados ao período, por placa. As
+# varreduras usam os índices de cobertura de database.INDICES_ANALISE: ler
+# pelo índice de data_retirada obrigaria a buscar cada linha na tabela.
+# {alugueis} e {manutencoes} são trocados por db.fonte_com_arquivo(), que
+# inclui as partições de arquivo com registros no período.
+_CTE_INTERVALOS = """
+    WITH periodo AS (
+        SELECT julianday(:inicio) AS ini, julianday(:fim_exclusivo) AS fim,
+               julianday('now', 'localtime') AS agora
+    ),
+    uso AS (
+        SELECT a.placa_carro AS placa,
+               SUM(MAX(0, MIN(p.fim, COALESCE(julianday(a.data_devolucao), p.agora))
+                          - MAX(p.ini, julianday(a.data_retirada)))) AS dias_alugados,
+               SUM(CASE WHEN a.data_devolucao >= :inicio AND a.data_devolucao < :fim_exclusivo
+                        THEN a.valor_total ELSE 0 END) AS receita
+        FROM {alugueis}, periodo p
+        WHERE a.data_retirada < :fim_exclusivo
+          AND (a.data_devolucao IS NULL OR a.data_devolucao >= :inicio)
+        GROUP BY a.placa_carro
+    ),
+    parada AS (
+        SELECT m.placa_carro AS placa,
+               SUM(MAX(0, MIN(p.fim, COALESCE(julianday(m.data_saida), p.agora))
+                          - MAX(p.ini, julianday(m.data_entrada)))) AS dias_manutencao,
+               SUM(CASE WHEN m.data_entrada >= :inicio THEN m.custo ELSE 0 END) AS custo_manutencao
+        FROM {manutencoes}, periodo p
+        WHERE m.data_entrada < :fim_exclusivo
+          AND (m.data_saida IS NULL OR m.data_saida >= :inicio)
+        GROUP BY m.placa_carro
+    ),
+    por_veiculo AS (
+        SELECT v.placa, v.marca, v.modelo,
+               COALESCE(u.dias_alugados, 0) AS dias_alugados,
+               COALESCE(pa.dias_manutencao, 0) AS dias_manutencao,
+               (p.fim - p.ini) - COALESCE(pa.dias_manutencao, 0) AS dias_disponiveis,
+               COALESCE(u.receita, 0) AS receita,
+               COALESCE(pa.custo_manutencao, 0) AS custo_manutencao
+        FROM veiculos v
+        CROSS JOIN periodo p
+        LEFT JOIN uso u ON u.placa = v.placa
+        LEFT JOIN parada pa ON pa.placa = v.placa
+    )
+"""
+
+_CONSULTA_POR_VEICULO = _CTE_INTERVALOS + """
+    SELECT placa, marca, modelo,
+           ROUND(dias_alugados, 2) AS dias_alugados,
+           ROUND(dias_disponiveis, 2) AS dias_disponiveis,
+           ROUND(dias_alugados / NULLIF(dias_disponiveis, 0), 4) AS utilizacao,
+           receita, custo_manutencao, receita - custo_manutencao AS margem
+    FROM por_veiculo
+    ORDER BY margem DESC
+"""
+
+_CONSULTA_POR_MARCA = _CTE_INTERVALOS + """
+    SELECT marca, COUNT(*) AS qtd_veiculos,
+           ROUND(SUM(dias_alugados), 2) AS dias_alugados,
+           ROUND(SUM(dias_disponiveis), 2) AS dias_disponiveis,
+           ROUND(SUM(dias_alugados) / NULLIF(SUM(dias_disponiveis), 0), 4) AS utilizacao,
+           SUM(receita) AS receita, SUM(custo_manutencao) AS custo_manutencao,
+           SUM(receita) - SUM(custo_manutencao) AS margem
+    FROM por_veiculo
+    GROUP BY marca COLLATE NOCASE
+    ORDER BY margem DESC
+"""
+
+# Visão mensal
+# -----------------------------------------------------------------------------
+# Agrupar cada intervalo pelo mês exigiria ordenar todas as linhas do período.
+# Em vez disso usamos, por mês, apenas varreduras de faixa nos índices de data
+# (quantos intervalos começam/terminam no mês e a soma dos instantes), e
+# acumulamos mês a mês. Com G(t) = Σ fim[fim < t] + t·(intervalos abertos em t)
+# - Σ ini[ini < t], os dias ocupados entre dois instantes são G(t2) - G(t1).
+# Os instantes são medidos em dias a partir do início do período.
+
+# (tabela, coluna de início, coluna de fim, status em aberto, coluna de valor, valor pertence ao início?)
+_INTERVALOS_MENSAIS = {
+    "alugado": ("alugueis", "data_retirada", "data_devolucao", "Ativo", "valor_total", False),
+    "manutencao": ("manutencoes", "data_entrada", "data_saida", "Em Andamento", "custo", True),
+}
+
+# Colunas e índice de cobertura de cada tabela nas consultas da análise.
+_FONTES_ANALISE = {
+    "alugueis": ("placa_carro, data_retirada, data_devolucao, valor_total", "idx_alugueis_analise"),
+    "manutencoes": ("placa_carro, data_entrada, data_saida, custo", "idx_manutencoes_analise"),
+}
+
+def _fonte(cursor, tabela, data_inicio, fim_exclusivo, indice=True, apelido=None):
+    colunas, nome_indice = _FONTES_ANALISE[tabela]
+    return db.fonte_com_arquivo(cursor, tabela, "intervalo", data_inicio, fim_exclusivo,
+                                colunas=colunas, indice=nome_indice if indice else None, apelido=apelido)
+
+def _meses_do_periodo(data_inicio, fim_exclusivo):
+    """Lista (mes 'AAAA-MM', inicio, fim_exclusivo) recortados ao período."""
+    meses = []
+    atual = data_inicio
+    while atual < fim_exclusivo:
+        ano, mes = int(atual[:4]), int(atual[5:7])
+        proximo = f"{ano + mes // 12:04d}-{mes % 12 + 1:02d}-01"
+        meses.append((atual[:7], atual, min(proximo, fim_exclusivo)))
+        atual = proximo
+    return meses
+
+def _dias_por_mes(cursor, tipo, data_inicio, meses):
+    """Retorna ([dias ocupados por mês], [valor por mês]) para aluguéis ou manutenções."""
+    tabela_principal, col_ini, col_fim, status_aberto, col_valor, valor_no_inicio = _INTERVALOS_MENSAIS[tipo]
+    # As varreduras por faixa de data usam os índices de cada coluna, não o de cobertura por placa
+    tabela = _fonte(cursor, tabela_principal, data_inicio, meses[-1][2], indice=False)
+    ref = {"ref": data_inicio}
+
+    def instante(data):
+        return cursor.execute("SELECT julianday(:d) - julianday(:ref)", {**ref, "d": data}).fetchone()[0]
+
+    # Intervalos que já estavam abertos no início do período
+    abertos = cursor.execute(
+        f"SELECT COUNT(*) FROM {tabela} WHERE {col_fim} >= :ini AND {col_ini} < :ini",
+        {"ini": data_inicio}
+    ).fetchone()[0]
+    # Intervalos ainda em aberto terminam "agora"
+    agora = cursor.execute("SELECT strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')").fetchone()[0]
+    em_aberto = cursor.execute(
+        f"SELECT {col_ini} FROM {tabela_principal} WHERE status = ? AND {col_fim} IS NULL", (status_aberto,)
+    ).fetchall()
+    abertos += sum(1 for (ini,) in em_aberto if ini < data_inicio)
+    qtd_terminam_agora = sum(1 for (ini,) in em_aberto if ini <= agora)
+
+    dias, valores = [], []
+    soma_fim = soma_ini = 0.0
+    qtd_abertos = abertos
+    g_anterior = 0.0
+    for _, inicio_mes, fim_mes in meses:
+        qtd_ini, total_ini, valor_ini = cursor.execute(
+            f"SELECT COUNT(*), TOTAL(julianday({col_ini}) - julianday(:ref)), TOTAL({col_valor}) "
+            f"FROM {tabela} WHERE {col_ini} >= :a AND {col_ini} < :b",
+            {**ref, "a": inicio_mes, "b": fim_mes}
+        ).fetchone()
+        qtd_fim, total_fim, valor_fim = cursor.execute(
+            f"SELECT COUNT(*), TOTAL(julianday({col_fim}) - julianday(:ref)), TOTAL({col_valor}) "
+            f"FROM {tabela} WHERE {col_fim} >= :a AND {col_fim} < :b",
+            {**ref, "a": inicio_mes, "b": fim_mes}
+        ).fetchone()
+        if inicio_mes <= agora < fim_mes and qtd_terminam_agora:
+            qtd_fim += qtd_terminam_agora
+            total_fim += qtd_terminam_agora * instante(agora)
+
+        soma_ini += total_ini
+        soma_fim += total_fim
+        qtd_abertos += qtd_ini - qtd_fim
+        g_atual = soma_fim + instante(fim_mes) * qtd_abertos - soma_ini
+        dias.append(g_atual - g_anterior)
+        g_anterior = g_atual
+        valores.append(valor_ini if valor_no_inicio else valor_fim)
+    return dias, valores
+
+def _analisar_por_mes(cursor, data_inicio, fim_exclusivo):
+    meses = _meses_do_periodo(data_inicio, fim_exclusivo)
+    dias_alugados, receitas = _dias_por_mes(cursor, "alugado", data_inicio, meses)
+    dias_manutencao, custos = _dias_por_mes(cursor, "manutencao", data_inicio, meses)
+    qtd_veiculos = cursor.execute("SELECT COUNT(*) FROM veiculos").fetchone()[0]
+
+    linhas = []
+    for i, (mes, inicio_mes, fim_mes) in enumerate(meses):
+        dias_no_mes = cursor.execute("SELECT julianday(?) - julianday(?)", (fim_mes, inicio_mes)).fetchone()[0]
+        dias_disponiveis = qtd_veiculos * dias_no_mes - dias_manutencao[i]
+        linhas.append({
+            "mes": mes,
+            "dias_alugados": round(dias_alugados[i], 2),
+            "dias_disponiveis": round(dias_disponiveis, 2),
+            "utilizacao": round(dias_alugados[i] / dias_disponiveis, 4) if dias_disponiveis else None,
+            "receita": receitas[i],
+            "custo_manutencao": custos[i],
+            "margem": receitas[i] - custos[i],
+        })
+    return linhas
+
+VISOES = {
+    "veiculo": _CONSULTA_POR_VEICULO,
+    "marca": _CONSULTA_POR_MARCA,
+    "mes": _analisar_por_mes,
+}
+
+def analisar_frota(data_inicio, data_fim, visao="veiculo"):
+    """Calcula utilização, receita, custo de manutenção e margem da frota.
+
+    `visao` pode ser 'veiculo', 'marca' ou 'mes'. Retorna (True, linhas) ou
+    (False, [mensagem]), como calcular_faturamento_periodo.
+    """
+    try:
+        inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+        fim = datetime.strptime(data_fim, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return (False, ["Formato de data inválido. Use 'AAAA-MM-DD'."])
+    if fim < inicio:
+        return (False, ["A data de fim deve ser igual ou posterior à data de início."])
+    if visao not in VISOES:
+        return (False, [f"Visão de análise desconhecida: '{visao}'."])
+
+    conn, cursor = db.conectar_leitura()
+    try:
+        fim_exclusivo = (fim + timedelta(days=1)).strftime('%Y-%m-%d')
+        consulta = VISOES[visao]
+        if callable(consulta):
+            return (True, consulta(cursor, data_inicio, fim_exclusivo))
+        consulta = consulta.format(alugueis=_fonte(cursor, "alugueis", data_inicio, fim_exclusivo, apelido="a"),
+                                   manutencoes=_fonte(cursor, "manutencoes", data_inicio, fim_exclusivo, apelido="m"))
+        cursor.execute(consulta, {"inicio": data_inicio, "fim_exclusivo": fim_exclusivo})
+        return (True, [dict(row) for row in cursor.fetchall()])
+    except Exception as e:
+        return (False, [f"Erro ao analisar a frota: {e}"])
+    finally:
+        conn.close()
+
+def utilizacao_por_veiculo(data_inicio, data_fim):
+    return analisar_frota(data_inicio, data_fim, "veiculo")
+
+def utilizacao_por_marca(data_inicio, data_fim):
+    return analisar_frota(data_inicio, data_fim, "marca")
+
+def utilizacao_por_mes(data_inicio, data_fim):
+    return analisar_frota(data_inicio, data_fim, "mes")
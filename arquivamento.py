@@ -0,0 +1,181 @@
+import sys
+from datetime import datetime, timedelta
+
+import database as db
+
+# =============================================================================
+# ARQUIVAMENTO DE ALUGUÉIS E MANUTENÇÕES ENCERRADOS
+# =============================================================================
+# Move os registros encerrados há mais de `dias_manter` dias para tabelas
+# anuais (alugueis_arquivo_AAAA, manutencoes_arquivo_AAAA), separadas pelo
+# ano da data de início. Cada lote é uma transação: as linhas são copiadas
+# para a partição, a faixa de datas da partição é atualizada em
+# particoes_arquivo e só então apagadas da tabela principal. Se o processo
+# for interrompido, os lotes já confirmados ficam arquivados e os demais
+# continuam na tabela principal.
+#
+# Uso: python arquivamento.py [dias_manter] [--compactar]
+
+DIAS_MANTER_PADRAO = 365
+TAMANHO_LOTE_PADRAO = 5000
+CACHE_ARQUIVAMENTO_KB = 64 * 1024
+
+# Colunas das partições: as mesmas da tabela principal, sem AUTOINCREMENT
+# (o id é copiado da tabela principal, que nunca reaproveita ids).
+_DDL_PARTICAO = {
+    "alugueis": """
+        CREATE TABLE IF NOT EXISTS {nome} (
+            id INTEGER PRIMARY KEY,
+            placa_carro TEXT NOT NULL,
+            cpf_cliente TEXT NOT NULL,
+            data_retirada TEXT NOT NULL,
+            data_devolucao TEXT,
+            valor_total REAL,
+            status TEXT NOT NULL,
+            data_prevista TEXT
+        );
+    """,
+    "manutencoes": """
+        CREATE TABLE IF NOT EXISTS {nome} (
+            id INTEGER PRIMARY KEY,
+            placa_carro TEXT NOT NULL,
+            data_entrada TEXT NOT NULL,
+            data_saida TEXT,
+            descricao TEXT NOT NULL,
+            custo REAL NOT NULL,
+            status TEXT NOT NULL,
+            plano_id INTEGER
+        );
+    """,
+}
+
+# Os mesmos índices que as consultas de histórico, faturamento e análise usam
+# na tabela principal.
+_INDICES_PARTICAO = {
+    "alugueis": (
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_retirada ON {nome} (data_retirada)",
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_cpf_retirada ON {nome} (cpf_cliente, data_retirada)",
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_analise ON {nome} (placa_carro, data_retirada, data_devolucao, valor_total)",
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_devolucao ON {nome} (data_devolucao, data_retirada, valor_total)",
+    ),
+    "manutencoes": (
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_analise ON {nome} (placa_carro, data_entrada, data_saida, custo)",
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_entrada ON {nome} (data_entrada, custo)",
+        "CREATE INDEX IF NOT EXISTS idx_{nome}_saida ON {nome} (data_saida, data_entrada)",
+    ),
+}
+
+def nome_particao(tabela, ano):
+    return f"{tabela}_arquivo_{int(ano)}"
+
+def _garantir_particao(cursor, tabela, ano):
+    nome = nome_particao(tabela, ano)
+    cursor.execute(_DDL_PARTICAO[tabela].format(nome=nome))
+    for indice in _INDICES_PARTICAO[tabela]:
+        cursor.execute(indice.format(nome=nome))
+    cursor.execute(
+        "INSERT OR IGNORE INTO particoes_arquivo (tabela_origem, ano, nome) VALUES (?, ?, ?)",
+        (tabela, int(ano), nome)
+    )
+    return nome
+
+def _arquivar_lote(conn, cursor, tabela, data_corte, tamanho_lote):
+    """Arquiva até `tamanho_lote` linhas encerradas antes de data_corte; retorna quantas."""
+    col_inicio, col_fim, status_encerrado, colunas = db.TABELAS_ARQUIVAVEIS[tabela]
+    cursor.execute("DELETE FROM temp.lote_arquivo")
+    cursor.execute(
+        f"INSERT INTO temp.lote_arquivo (id, ano) "
+        f"SELECT id, CAST(substr({col_inicio}, 1, 4) AS INTEGER) FROM {tabela} "
+        f"WHERE {col_fim} < ? AND status = ? LIMIT ?",
+        (data_corte, status_encerrado, tamanho_lote)
+    )
+    qtd = cursor.rowcount
+    if qtd <= 0:
+        return 0
+
+    cursor.execute("SELECT DISTINCT ano FROM temp.lote_arquivo")
+    for (ano,) in cursor.fetchall():
+        nome = _garantir_particao(cursor, tabela, ano)
+        cursor.execute(
+            f"INSERT INTO {nome} ({colunas}) SELECT {colunas} FROM {tabela} "
+            f"WHERE id IN (SELECT id FROM temp.lote_arquivo WHERE ano = ?)",
+            (ano,)
+        )
+        # Estende a faixa de datas da partição com a do lote
+        cursor.execute(f"""
+            UPDATE particoes_arquivo SET
+                qtd = qtd + lote.lote_qtd,
+                inicio_min = MIN(COALESCE(inicio_min, lote.lote_inicio_min), lote.lote_inicio_min),
+                inicio_max = MAX(COALESCE(inicio_max, lote.lote_inicio_max), lote.lote_inicio_max),
+                fim_min = MIN(COALESCE(fim_min, lote.lote_fim_min), lote.lote_fim_min),
+                fim_max = MAX(COALESCE(fim_max, lote.lote_fim_max), lote.lote_fim_max)
+            FROM (
+                SELECT COUNT(*) AS lote_qtd, MIN({col_inicio}) AS lote_inicio_min, MAX({col_inicio}) AS lote_inicio_max,
+                       MIN({col_fim}) AS lote_fim_min, MAX({col_fim}) AS lote_fim_max
+                FROM {tabela} WHERE id IN (SELECT id FROM temp.lote_arquivo WHERE ano = ?)
+            ) AS lote
+            WHERE nome = ?
+        """, (ano, nome))
+    cursor.execute(f"DELETE FROM {tabela} WHERE id IN (SELECT id FROM temp.lote_arquivo)")
+    conn.commit()
+    return qtd
+
+def arquivar(dias_manter=DIAS_MANTER_PADRAO, data_corte=None, tamanho_lote=TAMANHO_LOTE_PADRAO, compactar=False):
+    """Arquiva aluguéis finalizados e manutenções concluídas antes da data de corte.
+
+    Sem `data_corte` ('AAAA-MM-DD'), usa hoje menos `dias_manter` dias. Com
+    `compactar`, roda VACUUM no fim para devolver as páginas liberadas e
+    deixar as tabelas principais contíguas (bloqueia o banco enquanto roda).
+    Retorna (True, [mensagens]) ou (False, [erro]).
+    """
+    if data_corte is None:
+        data_corte = (datetime.now() - timedelta(days=int(dias_manter))).strftime('%Y-%m-%d')
+    else:
+        try:
+            datetime.strptime(data_corte, '%Y-%m-%d')
+        except (ValueError, TypeError):
+            return (False, ["Formato de data inválido. Use 'AAAA-MM-DD'."])
+
+    # Conexão própria: o cache_size e a tabela temporária não devem ficar na conexão reaproveitada
+    conn, cursor = db.conectar_bd(reutilizar=False)
+    try:
+        # Cada lote apaga linhas espalhadas pelos índices da tabela principal;
+        # um cache maior evita reler as mesmas páginas a cada lote.
+        cursor.execute(f"PRAGMA cache_size = -{CACHE_ARQUIVAMENTO_KB}")
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS lote_arquivo (id INTEGER PRIMARY KEY, ano INTEGER)")
+        mensagens = []
+        for tabela in db.TABELAS_ARQUIVAVEIS:
+            total = 0
+            while True:
+                qtd = _arquivar_lote(conn, cursor, tabela, data_corte, tamanho_lote)
+                total += qtd
+                if qtd < tamanho_lote:
+                    break
+            mensagens.append(f"{tabela}: {total} registro(s) arquivado(s) antes de {data_corte}.")
+        if compactar:
+            conn.commit()
+            cursor.execute("VACUUM")
+            mensagens.append("Banco compactado.")
+        return (True, mensagens)
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao arquivar registros: {e}"])
+    finally:
+        conn.close()
+
+def listar_particoes():
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute("SELECT * FROM particoes_arquivo ORDER BY tabela_origem, ano")
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    db.criar_tabelas()
+    argumentos = [arg for arg in sys.argv[1:] if arg != "--compactar"]
+    dias = int(argumentos[0]) if argumentos else DIAS_MANTER_PADRAO
+    sucesso, msgs = arquivar(dias, compactar="--compactar" in sys.argv)
+    print("\n".join(msgs))
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,124 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+
+# =============================================================================
+# API ASSÍNCRONA (asyncio) SOBRE O DATABASE.PY
+# =============================================================================
+# BancoAssincrono expõe as mesmas funções de database.py como corrotinas, para
+# integrações em asyncio (quiosque, reservas pela web). As chamadas rodam em
+# threads próprias do banco, cada uma com a sua conexão reaproveitada:
+#   escritas  uma única thread, na ordem de chegada: não disputam o bloqueio
+#             de escrita do SQLite entre si
+#   leituras  um pool de `threads_leitura` threads (em WAL, não esperam as escritas)
+# Um limite de chamadas em andamento (`max_pendentes`) segura quem chega
+# depois: a corrotina espera a sua vez, em ordem de chegada, sem acumular
+# trabalho nas filas das threads. Resultados grandes podem ser lidos aos
+# poucos com os iteradores assíncronos (iterar_historico).
+#
+# Uso:
+#     async with BancoAssincrono() as banco:
+#         sucesso, msgs = await banco.realizar_aluguel(placa, cpf)
+#         async for aluguel in banco.iterar_historico(placa=placa):
+#             ...
+
+FUNCOES_LEITURA = (
+    "listar_veiculos", "listar_clientes", "listar_alugueis_ativos", "listar_manutencoes",
+    "buscar_historico", "calcular_faturamento_periodo", "obter_painel", "obter_resumo_cliente",
+    "listar_categorias", "disponiveis_por_categoria", "escolher_veiculo",
+)
+FUNCOES_ESCRITA = (
+    "adicionar_veiculo", "atualizar_veiculo", "remover_veiculo",
+    "adicionar_cliente", "atualizar_cliente", "remover_cliente",
+    "realizar_aluguel", "realizar_devolucao",
+    "enviar_para_manutencao", "atualizar_manutencao", "registrar_retorno_manutencao",
+    "adicionar_categoria", "atualizar_categoria", "remover_categoria", "definir_categoria_veiculo",
+)
+TAMANHO_LOTE_FLUXO = 500
+
+class BancoAssincrono:
+    def __init__(self, threads_leitura=4, max_pendentes=64):
+        self.max_pendentes = max_pendentes
+        self._leitura = ThreadPoolExecutor(threads_leitura, thread_name_prefix="db-leitura")
+        self._escrita = ThreadPoolExecutor(1, thread_name_prefix="db-escrita")
+        # asyncio.Semaphore libera as corrotinas em espera na ordem em que chegaram
+        self._vagas = asyncio.Semaphore(max_pendentes)
+        self.em_espera = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        """Espera as chamadas em andamento e encerra as threads do banco."""
+        self._leitura.shutdown(wait=True)
+        self._escrita.shutdown(wait=True)
+
+    async def _executar(self, executor, funcao, *args, **kwargs):
+        self.em_espera += 1
+        try:
+            await self._vagas.acquire()
+        finally:
+            self.em_espera -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, lambda: funcao(*args, **kwargs))
+        finally:
+            self._vagas.release()
+
+    async def ler(self, funcao, *args, **kwargs):
+        """Roda uma função de leitura qualquer no pool de leitura."""
+        return await self._executar(self._leitura, funcao, *args, **kwargs)
+
+    async def escrever(self, funcao, *args, **kwargs):
+        """Roda uma função de escrita qualquer na thread de escrita."""
+        return await self._executar(self._escrita, funcao, *args, **kwargs)
+
+    async def iterar_historico(self, tamanho_lote=TAMANHO_LOTE_FLUXO, **filtros):
+        """Histórico de aluguéis (filtros de database.buscar_historico) entregue aos poucos.
+
+        Cada lote de `tamanho_lote` linhas é lido no pool de leitura; a consulta
+        fica aberta numa conexão própria até o fim da iteração (ou até o
+        `aclose()` de quem parar antes).
+        """
+        conn = await self.ler(_conectar_fluxo)
+        try:
+            cursor = await self.ler(_abrir_historico, conn, filtros)
+            while True:
+                lote = await self.ler(cursor.fetchmany, tamanho_lote)
+                if not lote:
+                    break
+                for linha in lote:
+                    yield dict(linha)
+        finally:
+            # A conexão é usada por uma thread do pool de cada vez, nunca por duas
+            await asyncio.get_running_loop().run_in_executor(self._leitura, conn.close)
+
+def _conectar_fluxo():
+    """Conexão avulsa para um iterador: segue o destino de leitura dos relatórios."""
+    uri = db.NOME_BANCO_DADOS if db.DESTINO_LEITURA == 'principal' else db.uri_leitura()
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _abrir_historico(conn, filtros):
+    cursor = conn.cursor()
+    query, params = db.consulta_historico(cursor, **filtros)
+    return cursor.execute(query, params)
+
+def _espelhar(nome, escrita):
+    async def metodo(self, *args, **kwargs):
+        return await self._executar(self._escrita if escrita else self._leitura, getattr(db, nome),
+                                    *args, **kwargs)
+
+    metodo.__name__ = nome
+    metodo.__doc__ = f"Versão assíncrona de database.{nome}()."
+    return metodo
+
+for _nome in FUNCOES_LEITURA:
+    setattr(BancoAssincrono, _nome, _espelhar(_nome, escrita=False))
+for _nome in FUNCOES_ESCRITA:
+    setattr(BancoAssincrono, _nome, _espelhar(_nome, escrita=True))
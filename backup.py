@@ -0,0 +1,289 @@
+import os
+import sys
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+import database as db
+import precificacao
+
+# =============================================================================
+# BACKUP ONLINE DO BANCO DE DADOS
+# =============================================================================
+# Usa a API de backup do SQLite (sqlite3.Connection.backup), copiando o banco
+# em passos de poucas páginas com o sistema em uso. Com o banco em modo WAL
+# (ativado por database.criar_tabelas), a conexão de origem mantém uma
+# transação de leitura aberta durante a cópia: o backup enxerga um único
+# instante do banco e as gravações dos balcões continuam sem esperar por ele.
+# Em modo rollback, cada passo só segura o banco pelo tempo de copiar suas
+# páginas, mas uma gravação de outra conexão faz o SQLite recomeçar a cópia.
+#
+# Uso: python backup.py criar [--comprimir]
+#      python backup.py listar
+#      python backup.py restaurar <arquivo>
+#      python backup.py copia-leitura
+
+PASTA_BACKUPS = 'backups'
+PREFIXO = 'locadora-'
+FORMATO_INSTANTE = '%Y%m%d-%H%M%S'
+PAGINAS_POR_PASSO = 256
+PAUSA_ENTRE_PASSOS = 0.001
+MAX_REINICIOS = 20
+NIVEL_COMPRESSAO = 6
+
+def _nome_backup(instante, comprimir):
+    return f"{PREFIXO}{instante.strftime(FORMATO_INSTANTE)}.db{'.gz' if comprimir else ''}"
+
+def _instante_do_arquivo(nome):
+    """Data e hora em que o backup foi tirado, lidas do nome do arquivo (ou None)."""
+    if not nome.startswith(PREFIXO):
+        return None
+    try:
+        return datetime.strptime(nome[len(PREFIXO):len(PREFIXO) + 15], FORMATO_INSTANTE)
+    except ValueError:
+        return None
+
+def _comprimir(caminho):
+    with open(caminho, 'rb') as entrada, gzip.open(caminho + '.gz', 'wb', compresslevel=NIVEL_COMPRESSAO) as saida:
+        shutil.copyfileobj(entrada, saida)
+    os.remove(caminho)
+    return caminho + '.gz'
+
+def copiar_banco(destino, paginas_por_passo=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS):
+    """Copia o banco atual para o arquivo `destino`; retorna quantas vezes a cópia recomeçou."""
+    origem = sqlite3.connect(db.NOME_BANCO_DADOS, isolation_level=None, uri=True)
+    copia = sqlite3.connect(destino)
+    # Sem fsync a cada passo: o arquivo só ganha o nome final depois de fechado,
+    # e evitar os fsync grandes impede que as gravações dos balcões esperem o disco.
+    copia.execute("PRAGMA synchronous = OFF")
+    reinicios = 0
+    restantes_anterior = None
+
+    def ao_progredir(status, restantes, total):
+        nonlocal reinicios, restantes_anterior
+        if restantes_anterior is not None and restantes > restantes_anterior:
+            reinicios += 1
+            if reinicios > MAX_REINICIOS:
+                raise RuntimeError("O banco foi alterado durante toda a cópia; tente com o banco em modo WAL.")
+        restantes_anterior = restantes
+
+    try:
+        if origem.execute("PRAGMA journal_mode").fetchone()[0] == 'wal':
+            # Fixa o instante copiado: em WAL a leitura aberta não bloqueia as gravações
+            origem.execute("BEGIN")
+            origem.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        origem.backup(copia, pages=paginas_por_passo, progress=ao_progredir, sleep=pausa)
+        # A cópia é um arquivo avulso: sem WAL, para poder ser comprimida e movida sozinha
+        copia.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        copia.close()
+        if origem.in_transaction:
+            origem.execute("COMMIT")
+        origem.close()
+    return reinicios
+
+def criar_backup(pasta=PASTA_BACKUPS, comprimir=False, manter=None,
+                 paginas_por_passo=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS):
+    """Tira um backup do banco em uso para `pasta`.
+
+    O arquivo é gravado com extensão .parcial e só recebe o nome final
+    quando está completo. Com `manter`, apaga os backups mais antigos além
+    dessa quantidade. Retorna (True, [mensagem], caminho) ou (False, [erro], None).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, _nome_backup(datetime.now(), False))
+    base, sequencia = caminho[:-len('.db')], 1
+    while os.path.exists(caminho) or os.path.exists(caminho + '.gz'):
+        caminho = f"{base}-{sequencia}.db"
+        sequencia += 1
+    parcial = caminho + '.parcial'
+    try:
+        reinicios = copiar_banco(parcial, paginas_por_passo, pausa)
+        os.replace(parcial, caminho)
+        if comprimir:
+            caminho = _comprimir(caminho)
+    except Exception as e:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        return (False, [f"Erro ao criar backup: {e}"], None)
+
+    removidos = rotacionar_backups(pasta, manter) if manter else []
+    msg = f"Backup criado em '{caminho}'."
+    if reinicios:
+        msg += f" A cópia recomeçou {reinicios} vez(es) por gravações concorrentes."
+    if removidos:
+        msg += f" {len(removidos)} backup(s) antigo(s) removido(s)."
+    return (True, [msg], caminho)
+
+def listar_backups(pasta=PASTA_BACKUPS):
+    """Backups da pasta, do mais recente para o mais antigo, como [(instante, caminho)]."""
+    if not os.path.isdir(pasta):
+        return []
+    backups = []
+    for nome in os.listdir(pasta):
+        instante = _instante_do_arquivo(nome)
+        if instante and (nome.endswith('.db') or nome.endswith('.db.gz')):
+            caminho = os.path.join(pasta, nome)
+            backups.append((instante, os.path.getmtime(caminho), caminho))
+    return [(instante, caminho) for instante, _, caminho in sorted(backups, reverse=True)]
+
+def rotacionar_backups(pasta=PASTA_BACKUPS, manter=24):
+    """Apaga os backups além dos `manter` mais recentes; retorna os caminhos apagados."""
+    removidos = [caminho for _, caminho in listar_backups(pasta)[manter:]]
+    for caminho in removidos:
+        os.remove(caminho)
+    return removidos
+
+def restaurar_backup(caminho, salvar_atual=True):
+    """Substitui o conteúdo do banco em uso pelo do backup `caminho` (.db ou .db.gz).
+
+    O backup é conferido com PRAGMA quick_check antes de qualquer alteração.
+    Com `salvar_atual`, o estado atual é salvo antes em um novo backup.
+    """
+    if not os.path.isfile(caminho):
+        return (False, [f"Arquivo de backup não encontrado: '{caminho}'."])
+
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        origem_caminho = caminho
+        if caminho.endswith('.gz'):
+            origem_caminho = os.path.join(pasta_temp, 'restauracao.db')
+            with gzip.open(caminho, 'rb') as entrada, open(origem_caminho, 'wb') as saida:
+                shutil.copyfileobj(entrada, saida)
+
+        origem = sqlite3.connect(origem_caminho)
+        try:
+            verificacao = origem.execute("PRAGMA quick_check").fetchone()[0]
+            if verificacao != 'ok':
+                return (False, [f"O backup está corrompido: {verificacao}"])
+
+            if salvar_atual:
+                sucesso, msgs, _ = criar_backup(os.path.dirname(caminho) or '.')
+                if not sucesso:
+                    return (False, msgs)
+
+            destino = sqlite3.connect(db.NOME_BANCO_DADOS, uri=True)
+            try:
+                origem.backup(destino)
+            finally:
+                destino.close()
+            precificacao.descartar_tabelas()
+            db.marcar_restauracao()
+        except Exception as e:
+            return (False, [f"Erro ao restaurar backup: {e}"])
+        finally:
+            origem.close()
+    return (True, [f"Banco restaurado a partir de '{caminho}'."])
+
+def restaurar_ate(instante, pasta=PASTA_BACKUPS, salvar_atual=True):
+    """Restaura o backup mais recente tirado até `instante` (datetime)."""
+    for instante_backup, caminho in listar_backups(pasta):
+        if instante_backup <= instante:
+            return restaurar_backup(caminho, salvar_atual)
+    return (False, [f"Nenhum backup anterior a {instante:%Y-%m-%d %H:%M:%S}."])
+
+# =============================================================================
+# BACKUPS AGENDADOS
+# =============================================================================
+
+class BackupAgendado:
+    """Tira um backup a cada `intervalo` segundos numa thread própria, com rotação.
+
+    O resultado da última execução fica em `ultimo_resultado` (sucesso, [mensagens]),
+    para quem iniciou o agendamento mostrar as falhas.
+    """
+
+    NOME_THREAD = "backup-agendado"
+
+    def __init__(self, intervalo=3600, manter=24, comprimir=True, pasta=PASTA_BACKUPS):
+        self.intervalo = intervalo
+        self.manter = manter
+        self.comprimir = comprimir
+        self.pasta = pasta
+        self.ultimo_resultado = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name=self.NOME_THREAD, daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            self._executar()
+
+    def _executar(self):
+        self.ultimo_resultado = criar_backup(self.pasta, self.comprimir, self.manter)[:2]
+
+# =============================================================================
+# CÓPIA DE LEITURA PARA RELATÓRIOS
+# =============================================================================
+# Com database.DESTINO_LEITURA = 'copia', as consultas de relatório leem
+# database.caminho_copia_leitura() em vez do banco em uso. A cópia é feita com
+# copiar_banco() e só substitui a anterior quando está completa; quem já estava
+# lendo a cópia antiga termina a consulta nela.
+
+def atualizar_copia_leitura():
+    """Renova a cópia de leitura dos relatórios; retorna (sucesso, [mensagem])."""
+    if db.banco_em_memoria():
+        return (False, ["O banco em memória não tem cópia de leitura."])
+    destino = db.caminho_copia_leitura()
+    parcial = destino + '.parcial'
+    try:
+        copiar_banco(parcial)
+        os.replace(parcial, destino)
+    except Exception as e:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        return (False, [f"Erro ao atualizar a cópia de leitura: {e}"])
+    return (True, [f"Cópia de leitura atualizada em '{destino}'."])
+
+class CopiaLeituraAgendada(BackupAgendado):
+    """Renova a cópia de leitura ao iniciar e depois a cada `intervalo` segundos."""
+
+    NOME_THREAD = "copia-leitura"
+
+    def __init__(self, intervalo=300):
+        super().__init__(intervalo)
+
+    def _laco(self):
+        self._executar()
+        super()._laco()
+
+    def _executar(self):
+        self.ultimo_resultado = atualizar_copia_leitura()
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'criar'
+    if comando == 'criar':
+        sucesso, msgs, _ = criar_backup(comprimir='--comprimir' in sys.argv)
+    elif comando == 'listar':
+        backups = listar_backups()
+        msgs = [f"{instante:%Y-%m-%d %H:%M:%S}  {caminho}" for instante, caminho in backups] or ["Nenhum backup encontrado."]
+        sucesso = True
+    elif comando == 'restaurar' and len(sys.argv) > 2:
+        sucesso, msgs = restaurar_backup(sys.argv[2])
+    elif comando == 'copia-leitura':
+        sucesso, msgs = atualizar_copia_leitura()
+    else:
+        sucesso, msgs = False, ["Uso: python backup.py criar [--comprimir] | listar | restaurar <arquivo> | copia-leitura"]
+    print("\n".join(msgs))
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,123 @@
+import database as db
+from validacao import limpar_cpf, validar_cpf
+
+# =============================================================================
+# BALCÃO EXPRESSO: ALUGUEL E DEVOLUÇÃO POR LEITURA DE PLACA OU CPF
+# =============================================================================
+# Um único campo recebe o que o leitor (ou o teclado) digitar, seguido de Enter:
+#   placa de um carro alugado     -> devolução na hora
+#   placa de um carro disponível  -> aguarda o CPF do cliente
+#   CPF                           -> aguarda a placa de um carro disponível
+# Com placa e CPF informados, o aluguel é registrado. Para decidir o que fazer
+# sem consultar o banco a cada leitura, o balcão guarda em memória os aluguéis
+# ativos e as placas disponíveis, atualizados a cada operação feita aqui,
+# corrigidos por aplicar_alteracoes() com o que as outras janelas alteraram e
+# recarregados por carregar(). A validação continua com as funções de
+# database.py: se o índice estiver desatualizado (operação feita em outro
+# balcão ou aba), elas recusam a operação e o índice é recarregado.
+
+def chave_placa(texto):
+    """A placa como o leitor pode entregá-la: sem hífen, espaços ou minúsculas."""
+    return texto.upper().replace("-", "").replace(" ", "")
+
+class BalcaoExpresso:
+    def __init__(self, operacoes=db):
+        # `operacoes`: database ou o TerminalOffline do modo balcão
+        self.operacoes = operacoes
+        self.ativos = {}
+        self.disponiveis = {}
+        self.placa_pendente = None
+        self.cpf_pendente = None
+
+    def carregar(self):
+        """Refaz o índice de aluguéis ativos (placa -> (placa, CPF)) e de placas disponíveis."""
+        self.ativos = {chave_placa(a["placa_carro"]): (a["placa_carro"], a["cpf_cliente"])
+                       for a in db.listar_alugueis_ativos()}
+        self.disponiveis = {chave_placa(v["placa"]): v["placa"]
+                            for v in db.listar_veiculos(status_filtro='Disponível')}
+        if self.placa_pendente and chave_placa(self.placa_pendente) not in self.disponiveis:
+            self.placa_pendente = None
+
+    def aplicar_alteracoes(self, placas=(), ids_alugueis=()):
+        """Atualiza o índice só com os veículos e aluguéis alterados (ver database.ObservadorAlteracoes)."""
+        if placas:
+            encontradas = set()
+            for veiculo in db.listar_veiculos(placas=placas):
+                chave = chave_placa(veiculo["placa"])
+                encontradas.add(chave)
+                if veiculo["status"] == 'Disponível':
+                    self.disponiveis[chave] = veiculo["placa"]
+                    self.ativos.pop(chave, None)
+                else:
+                    self.disponiveis.pop(chave, None)
+                    if veiculo["status"] != 'Alugado':
+                        self.ativos.pop(chave, None)
+            # Veículos removidos não voltam na listagem
+            for chave in {chave_placa(placa) for placa in placas} - encontradas:
+                self.disponiveis.pop(chave, None)
+                self.ativos.pop(chave, None)
+        if ids_alugueis:
+            for aluguel in db.listar_alugueis_ativos(ids=ids_alugueis):
+                self.ativos[chave_placa(aluguel["placa_carro"])] = (aluguel["placa_carro"], aluguel["cpf_cliente"])
+        if self.placa_pendente and chave_placa(self.placa_pendente) not in self.disponiveis:
+            self.placa_pendente = None
+
+    def cancelar(self):
+        self.placa_pendente = self.cpf_pendente = None
+
+    def aguardando(self):
+        """Texto do que falta para completar o aluguel em andamento (ou None)."""
+        if self.placa_pendente:
+            return f"Placa {self.placa_pendente}: leia o CPF do cliente."
+        if self.cpf_pendente:
+            return f"CPF {self.cpf_pendente}: leia a placa do carro."
+        return None
+
+    def processar(self, texto):
+        """Trata uma leitura; retorna (sucesso, mensagem) para o registro do balcão."""
+        texto = texto.strip()
+        if not texto:
+            return (False, "Leitura vazia.")
+        resultado = self._resolver(texto)
+        if resultado is None:
+            # Talvez o carro tenha mudado de situação em outro balcão
+            self.carregar()
+            resultado = self._resolver(texto)
+        return resultado or (False, f"'{texto}' não é um carro alugado, um carro disponível nem um CPF.")
+
+    def _resolver(self, texto):
+        chave = chave_placa(texto)
+        if chave in self.ativos:
+            return self._devolver(chave)
+        if chave in self.disponiveis:
+            self.placa_pendente = self.disponiveis[chave]
+            return self._alugar() if self.cpf_pendente else (True, self.aguardando())
+        cpf = limpar_cpf(texto)
+        if len(cpf) == 11 and not any(c.isalpha() for c in texto):
+            erro = validar_cpf(cpf)
+            if erro:
+                return (False, erro)
+            self.cpf_pendente = cpf
+            return self._alugar() if self.placa_pendente else (True, self.aguardando())
+        return None
+
+    def _devolver(self, chave):
+        placa, _ = self.ativos[chave]
+        sucesso, msgs, _ = self.operacoes.realizar_devolucao(placa)
+        if sucesso:
+            del self.ativos[chave]
+            self.disponiveis[chave] = placa
+        else:
+            self.carregar()
+        return (sucesso, f"Devolução {placa}: {' '.join(msgs)}")
+
+    def _alugar(self):
+        placa, cpf = self.placa_pendente, self.cpf_pendente
+        self.cancelar()
+        sucesso, msgs = self.operacoes.realizar_aluguel(placa, cpf)
+        if sucesso:
+            self.disponiveis.pop(chave_placa(placa), None)
+            self.ativos[chave_placa(placa)] = (placa, cpf)
+        else:
+            self.carregar()
+        return (sucesso, f"Aluguel {placa} para {cpf}: {' '.join(msgs)}")
@@ -0,0 +1,1129 @@
+"""Benchmarks do sistema da locadora.
+
+Cada benchmark roda contra um banco temporário, nunca contra o locadora.db.
+Uso: python benchmarks.py [nome ...]   (sem argumentos roda todos)
+"""
+import os
+import sys
+import time
+import asyncio
+import random
+import tempfile
+import threading
+import tracemalloc
+from string import Template
+from datetime import datetime, timedelta
+
+import database as db
+import validacao
+import arquivamento
+import backup
+import terminal
+import precificacao
+import manutencao_preventiva
+import relatorios
+import balcao_expresso
+import assincrono
+import documentos
+
+# =============================================================================
+# FUNÇÕES AUXILIARES
+# =============================================================================
+
+def gerar_cpf(n):
+    """Gera um CPF válido e determinístico a partir de um inteiro."""
+    base = [int(d) for d in f"{n:09d}"[-9:]]
+    if len(set(base)) == 1:
+        base[-1] = (base[-1] + 1) % 10
+    soma = sum(d * (10 - i) for i, d in enumerate(base))
+    d1 = (soma * 10) % 11 % 10
+    soma = sum(d * (11 - i) for i, d in enumerate(base + [d1]))
+    d2 = (soma * 10) % 11 % 10
+    return ''.join(map(str, base + [d1, d2]))
+
+def gerar_placa(n):
+    letras = ''.join(chr(ord('A') + (n // 26 ** k) % 26) for k in (2, 1, 0))
+    return f"{letras}-{n % 10000:04d}"
+
+class BancoTemporario:
+    """Aponta database.py para um arquivo temporário enquanto estiver ativo."""
+    def __enter__(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._anterior = db.NOME_BANCO_DADOS
+        db.NOME_BANCO_DADOS = os.path.join(self._dir.name, 'bench.db')
+        db.criar_tabelas()
+        return db.NOME_BANCO_DADOS
+
+    def __exit__(self, *exc):
+        db.fechar_conexoes()
+        db.NOME_BANCO_DADOS = self._anterior
+        self._dir.cleanup()
+
+def popular_frota(qtd_veiculos, qtd_clientes):
+    """Insere veículos e clientes diretamente, numa única transação."""
+    conn, cursor = db.conectar_bd()
+    cursor.executemany(
+        "INSERT INTO veiculos (placa, marca, modelo, ano, cor, valor_diaria) VALUES (?, ?, ?, ?, ?, ?)",
+        ((gerar_placa(i), f"Marca{i % 20}", f"Modelo{i % 50}", 2000 + i % 25, "Prata", 100.0 + i % 200)
+         for i in range(qtd_veiculos))
+    )
+    cursor.executemany(
+        "INSERT INTO clientes (cpf, nome, telefone, email) VALUES (?, ?, ?, ?)",
+        ((gerar_cpf(i + 1), f"Cliente {i}", "11999999999", f"cliente{i}@exemplo.com")
+         for i in range(qtd_clientes))
+    )
+    conn.commit()
+    conn.close()
+    return [gerar_placa(i) for i in range(qtd_veiculos)], [gerar_cpf(i + 1) for i in range(qtd_clientes)]
+
+def popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes, anos=3, semente=42):
+    """Insere aluguéis finalizados e manutenções concluídas espalhados pelos últimos anos."""
+    aleatorio = random.Random(semente)
+    fim = datetime.now().replace(microsecond=0)
+    inicio = fim - timedelta(days=365 * anos)
+    segundos = int((fim - inicio).total_seconds())
+    formato = '%Y-%m-%d %H:%M:%S'
+
+    def alugueis():
+        for _ in range(qtd_alugueis):
+            retirada = inicio + timedelta(seconds=aleatorio.randrange(segundos))
+            dias = aleatorio.randint(1, 15)
+            yield (aleatorio.choice(placas), aleatorio.choice(cpfs), retirada.strftime(formato),
+                   (retirada + timedelta(days=dias)).strftime(formato), dias * 150.0, 'Finalizado')
+
+    def manutencoes():
+        for _ in range(qtd_manutencoes):
+            entrada = inicio + timedelta(seconds=aleatorio.randrange(segundos))
+            yield (aleatorio.choice(placas), entrada.strftime(formato),
+                   (entrada + timedelta(days=aleatorio.randint(1, 5))).strftime(formato),
+                   "Revisão", float(aleatorio.randint(100, 2000)), 'Concluída')
+
+    conn, cursor = db.conectar_bd()
+    cursor.executemany(
+        "INSERT INTO alugueis (placa_carro, cpf_cliente, data_retirada, data_devolucao, valor_total, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)", alugueis()
+    )
+    cursor.executemany(
+        "INSERT INTO manutencoes (placa_carro, data_entrada, data_saida, descricao, custo, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)", manutencoes()
+    )
+    conn.commit()
+    conn.close()
+
+def medir(funcao, repeticoes=5):
+    """Executa a função algumas vezes e devolve o menor tempo em milissegundos."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+def rodar_em_threads(qtd_threads, tarefas, funcao):
+    """Distribui as tarefas entre threads e devolve o tempo total em segundos."""
+    fatias = [tarefas[i::qtd_threads] for i in range(qtd_threads)]
+    threads = [threading.Thread(target=lambda f=f: [funcao(t) for t in f]) for f in fatias]
+    inicio = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.perf_counter() - inicio
+
+# =============================================================================
+# FILA DE ESCRITA (fila_escrita.py)
+# =============================================================================
+
+def bench_fila_escrita(qtd_operacoes=2000, qtd_threads=8):
+    from fila_escrita import FilaEscrita
+
+    print(f"\n== Fila de escrita: {qtd_operacoes} aluguéis + devoluções, {qtd_threads} threads ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_operacoes, qtd_operacoes)
+        pares = list(zip(placas, cpfs))
+
+        def aluguel_e_devolucao(par):
+            db.realizar_aluguel(*par)
+            db.realizar_devolucao(par[0])
+
+        tempo = rodar_em_threads(qtd_threads, pares, aluguel_e_devolucao)
+        commits = 2 * qtd_operacoes
+        print(f"Commit por chamada: {commits / tempo:10.1f} commits/s  {commits / tempo:10.1f} operações/s")
+
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_operacoes, qtd_operacoes)
+        pares = list(zip(placas, cpfs))
+
+        with FilaEscrita() as fila:
+            def aluguel_e_devolucao_fila(par):
+                fila.executar(db.realizar_aluguel, *par)
+                fila.executar(db.realizar_devolucao, par[0])
+
+            tempo = rodar_em_threads(qtd_threads, pares, aluguel_e_devolucao_fila)
+            print(f"Commit em grupo:    {fila.total_commits / tempo:10.1f} commits/s  "
+                  f"{fila.total_comandos / tempo:10.1f} operações/s  "
+                  f"({fila.total_comandos / fila.total_commits:.1f} comandos/lote)")
+
+# =============================================================================
+# INICIALIZAÇÃO (criar_tabelas com versão de esquema)
+# =============================================================================
+
+def bench_inicializacao(repeticoes=200):
+    print(f"\n== Verificação do esquema na inicialização ({repeticoes} repetições) ==")
+    with BancoTemporario():
+        for rotulo, forcar in (("DDL completo", True), ("versão em cache", False)):
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                db.criar_tabelas(forcar=forcar)
+            tempo = (time.perf_counter() - inicio) / repeticoes
+            print(f"{rotulo:<16} {tempo * 1000:8.3f} ms por inicialização")
+    print("Tempo até o primeiro quadro da interface: python interface.py --medir-inicio")
+
+# =============================================================================
+# LISTA VIRTUAL (interface.ListaVirtual)
+# =============================================================================
+
+def bench_lista_virtual(qtd_linhas=500_000, rolagens=1000):
+    import tkinter as tk
+    from interface import ListaVirtual
+
+    print(f"\n== Lista virtual: {qtd_linhas} linhas, {rolagens} rolagens ==")
+    try:
+        raiz = tk.Tk()
+    except tk.TclError:
+        print("Sem display disponível; benchmark ignorado.")
+        return
+    raiz.geometry("800x600")
+    linhas = [{"id": i, "placa": gerar_placa(i), "valor_diaria": float(i % 300)} for i in range(qtd_linhas)]
+    lista = ListaVirtual(raiz, ("placa", "valor_diaria"), coluna_chave="id",
+                         formatar_linha=lambda l: (l["placa"], l["valor_diaria"]))
+    lista.pack(expand=True, fill="both")
+    raiz.update()
+
+    inicio = time.perf_counter()
+    lista.carregar(linhas)
+    raiz.update()
+    print(f"carregar:           {(time.perf_counter() - inicio) * 1000:8.1f} ms")
+
+    inicio = time.perf_counter()
+    for i in range(rolagens):
+        lista._rolar_para(i * 97 % qtd_linhas)
+        raiz.update_idletasks()
+    print(f"rolagem:            {(time.perf_counter() - inicio) / rolagens * 1000:8.3f} ms por quadro")
+
+    inicio = time.perf_counter()
+    lista.ordenar_por("valor_diaria")
+    raiz.update()
+    print(f"ordenar por coluna: {(time.perf_counter() - inicio) * 1000:8.1f} ms")
+
+    inicio = time.perf_counter()
+    lista.selecionar(qtd_linhas - 1)
+    raiz.update()
+    print(f"selecionar chave:   {(time.perf_counter() - inicio) * 1000:8.3f} ms")
+    raiz.destroy()
+
+# =============================================================================
+# FILTROS E ORDENAÇÃO NAS LISTAGENS
+# =============================================================================
+
+def bench_listagens(qtd_veiculos=100_000, qtd_clientes=50_000, qtd_alugueis=500_000, qtd_manutencoes=100_000):
+    print(f"\n== Listagens com filtro/ordenação: {qtd_veiculos} veículos, {qtd_clientes} clientes, "
+          f"{qtd_alugueis} aluguéis, {qtd_manutencoes} manutenções ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_clientes)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        ano_passado = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+        mes_passado = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+        casos = [
+            ("veículos: marca", lambda: db.listar_veiculos(marca="Marca1")),
+            ("veículos: marca+modelo", lambda: db.listar_veiculos(marca="Marca1", modelo="Modelo1")),
+            ("veículos: faixa de ano", lambda: db.listar_veiculos(ano_min=2020, ano_max=2021)),
+            ("veículos: faixa de diária", lambda: db.listar_veiculos(valor_min=150, valor_max=160)),
+            ("veículos: status", lambda: db.listar_veiculos(status_filtro="Disponível", limite=100)),
+            ("veículos: ordem por marca", lambda: db.listar_veiculos(ordenar_por="marca", limite=100)),
+            ("veículos: ordem diária desc", lambda: db.listar_veiculos(ordenar_por="valor_diaria", decrescente=True, limite=100)),
+            ("clientes: nome", lambda: db.listar_clientes(nome="Cliente 123")),
+            ("clientes: ordem por nome", lambda: db.listar_clientes(ordenar_por="nome", limite=100)),
+            ("histórico: cpf", lambda: db.buscar_historico(filtro_cpf=cpfs[7])),
+            ("histórico: placa", lambda: db.buscar_historico(placa=placas[7])),
+            ("histórico: último mês", lambda: db.buscar_historico(data_inicio=mes_passado)),
+            ("histórico: cpf + último ano", lambda: db.buscar_historico(filtro_cpf=cpfs[7], data_inicio=ano_passado)),
+            ("histórico: ordem padrão", lambda: db.buscar_historico(limite=100)),
+            ("manutenções: placa", lambda: db.listar_manutencoes(placa=placas[7])),
+            ("manutenções: último mês", lambda: db.listar_manutencoes(data_inicio=mes_passado)),
+        ]
+        for rotulo, consulta in casos:
+            qtd = len(consulta())
+            print(f"{rotulo:<30} {medir(consulta):9.2f} ms  ({qtd} linhas)")
+
+# =============================================================================
+# ANÁLISE DA FROTA (analise.py)
+# =============================================================================
+
+def bench_analise(qtd_veiculos=5000, qtd_alugueis=500_000, qtd_manutencoes=50_000, anos=5):
+    import analise
+
+    print(f"\n== Análise da frota: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis, "
+          f"{qtd_manutencoes} manutenções em {anos} anos ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes, anos=anos)
+        hoje = datetime.now()
+        periodos = [
+            ("último mês", hoje - timedelta(days=30)),
+            ("último ano", hoje - timedelta(days=365)),
+            (f"{anos} anos", hoje - timedelta(days=365 * anos)),
+        ]
+        for rotulo, inicio in periodos:
+            for visao in ("veiculo", "marca", "mes"):
+                args = (inicio.strftime('%Y-%m-%d'), hoje.strftime('%Y-%m-%d'), visao)
+                tempo = medir(lambda: analise.analisar_frota(*args), repeticoes=3)
+                print(f"{rotulo:<12} por {visao:<8} {tempo:9.1f} ms")
+
+# =============================================================================
+# PAINEL (contadores incrementais)
+# =============================================================================
+
+def bench_painel(qtd_veiculos=100_000, qtd_clientes=50_000, qtd_alugueis=500_000, qtd_manutencoes=100_000):
+    print(f"\n== Painel: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_clientes)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        db.reconciliar_contadores()
+        for placa, cpf in zip(placas[:1000], cpfs):
+            db.realizar_aluguel(placa, cpf)
+        hoje = datetime.now().strftime('%Y-%m-%d')
+
+        def painel_pelas_listagens():
+            return {
+                'disponiveis': len(db.listar_veiculos(status_filtro='Disponível')),
+                'alugados': len(db.listar_veiculos(status_filtro='Alugado')),
+                'em_manutencao': len(db.listar_veiculos(status_filtro='Em Manutenção')),
+                'ativos': len(db.listar_alugueis_ativos()),
+                'receita_hoje': db.calcular_faturamento_periodo(hoje, hoje),
+            }
+
+        print(f"{'pelas listagens':<24} {medir(painel_pelas_listagens, repeticoes=3):9.2f} ms")
+        print(f"{'obter_painel':<24} {medir(db.obter_painel):9.2f} ms")
+        print(f"{'reconciliar_contadores':<24} {medir(db.reconciliar_contadores, repeticoes=3):9.2f} ms")
+        print(db.reconciliar_contadores()[1][0])
+
+# =============================================================================
+# ARQUIVAMENTO (arquivamento.py)
+# =============================================================================
+
+def bench_arquivamento(qtd_veiculos=20_000, qtd_alugueis=1_000_000, qtd_manutencoes=200_000, anos=5):
+    print(f"\n== Arquivamento: {qtd_alugueis} aluguéis e {qtd_manutencoes} manutenções em {anos} anos ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes, anos=anos)
+        for placa, cpf in zip(placas[:500], cpfs):
+            db.realizar_aluguel(placa, cpf)
+        hoje = datetime.now()
+        inicio_ano = (hoje - timedelta(days=365)).strftime('%Y-%m-%d')
+        inicio_total = (hoje - timedelta(days=365 * anos)).strftime('%Y-%m-%d')
+
+        casos = [
+            ("aluguéis ativos", lambda: db.listar_alugueis_ativos()),
+            ("manutenções em andamento", lambda: db.listar_manutencoes(status_filtro="Em Andamento")),
+            ("histórico: cpf", lambda: db.buscar_historico(filtro_cpf=cpfs[7])),
+            ("histórico: ordem padrão", lambda: db.buscar_historico(limite=100)),
+            ("histórico: último ano", lambda: db.buscar_historico(data_inicio=inicio_ano)),
+            ("faturamento: último ano", lambda: db.calcular_faturamento_periodo(inicio_ano, hoje.strftime('%Y-%m-%d'))),
+            ("faturamento: total", lambda: db.calcular_faturamento_periodo(inicio_total, hoje.strftime('%Y-%m-%d'))),
+        ]
+        antes = {rotulo: medir(consulta, repeticoes=3) for rotulo, consulta in casos}
+
+        inicio = time.perf_counter()
+        sucesso, msgs = arquivamento.arquivar(dias_manter=365, compactar=True)
+        print(f"arquivamento: {time.perf_counter() - inicio:.1f} s  ({'; '.join(msgs)})")
+
+        print(f"{'consulta':<26} {'antes':>10} {'depois':>10}")
+        for rotulo, consulta in casos:
+            print(f"{rotulo:<26} {antes[rotulo]:8.2f}ms {medir(consulta, repeticoes=3):8.2f}ms")
+
+# =============================================================================
+# BACKUP ONLINE (backup.py)
+# =============================================================================
+
+def _latencias_durante(funcao, placas, cpfs):
+    """Roda aluguéis/devoluções numa thread enquanto `funcao` executa; devolve (duração, latências em ms)."""
+    latencias = []
+    parar = threading.Event()
+
+    def balcao():
+        i = 0
+        while not parar.is_set():
+            placa, cpf = placas[i % len(placas)], cpfs[i % len(cpfs)]
+            inicio = time.perf_counter()
+            db.realizar_aluguel(placa, cpf)
+            db.realizar_devolucao(placa)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            i += 1
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=balcao)
+    thread.start()
+    time.sleep(0.2)
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    thread.join()
+    return duracao, sorted(latencias)
+
+def bench_backup(qtd_veiculos=50_000, qtd_alugueis=1_000_000, qtd_manutencoes=100_000):
+    print(f"\n== Backup online: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario() as caminho:
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        print(f"tamanho do banco: {os.path.getsize(caminho) / 2**20:.0f} MiB")
+        pasta = os.path.join(os.path.dirname(caminho), 'backups')
+        balcao = (placas[:100], cpfs[:100])
+
+        casos = [
+            ("sem backup", 'wal', lambda: time.sleep(2)),
+            ("WAL, em passos", 'wal', lambda: backup.criar_backup(pasta)),
+            ("WAL, passo único", 'wal', lambda: backup.criar_backup(pasta, paginas_por_passo=-1)),
+            ("WAL, em passos + gzip", 'wal', lambda: backup.criar_backup(pasta, comprimir=True)),
+            ("rollback, passo único", 'delete', lambda: backup.criar_backup(pasta, paginas_por_passo=-1)),
+        ]
+        print(f"{'caso':<24} {'duração':>9} {'operações':>10} {'p50':>8} {'p99':>8} {'máx':>8}")
+        for rotulo, modo, funcao in casos:
+            conn, cursor = db.conectar_bd()
+            cursor.execute(f"PRAGMA journal_mode = {modo}")
+            conn.close()
+            duracao, lat = _latencias_durante(funcao, *balcao)
+            print(f"{rotulo:<24} {duracao:8.2f}s {len(lat):>10} {lat[len(lat) // 2]:7.1f}ms "
+                  f"{lat[int(len(lat) * 0.99)]:7.1f}ms {lat[-1]:7.1f}ms")
+        comprimidos = [c for _, c in backup.listar_backups(pasta) if c.endswith('.gz')]
+        print(f"backup comprimido: {os.path.getsize(comprimidos[0]) / 2**20:.0f} MiB")
+
+# =============================================================================
+# LOG DE EVENTOS
+# =============================================================================
+
+def bench_eventos(qtd_veiculos=100_000, qtd_alugueis=500_000, qtd_operacoes=2000):
+    print(f"\n== Log de eventos: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis, {qtd_operacoes} operações ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        posicao = db.ultimo_seq_eventos()
+
+        inicio = time.perf_counter()
+        for i in range(qtd_operacoes // 2):
+            db.realizar_aluguel(placas[i], cpfs[i])
+            db.realizar_devolucao(placas[i])
+        duracao = time.perf_counter() - inicio
+        print(f"{'aluguel + devolução':<32} {duracao / (qtd_operacoes // 2) * 1000:8.2f} ms por par")
+
+        print(f"{'consumidor: releitura das tabelas':<32} "
+              f"{medir(lambda: (db.listar_veiculos(), db.buscar_historico()), repeticoes=3):8.1f} ms")
+        print(f"{'consumidor: eventos novos':<32} {medir(lambda: db.ler_eventos(posicao, limite=10_000)):8.1f} ms"
+              f"  ({len(db.ler_eventos(posicao, limite=10_000))} eventos)")
+        db.confirmar_eventos('bench', db.ultimo_seq_eventos())
+        inicio = time.perf_counter()
+        sucesso, msgs = db.compactar_eventos()
+        print(f"{'compactação':<32} {(time.perf_counter() - inicio) * 1000:8.1f} ms  ({msgs[0]})")
+
+# =============================================================================
+# TERMINAL OFFLINE (terminal.py)
+# =============================================================================
+
+def bench_terminal(qtd_veiculos=20_000, qtd_pares=1000):
+    print(f"\n== Terminal offline: {qtd_veiculos} veículos, {qtd_pares} aluguéis + devoluções ==")
+    with BancoTemporario() as caminho_central:
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        balcao = terminal.TerminalOffline(caminho_central, caminho_central + '.replica', nome='bench').preparar()
+
+        inicio = time.perf_counter()
+        balcao.sincronizar()
+        print(f"{'cópia inicial da réplica':<32} {(time.perf_counter() - inicio) * 1000:8.1f} ms")
+
+        balcao.caminho_central = caminho_central + '.inacessivel'
+        inicio = time.perf_counter()
+        for i in range(qtd_pares):
+            balcao.realizar_aluguel(placas[i], cpfs[i])
+            balcao.realizar_devolucao(placas[i])
+        print(f"{'par registrado offline':<32} {(time.perf_counter() - inicio) / qtd_pares * 1000:8.2f} ms")
+
+        balcao.caminho_central = caminho_central
+        inicio = time.perf_counter()
+        sucesso, msgs = balcao.sincronizar()
+        print(f"{'sincronização da fila':<32} {(time.perf_counter() - inicio) * 1000:8.1f} ms  ({msgs[0]})")
+
+        inicio = time.perf_counter()
+        for i in range(qtd_pares, 2 * qtd_pares):
+            db.realizar_aluguel(placas[i], cpfs[i])
+            db.realizar_devolucao(placas[i])
+        print(f"{'par direto na central':<32} {(time.perf_counter() - inicio) / qtd_pares * 1000:8.2f} ms")
+
+        # Réplica apagada e recriada no mesmo caminho: a fila recomeça no id 1 e
+        # as operações novas não podem ser tomadas pelas já recebidas da anterior
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(balcao.caminho_local + sufixo):
+                os.remove(balcao.caminho_local + sufixo)
+        recriado = terminal.TerminalOffline(caminho_central, balcao.caminho_local, nome='bench').preparar()
+        assert recriado.id_replica != balcao.id_replica
+        recriado.sincronizar()
+        placa, cpf = placas[2 * qtd_pares], cpfs[2 * qtd_pares]
+        assert recriado.realizar_aluguel(placa, cpf)[0]
+        assert recriado.sincronizar()[0]
+        assert [a['placa_carro'] for a in db.listar_alugueis_ativos()] == [placa]
+
+# =============================================================================
+# PRECIFICAÇÃO (precificacao.py)
+# =============================================================================
+
+def bench_precificacao(qtd_veiculos=100_000, qtd_clientes=10_000):
+    print(f"\n== Precificação: cotação de {qtd_veiculos} veículos, {qtd_clientes} descontos de clientes ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_clientes)
+        precificacao.definir_temporada("Alta", "12-15", "02-28", 1.4)
+        precificacao.definir_temporada("Julho", "07-01", "07-31", 1.2)
+        precificacao.definir_faixa_duracao(7, 0.1)
+        precificacao.definir_faixa_duracao(30, 0.25)
+        precificacao.definir_parametro("fator_fim_de_semana", 1.15)
+        conn, cursor = db.conectar_bd()
+        cursor.executemany("INSERT INTO descontos_clientes (cpf, desconto) VALUES (?, 0.05)", ((cpf,) for cpf in cpfs))
+        conn.commit()
+
+        retirada, devolucao = datetime(2026, 12, 20, 10), datetime(2027, 1, 8, 10)
+        tabela = precificacao.tabela_vigente(cursor)
+        valores = [v for (v,) in cursor.execute("SELECT valor_diaria FROM veiculos")]
+        print(f"{'compilar as regras':<32} {medir(lambda: precificacao.TabelaPrecos.carregar(cursor)):8.1f} ms")
+        print(f"{'tabela_vigente (em cache)':<32} {medir(lambda: precificacao.tabela_vigente(cursor), 1000) * 1000:8.1f} µs")
+        print(f"{'frota: um calcular() por carro':<32} "
+              f"{medir(lambda: [tabela.calcular(v, retirada, devolucao, cpfs[0]) for v in valores], 1):8.1f} ms")
+        print(f"{'frota: cotar() em lote':<32} {medir(lambda: tabela.cotar(valores, retirada, devolucao, cpfs[0])):8.1f} ms")
+        print(f"{'cotar_frota() com a consulta':<32} "
+              f"{medir(lambda: precificacao.cotar_frota('2026-12-20 10:00', '2027-01-08 10:00', cpfs[0]), 3):8.1f} ms")
+        conn.close()
+
+# =============================================================================
+# MANUTENÇÃO PREVENTIVA (manutencao_preventiva.py)
+# =============================================================================
+
+def _agenda_veiculo_a_veiculo(cursor):
+    """A mesma agenda, calculada com duas consultas por veículo e plano."""
+    agenda = []
+    for plano_id, intervalo_dias, criado_em in cursor.execute(
+            "SELECT id, intervalo_dias, criado_em FROM planos_manutencao").fetchall():
+        for (placa,) in cursor.execute("SELECT placa FROM veiculos").fetchall():
+            ultima = cursor.execute(
+                "SELECT MAX(data_saida) FROM manutencoes WHERE placa_carro = ? AND plano_id = ? AND status = 'Concluída'",
+                (placa, plano_id)).fetchone()[0] or criado_em
+            qtd = cursor.execute("SELECT COUNT(*) FROM alugueis WHERE placa_carro = ? AND data_retirada > ?",
+                                 (placa, ultima)).fetchone()[0]
+            agenda.append((placa, plano_id, ultima, qtd))
+    return agenda
+
+def bench_manutencao_preventiva(qtd_veiculos=20_000, qtd_alugueis=500_000, qtd_manutencoes=50_000):
+    print(f"\n== Manutenção preventiva: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis, 3 planos ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        manutencao_preventiva.definir_plano("Troca de óleo", intervalo_dias=180, intervalo_alugueis=30, custo_estimado=250)
+        manutencao_preventiva.definir_plano("Revisão geral", intervalo_dias=365, custo_estimado=900)
+        manutencao_preventiva.definir_plano("Pneus", intervalo_alugueis=80, custo_estimado=1600)
+        conn, cursor = db.conectar_bd()
+        cursor.execute("UPDATE manutencoes SET plano_id = 1 + id % 3")
+        conn.commit()
+
+        print(f"{'agenda veículo a veículo':<32} {medir(lambda: _agenda_veiculo_a_veiculo(cursor), 1):8.1f} ms")
+        print(f"{'recalcular_agenda() em conjunto':<32} {medir(manutencao_preventiva.recalcular_agenda, 3):8.1f} ms")
+        print(f"{'listar_agenda()':<32} {medir(manutencao_preventiva.listar_agenda):8.1f} ms"
+              f"  ({len(manutencao_preventiva.listar_agenda())} itens)")
+        print(f"{'resumo_agenda()':<32} {medir(manutencao_preventiva.resumo_agenda):8.1f} ms")
+        disponiveis = [p for (p,) in cursor.execute(
+            "SELECT placa FROM veiculos AS v WHERE NOT EXISTS (SELECT 1 FROM agenda_manutencao AS ag "
+            "JOIN planos_manutencao AS p ON p.id = ag.plano_id WHERE ag.placa = v.placa "
+            "AND (ag.vence_em <= date('now') OR ag.alugueis_desde >= p.intervalo_alugueis)) LIMIT 500")]
+        conn.close()
+        inicio = time.perf_counter()
+        for placa, cpf in zip(disponiveis, cpfs):
+            db.realizar_aluguel(placa, cpf)
+            db.realizar_devolucao(placa)
+        print(f"{'aluguel + devolução com agenda':<32} {(time.perf_counter() - inicio) / len(disponiveis) * 1000:8.2f} ms por par")
+
+# =============================================================================
+# RESUMO POR CLIENTE (database.obter_resumo_cliente)
+# =============================================================================
+
+def _resumo_pelo_historico(cursor, cpf):
+    """O perfil do cliente como era montado antes, varrendo o histórico dele."""
+    return cursor.execute("""
+        SELECT COUNT(*), TOTAL(CASE WHEN status = 'Finalizado' THEN valor_total END),
+               AVG(CASE WHEN status = 'Finalizado' THEN julianday(data_devolucao) - julianday(data_retirada) END),
+               MAX(data_retirada), SUM(status = 'Ativo')
+        FROM alugueis WHERE cpf_cliente = ?
+    """, (cpf,)).fetchone()
+
+def bench_resumo_clientes(qtd_clientes=2_000, qtd_alugueis=500_000):
+    print(f"\n== Resumo por cliente: {qtd_clientes} clientes, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(5_000, qtd_clientes)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        print(f"{'reconstruir_resumo_clientes':<32} {medir(db.reconstruir_resumo_clientes, 1):8.1f} ms")
+        amostra = random.Random(7).sample(cpfs, 200)
+        conn, cursor = db.conectar_bd()
+        tempo = medir(lambda: [_resumo_pelo_historico(cursor, cpf) for cpf in amostra], 3)
+        print(f"{'perfil varrendo o histórico':<32} {tempo / len(amostra):8.3f} ms por cliente")
+        consulta = "SELECT * FROM resumo_clientes WHERE cpf = ?"
+        tempo = medir(lambda: [cursor.execute(consulta, (cpf,)).fetchone() for cpf in amostra], 3)
+        conn.close()
+        print(f"{'perfil por resumo_clientes':<32} {tempo / len(amostra):8.3f} ms por cliente")
+        tempo = medir(lambda: [db.obter_resumo_cliente(cpf) for cpf in amostra], 3)
+        print(f"{'obter_resumo_cliente() + conexão':<32} {tempo / len(amostra):8.3f} ms por cliente")
+        conn, cursor = db.conectar_bd()
+        disponiveis = [p for (p,) in cursor.execute("SELECT placa FROM veiculos WHERE status = 'Disponível' LIMIT 500")]
+        conn.close()
+        inicio = time.perf_counter()
+        for placa, cpf in zip(disponiveis, cpfs):
+            db.realizar_aluguel(placa, cpf)
+            db.realizar_devolucao(placa)
+        print(f"{'aluguel + devolução com resumo':<32} {(time.perf_counter() - inicio) / len(disponiveis) * 1000:8.2f} ms por par")
+
+# =============================================================================
+# FECHAMENTO EM VÁRIOS PROCESSOS (relatorios.py)
+# =============================================================================
+
+def bench_relatorios(qtd_alugueis=500_000, qtd_manutencoes=50_000):
+    print(f"\n== Fechamento de 2 anos: {qtd_alugueis} aluguéis, {qtd_manutencoes} manutenções, "
+          f"{os.cpu_count()} núcleo(s) ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(5_000, 20_000)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        hoje = datetime.now()
+        inicio, fim = (hoje - timedelta(days=730)).strftime('%Y-%m-%d'), hoje.strftime('%Y-%m-%d')
+        base = None
+        for processos in (1, 2, 4, 8):
+            tempo = medir(lambda: relatorios.gerar_fechamento(inicio, fim, processos), 1)
+            base = base or tempo
+            print(f"{f'{processos} processo(s)':<24} {tempo:9.1f} ms  ({base / tempo:.2f}x)")
+
+# =============================================================================
+# FILTROS DE DATA POR FAIXA NO ÍNDICE
+# =============================================================================
+
+def _faturamento_com_date(data_inicio, data_fim):
+    """calcular_faturamento_periodo como era: date() na coluna impede a faixa no índice."""
+    conn, cursor = db.conectar_bd()
+    try:
+        return cursor.execute(
+            "SELECT SUM(valor_total) FROM alugueis WHERE status = 'Finalizado' AND date(data_devolucao) BETWEEN ? AND ?",
+            (data_inicio, data_fim)).fetchone()[0]
+    finally:
+        conn.close()
+
+def bench_datas(qtd_alugueis=1_000_000):
+    print(f"\n== Filtros de data: {qtd_alugueis} aluguéis ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(5_000, 20_000)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        hoje = datetime.now()
+        mes = ((hoje - timedelta(days=60)).strftime('%Y-%m-%d'), (hoje - timedelta(days=30)).strftime('%Y-%m-%d'))
+        assert abs(_faturamento_com_date(*mes) - db.calcular_faturamento_periodo(*mes)[1]) < 1e-6
+        print(f"{'faturamento: date() BETWEEN':<32} {medir(lambda: _faturamento_com_date(*mes), 3):8.1f} ms")
+        print(f"{'faturamento: faixa no índice':<32} {medir(lambda: db.calcular_faturamento_periodo(*mes), 3):8.1f} ms")
+        print(f"{'normalizar_datas()':<32} {medir(db.normalizar_datas, 1):8.1f} ms")
+        textos = [db.como_texto(hoje - timedelta(minutes=i)) for i in range(100_000)]
+        tempo = medir(lambda: [datetime.strptime(t, db.FORMATO_DATA_HORA) for t in textos], 3)
+        print(f"{'strptime':<32} {tempo * 1000 / len(textos):8.2f} µs por data")
+        tempo = medir(lambda: [db.como_datetime(t) for t in textos], 3)
+        print(f"{'como_datetime (fromisoformat)':<32} {tempo * 1000 / len(textos):8.2f} µs por data")
+
+# =============================================================================
+# BALCÃO EXPRESSO (balcao_expresso.py)
+# =============================================================================
+
+def bench_balcao_expresso(qtd_veiculos=20_000, qtd_operacoes=500):
+    print(f"\n== Balcão expresso: {qtd_veiculos} veículos, {qtd_operacoes} aluguéis e devoluções ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, 200_000, 0)
+        balcao = balcao_expresso.BalcaoExpresso()
+        print(f"{'carregar()':<32} {medir(balcao.carregar, 3):8.1f} ms  "
+              f"({len(balcao.ativos)} ativos, {len(balcao.disponiveis)} disponíveis)")
+        # Como o leitor entrega: placa sem hífen e CPF só com dígitos
+        leituras = [(placa.replace("-", "").lower(), cpf) for placa, cpf in zip(list(balcao.disponiveis.values()), cpfs)]
+        tempos = {"aluguel (placa + CPF)": [], "devolução (placa)": []}
+        for placa, cpf in leituras[:qtd_operacoes]:
+            inicio = time.perf_counter()
+            balcao.processar(placa)
+            sucesso, mensagem = balcao.processar(cpf)
+            tempos["aluguel (placa + CPF)"].append((time.perf_counter() - inicio) * 1000)
+            assert sucesso, mensagem
+        for placa, _ in leituras[:qtd_operacoes]:
+            inicio = time.perf_counter()
+            sucesso, mensagem = balcao.processar(placa)
+            tempos["devolução (placa)"].append((time.perf_counter() - inicio) * 1000)
+            assert sucesso, mensagem
+        for nome, valores in tempos.items():
+            valores.sort()
+            print(f"{nome:<32} {sum(valores) / len(valores):8.2f} ms em média, "
+                  f"p95 {valores[int(len(valores) * 0.95)]:.2f} ms, máx. {valores[-1]:.2f} ms")
+
+# =============================================================================
+# LEITURAS DE RELATÓRIO FORA DA CONEXÃO DOS BALCÕES
+# =============================================================================
+
+def bench_leitura_relatorios(qtd_veiculos=20_000, qtd_alugueis=500_000, qtd_manutencoes=50_000, rodadas=3):
+    import analise
+    print(f"\n== Relatórios x balcões: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario() as caminho:
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        hoje = datetime.now()
+        inicio_periodo = (hoje - timedelta(days=3 * 365)).strftime('%Y-%m-%d')
+        fim_periodo = hoje.strftime('%Y-%m-%d')
+        balcao = (placas[:100], cpfs[:100])
+
+        def relatorios_pesados():
+            for _ in range(rodadas):
+                db.buscar_historico()
+                db.calcular_faturamento_periodo(inicio_periodo, fim_periodo)
+                analise.analisar_frota(inicio_periodo, fim_periodo, "veiculo")
+
+        inicio = time.perf_counter()
+        backup.atualizar_copia_leitura()
+        print(f"cópia de leitura: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+        casos = [
+            ("sem relatórios", 'principal', lambda: time.sleep(2)),
+            ("principal", 'principal', relatorios_pesados),
+            ("somente_leitura", 'somente_leitura', relatorios_pesados),
+            ("copia", 'copia', relatorios_pesados),
+        ]
+        print(f"{'destino':<18} {'duração':>9} {'operações':>10} {'p50':>8} {'p99':>8} {'máx':>8} {'WAL':>9}")
+        try:
+            for rotulo, destino, funcao in casos:
+                db.definir_destino_leitura(destino)
+                conn, cursor = db.conectar_bd()
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+                duracao, lat = _latencias_durante(funcao, *balcao)
+                wal = caminho + '-wal'
+                tamanho_wal = os.path.getsize(wal) / 2**10 if os.path.exists(wal) else 0
+                print(f"{rotulo:<18} {duracao:8.2f}s {len(lat):>10} {lat[len(lat) // 2]:7.1f}ms "
+                      f"{lat[int(len(lat) * 0.99)]:7.1f}ms {lat[-1]:7.1f}ms {tamanho_wal:6.0f}KiB")
+        finally:
+            db.definir_destino_leitura('principal')
+
+# =============================================================================
+# CONEXÕES REAPROVEITADAS E INSTRUÇÕES REGISTRADAS
+# =============================================================================
+
+def bench_instrucoes(qtd_veiculos=20_000, qtd_alugueis=200_000, qtd_pares=500, qtd_consultas=2000):
+    print(f"\n== Conexões e instruções: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        casos = [
+            ("obter_resumo_cliente", lambda i: db.obter_resumo_cliente(cpfs[i % len(cpfs)]), qtd_consultas),
+            ("listar_veiculos (filtro)", lambda i: db.listar_veiculos(marca="Marca1", limite=20), qtd_consultas),
+            ("aluguel + devolução", lambda i: (db.realizar_aluguel(placas[i], cpfs[i]),
+                                              db.realizar_devolucao(placas[i])), qtd_pares),
+        ]
+        print(f"{'operação':<28} {'conexão nova':>14} {'reaproveitada':>14}")
+        try:
+            for rotulo, funcao, repeticoes in casos:
+                tempos = []
+                for reutilizar in (False, True):
+                    db.REUTILIZAR_CONEXOES = reutilizar
+                    db.fechar_conexoes()
+                    inicio = time.perf_counter()
+                    for i in range(repeticoes):
+                        funcao(i)
+                    tempos.append((time.perf_counter() - inicio) * 1e6 / repeticoes)
+                print(f"{rotulo:<28} {tempos[0]:11.0f} µs {tempos[1]:11.0f} µs")
+        finally:
+            db.REUTILIZAR_CONEXOES = True
+
+        db.zerar_estatisticas_instrucoes()
+        for i in range(qtd_pares):
+            db.realizar_aluguel(placas[i], cpfs[i])
+            db.realizar_devolucao(placas[i])
+        print(f"\n{'instrução (aluguel + devolução)':<32} {'chamadas':>9} {'média':>10}")
+        for linha in db.estatisticas_instrucoes()[:8]:
+            print(f"{linha['nome']:<32} {linha['chamadas']:>9} {linha['media_us']:7.1f} µs")
+
+# =============================================================================
+# BANCO EM MEMÓRIA E SNAPSHOTS PARA CENÁRIOS DE TESTE
+# =============================================================================
+
+def bench_memoria(qtd_veiculos=500, qtd_cenarios=1000):
+    print(f"\n== Cenários de teste: {qtd_veiculos} veículos semeados, {qtd_cenarios} cenários ==")
+
+    def cenario(i):
+        placa, cpf = placas[i % len(placas)], cpfs[i % len(cpfs)]
+        assert db.realizar_aluguel(placa, cpf)[0]
+        assert db.realizar_devolucao(placa)[0]
+        assert db.enviar_para_manutencao(placa, "Revisão", "150")[0]
+        manutencao = db.listar_manutencoes(status_filtro='Em Andamento', placa=placa)[0]
+        assert db.registrar_retorno_manutencao(manutencao["id"])[0]
+
+    anterior = db.NOME_BANCO_DADOS
+    with tempfile.TemporaryDirectory() as pasta:
+        for rotulo, destino in (("arquivo", os.path.join(pasta, 'cenarios.db')), ("memória", ':memory:')):
+            db.definir_banco(destino)
+            placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+            snapshot = db.criar_snapshot()
+            restauracao = medir(lambda: db.restaurar_snapshot(snapshot), 20)
+            inicio = time.perf_counter()
+            for i in range(qtd_cenarios):
+                db.restaurar_snapshot(snapshot)
+                cenario(i)
+            duracao = time.perf_counter() - inicio
+            print(f"{rotulo:<10} restauração {restauracao:6.2f} ms   "
+                  f"{qtd_cenarios / duracao:7.0f} cenários/s (restauração + 4 operações)")
+            snapshot.close()
+        db.definir_banco(anterior)
+
+# =============================================================================
+# API ASSÍNCRONA (assincrono.py)
+# =============================================================================
+
+def bench_assincrono(qtd_veiculos=20_000, qtd_alugueis=300_000, qtd_clientes_async=32, operacoes_por_cliente=40):
+    print(f"\n== API assíncrona: {qtd_clientes_async} clientes simultâneos, "
+          f"{operacoes_por_cliente} operações cada ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+
+        async def cliente(banco, n, latencias):
+            # Cada cliente alterna consultas do balcão com um aluguel e a devolução
+            for i in range(operacoes_por_cliente):
+                placa, cpf = placas[n * operacoes_por_cliente + i], cpfs[n]
+                inicio = time.perf_counter()
+                if i % 4 == 0:
+                    await banco.realizar_aluguel(placa, cpf)
+                    await banco.realizar_devolucao(placa)
+                elif i % 4 == 1:
+                    await banco.listar_veiculos(marca=f"Marca{n % 20}", limite=50)
+                elif i % 4 == 2:
+                    await banco.obter_resumo_cliente(cpf)
+                else:
+                    await banco.buscar_historico(placa=placa)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        async def rodada(threads_leitura):
+            latencias = []
+            async with assincrono.BancoAssincrono(threads_leitura=threads_leitura) as banco:
+                inicio = time.perf_counter()
+                await asyncio.gather(*(cliente(banco, n, latencias) for n in range(qtd_clientes_async)))
+                duracao = time.perf_counter() - inicio
+            latencias.sort()
+            return len(latencias) / duracao, latencias[len(latencias) // 2], latencias[int(len(latencias) * 0.99)]
+
+        print(f"{'threads de leitura':<20} {'operações/s':>12} {'p50':>9} {'p99':>9}")
+        for threads_leitura in (1, 2, 4, 8):
+            vazao, p50, p99 = asyncio.run(rodada(threads_leitura))
+            print(f"{threads_leitura:<20} {vazao:12.0f} {p50:7.1f}ms {p99:7.1f}ms")
+
+        async def primeiro_lote():
+            async with assincrono.BancoAssincrono() as banco:
+                inicio = time.perf_counter()
+                fluxo = banco.iterar_historico()
+                await fluxo.__anext__()
+                primeiro = time.perf_counter() - inicio
+                total = 1 + sum([1 async for _ in fluxo])
+                return primeiro, time.perf_counter() - inicio, total
+
+        primeiro, completo, total = asyncio.run(primeiro_lote())
+        print(f"{'iterar_historico':<20} primeira linha em {primeiro * 1000:.1f} ms, "
+              f"{total} linhas em {completo * 1000:.0f} ms")
+        print(f"{'buscar_historico':<20} {total} linhas em {medir(db.buscar_historico, 1):.0f} ms de uma vez")
+
+# =============================================================================
+# INTEGRIDADE REFERENCIAL (foreign_keys)
+# =============================================================================
+
+def bench_integridade(qtd_veiculos=20_000, qtd_alugueis=1_000_000, qtd_manutencoes=100_000, qtd_remocoes=200):
+    print(f"\n== Remoções com foreign_keys: {qtd_veiculos} veículos, {qtd_alugueis} aluguéis ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, qtd_manutencoes)
+        # Índices que começam por placa_carro: os que o SQLite usa para achar os filhos
+        indices_placa = ("idx_alugueis_placa_status", "idx_alugueis_analise",
+                         "idx_manutencoes_placa_entrada", "idx_manutencoes_analise")
+
+        def remover_novos(primeira):
+            novas = [gerar_placa(primeira + i) for i in range(qtd_remocoes)]
+            for placa in novas:
+                assert db.adicionar_veiculo(placa, "Marca", "Modelo", 2020, "Prata", 100)[0]
+            inicio = time.perf_counter()
+            for placa in novas:
+                assert db.remover_veiculo(placa)[0]
+            return (time.perf_counter() - inicio) * 1000 / qtd_remocoes
+
+        def remover_com_historico():
+            inicio = time.perf_counter()
+            for placa in placas[:qtd_remocoes]:
+                assert not db.remover_veiculo(placa)[0]
+            return (time.perf_counter() - inicio) * 1000 / qtd_remocoes
+
+        print(f"{'caso':<40} {'por remoção':>12}")
+        print(f"{'sem histórico, com índices':<40} {remover_novos(qtd_veiculos):9.2f} ms")
+        print(f"{'com histórico (recusada), com índices':<40} {remover_com_historico():9.2f} ms")
+        conn, cursor = db.conectar_bd()
+        for indice in indices_placa:
+            cursor.execute(f"DROP INDEX {indice}")
+        conn.commit()
+        conn.close()
+        print(f"{'sem histórico, sem índices de placa':<40} {remover_novos(qtd_veiculos + qtd_remocoes):9.2f} ms")
+        tempo = medir(db.verificar_integridade, 1)
+        print(f"{'verificar_integridade()':<40} {tempo:9.0f} ms  ({db.verificar_integridade()[1][0]})")
+
+# =============================================================================
+# AVISO DE ALTERAÇÕES ENTRE JANELAS (database.ObservadorAlteracoes)
+# =============================================================================
+
+def bench_alteracoes(qtd_veiculos=20_000, qtd_alugueis=300_000, qtd_operacoes=300, qtd_verificacoes=20_000):
+    print(f"\n== Alterações entre janelas: {qtd_veiculos} veículos, {qtd_operacoes} aluguéis em outra conexão ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        observador = db.ObservadorAlteracoes()
+
+        inicio = time.perf_counter()
+        for _ in range(qtd_verificacoes):
+            assert not observador.verificar()
+        sem_alteracao_us = (time.perf_counter() - inicio) * 1e6 / qtd_verificacoes
+
+        incremental = recarga = 0.0
+        for placa, cpf in zip(placas[:qtd_operacoes], cpfs):
+            assert db.realizar_aluguel(placa, cpf)[0]
+            # A janela que não fez o aluguel: só as linhas alteradas...
+            inicio = time.perf_counter()
+            alteracoes = observador.verificar()
+            db.listar_veiculos(placas=alteracoes["veiculos"])
+            db.listar_alugueis_ativos(ids=alteracoes["alugueis"])
+            incremental += time.perf_counter() - inicio
+            # ...ou as listas inteiras, como ao trocar de aba
+            inicio = time.perf_counter()
+            db.listar_veiculos()
+            db.listar_alugueis_ativos()
+            recarga += time.perf_counter() - inicio
+
+        # Snapshot restaurado e escrita nova antes da verificação: os seq se
+        # repetem, e só o marcador de restauração avisa que tudo mudou
+        snapshot = db.criar_snapshot()
+        assert db.realizar_devolucao(placas[0])[0]
+        observador.verificar()
+        db.restaurar_snapshot(snapshot)
+        assert db.realizar_devolucao(placas[1])[0]
+        assert observador.verificar() == dict.fromkeys(db.CHAVE_POR_TABELA)
+        observador.fechar()
+
+        print(f"{'caso':<44} {'por ciclo':>12}")
+        print(f"{'verificar() sem alterações (data_version)':<44} {sem_alteracao_us:9.1f} µs")
+        print(f"{'verificar() + só as linhas alteradas':<44} {incremental * 1000 / qtd_operacoes:9.2f} ms")
+        print(f"{'recarga das listas de veículos e aluguéis':<44} {recarga * 1000 / qtd_operacoes:9.2f} ms")
+
+# =============================================================================
+# CONTRATOS E RECIBOS (documentos.py)
+# =============================================================================
+
+def _recibos_com_template(data_inicio, data_fim, formato):
+    """Como seria sem os modelos compilados: string.Template montado e analisado a cada recibo."""
+    modelo = documentos._MODELOS_PADRAO["recibo", formato]
+    conn, cursor = db.conectar_bd()
+    try:
+        dias_cobrados = precificacao.tabela_vigente(cursor).dias_cobrados
+        cursor.execute(documentos._CONSULTA_DOCUMENTOS.format(alugueis="alugueis")
+                       + " WHERE a.data_devolucao >= ? AND a.data_devolucao < ?", (data_inicio, db.dia_seguinte(data_fim)))
+        for linha in cursor:
+            yield Template(modelo).substitute(documentos._campos(linha, "", dias_cobrados))
+    finally:
+        conn.close()
+
+def bench_documentos(qtd_veiculos=20_000, qtd_alugueis=500_000):
+    print(f"\n== Recibos em lote: {qtd_alugueis} aluguéis em 3 anos ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        hoje = datetime.now()
+        inicio_ano = (hoje - timedelta(days=365)).strftime('%Y-%m-%d')
+        inicio_mes = (hoje - timedelta(days=30)).strftime('%Y-%m-%d')
+        fim = hoje.strftime('%Y-%m-%d')
+
+        print(f"{'caso':<40} {'recibos':>8} {'recibos/s':>10} {'pico de memória':>16}")
+        for nome, gerar in (
+            ("string.Template a cada recibo (texto)", lambda: _recibos_com_template(inicio_ano, fim, "texto")),
+            ("iterar_recibos, texto", lambda: documentos.iterar_recibos(inicio_ano, fim, "texto")),
+            ("iterar_recibos, html", lambda: documentos.iterar_recibos(inicio_ano, fim, "html")),
+        ):
+            inicio = time.perf_counter()
+            quantidade = sum(1 for _ in gerar())
+            segundos = time.perf_counter() - inicio
+            # O tracemalloc deixa o Python bem mais lento: memória medida numa segunda passada
+            tracemalloc.start()
+            for _ in gerar():
+                pass
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{nome:<40} {quantidade:>8} {quantidade / segundos:>10.0f} {pico / 1024:>13.0f} KB")
+
+        with tempfile.TemporaryDirectory() as pasta:
+            inicio = time.perf_counter()
+            sucesso, msgs = documentos.emitir_recibos_periodo(inicio_mes, fim, pasta, "html")
+            segundos = time.perf_counter() - inicio
+            quantidade = len(os.listdir(pasta))
+        assert sucesso, msgs
+        print(f"{'emitir_recibos_periodo (30 dias, arquivos)':<40} {quantidade:>8} {quantidade / segundos:>10.0f}")
+
+# =============================================================================
+# CATEGORIAS DE VEÍCULOS
+# =============================================================================
+
+def bench_categorias(qtd_veiculos=50_000, qtd_categorias=8, qtd_alugueis=300_000, qtd_consultas=2_000, qtd_escolhas=300):
+    print(f"\n== Categorias: {qtd_veiculos} veículos em {qtd_categorias} categorias ==")
+    with BancoTemporario():
+        placas, cpfs = popular_frota(qtd_veiculos, qtd_veiculos)
+        popular_historico(placas, cpfs, qtd_alugueis, 0)
+        for i in range(qtd_categorias):
+            assert db.adicionar_categoria(f"Categoria {i}", 100 + 50 * i)[0]
+        conn, cursor = db.conectar_bd()
+        cursor.execute("UPDATE veiculos SET categoria_id = rowid % ? + 1", (qtd_categorias,))
+        db._recalcular_contadores(cursor)
+        conn.commit()
+        conn.close()
+
+        categoria = db.listar_categorias()[0]['id']
+        def contar_com_indice():
+            conn, cursor = db.conectar_bd()
+            cursor.execute("SELECT COUNT(*) FROM veiculos WHERE categoria_id = ? AND status = 'Disponível'", (categoria,))
+            conn.close()
+        def contar_pela_lista():
+            sum(1 for v in db.listar_veiculos(status_filtro='Disponível') if v['categoria_id'] == categoria)
+
+        casos = [
+            ("contador (disponiveis_por_categoria)", lambda: db.disponiveis_por_categoria(categoria)),
+            ("COUNT(*) pelo índice categoria/status", contar_com_indice),
+            ("listar disponíveis e filtrar", contar_pela_lista),
+        ]
+        print(f"{'contagem de disponíveis':<40} {'por consulta':>14}")
+        for nome, funcao in casos:
+            repeticoes = qtd_consultas if funcao is not contar_pela_lista else 5
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                funcao()
+            print(f"{nome:<40} {(time.perf_counter() - inicio) * 1e6 / repeticoes:11.1f} µs")
+
+        # Escolha automática seguida do aluguel, como no balcão; o contador tem de acompanhar
+        antes = db.disponiveis_por_categoria(categoria)
+        inicio = time.perf_counter()
+        for _ in range(qtd_escolhas):
+            assert db.escolher_veiculo(categoria)[0]
+        escolha_ms = (time.perf_counter() - inicio) * 1000 / qtd_escolhas
+        for cpf in cpfs[:qtd_escolhas]:
+            assert db.realizar_aluguel(db.escolher_veiculo(categoria)[1], cpf)[0]
+        assert db.disponiveis_por_categoria(categoria) == antes - qtd_escolhas
+        sucesso, mensagens = db.reconciliar_contadores()
+        print(f"{'escolher_veiculo()':<40} {escolha_ms:11.2f} ms")
+        print(f"contador após {qtd_escolhas} aluguéis: {antes} -> {db.disponiveis_por_categoria(categoria)}; "
+              f"{mensagens[0]}")
+
+# =============================================================================
+# VALIDAÇÃO EM LOTE (validacao.py)
+# =============================================================================
+
+def _validar_veiculo_antigo(placa, marca, modelo, ano, cor, valor_diaria):
+    """Validação como era feita antes de validacao.py, registro a registro."""
+    import re
+    def validar_placa(placa):
+        if not isinstance(placa, str) or not placa.strip():
+            return "O campo 'Placa' é obrigatório."
+        placa = placa.upper().strip()
+        if re.compile(r'^[A-Z]{3}\d[A-Z]\d{2}$').match(placa) or re.compile(r'^[A-Z]{3}-\d{4}$').match(placa):
+            return None
+        return "Formato de placa inválido. Use 'ABC1D23' ou 'ABC-1234'."
+    def validar_ano(ano):
+        ano_atual = datetime.now().year
+        return None if 1950 <= int(ano) <= ano_atual + 1 else "Ano inválido."
+    return list(filter(None, [
+        validar_placa(placa),
+        "O campo 'Marca' é obrigatório." if not marca.strip() else None,
+        "O campo 'Modelo' é obrigatório." if not modelo.strip() else None,
+        validar_ano(ano),
+        "O campo 'Cor' é obrigatório." if not cor.strip() else None,
+        validacao.validar_valor(valor_diaria),
+    ]))
+
+def _validar_cpf_antigo(cpf):
+    cpf_numerico = ''.join(filter(str.isdigit, str(cpf)))
+    if len(cpf_numerico) != 11 or len(set(cpf_numerico)) == 1:
+        return "CPF inválido."
+    soma = sum(int(cpf_numerico[i]) * (10 - i) for i in range(9))
+    d1 = (soma * 10) % 11
+    if d1 == 10: d1 = 0
+    if d1 != int(cpf_numerico[9]):
+        return "CPF inválido."
+    soma = sum(int(cpf_numerico[i]) * (11 - i) for i in range(10))
+    d2 = (soma * 10) % 11
+    if d2 == 10: d2 = 0
+    if d2 != int(cpf_numerico[10]):
+        return "CPF inválido."
+    return None
+
+def bench_validacao(qtd_registros=50_000):
+    print(f"\n== Validação de {qtd_registros} registros ==")
+    veiculos = [(gerar_placa(i), "Marca", "Modelo", "2020", "Prata", "150,00") for i in range(qtd_registros)]
+    clientes = [(gerar_cpf(i), f"Cliente {i}", "", f"c{i}@x.com") for i in range(qtd_registros)]
+    # Alguns registros inválidos para exercitar os caminhos de erro
+    for i in range(0, qtd_registros, 10):
+        veiculos[i] = ("AB-12", "", "Modelo", "1900", "Prata", "-1")
+        clientes[i] = ("111.111.111-11", "", "", "")
+
+    # Mesmo resultado (válido ou não) que a validação antiga, inclusive com dígitos não ASCII
+    for cpf in [c[0] for c in clientes] + ['529.982.247-2٥', '52998224٧25', '529.982.247-2٤', '١١١١١١١١١١١']:
+        assert (validacao.validar_cpf(cpf) is None) == (_validar_cpf_antigo(cpf) is None), cpf
+
+    casos = [
+        ("veículos: um a um (antigo)", lambda: [_validar_veiculo_antigo(*v) for v in veiculos]),
+        ("veículos: um a um", lambda: [validacao.validar_veiculo(*v) for v in veiculos]),
+        ("veículos: em lote", lambda: validacao.validar_lote_veiculos(veiculos)),
+        ("clientes: um a um (antigo)", lambda: [_validar_cpf_antigo(c[0]) for c in clientes]),
+        ("clientes: um a um", lambda: [validacao.validar_cliente(*c) for c in clientes]),
+        ("clientes: em lote", lambda: validacao.validar_lote_clientes(clientes)),
+    ]
+    for rotulo, funcao in casos:
+        tempo = medir(funcao, repeticoes=3)
+        print(f"{rotulo:<28} {tempo:9.1f} ms  {qtd_registros / tempo * 1000:>12,.0f} registros/s")
+
+# =============================================================================
+# EXECUÇÃO
+# =============================================================================
+
+BENCHMARKS = {
+    'fila_escrita': bench_fila_escrita,
+    'inicializacao': bench_inicializacao,
+    'lista_virtual': bench_lista_virtual,
+    'listagens': bench_listagens,
+    'analise': bench_analise,
+    'painel': bench_painel,
+    'arquivamento': bench_arquivamento,
+    'backup': bench_backup,
+    'eventos': bench_eventos,
+    'terminal': bench_terminal,
+    'precificacao': bench_precificacao,
+    'manutencao_preventiva': bench_manutencao_preventiva,
+    'resumo_clientes': bench_resumo_clientes,
+    'relatorios': bench_relatorios,
+    'datas': bench_datas,
+    'balcao_expresso': bench_balcao_expresso,
+    'leitura_relatorios': bench_leitura_relatorios,
+    'instrucoes': bench_instrucoes,
+    'memoria': bench_memoria,
+    'assincrono': bench_assincrono,
+    'integridade': bench_integridade,
+    'alteracoes': bench_alteracoes,
+    'documentos': bench_documentos,
+    'categorias': bench_categorias,
+    'validacao': bench_validacao,
+}
+
+if __name__ == '__main__':
+    nomes = sys.argv[1:] or list(BENCHMARKS)
+    for nome in nomes:
+        BENCHMARKS[nome]()
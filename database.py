@@ -1,7 +1,16 @@
+import os
 import sqlite3
-import re
-from datetime import datetime
-import math
+import json
+import functools
+import itertools
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import time
+
+import precificacao
+import manutencao_preventiva
 
 # =============================================================================
 # CONFIGURAÇÃO E CONEXÃO COM O BANCO DE DADOS
@@ -9,17 +18,439 @@ import math
 
 NOME_BANCO_DADOS = 'locadora.db'
 
-def conectar_bd():
-    """Conecta ao banco de dados SQLite e retorna a conexão e o cursor."""
-    conn = sqlite3.connect(NOME_BANCO_DADOS)
+# Incrementar sempre que criar_tabelas() ganhar tabelas, colunas ou índices novos.
+# O valor é gravado em PRAGMA user_version e permite pular o DDL na inicialização.
+VERSAO_ESQUEMA = 15
+
+# Quando uma thread está aplicando um lote da fila de escrita (fila_escrita.py)
+# ou uma operação do terminal offline (terminal.py), usando_conexao() registra
+# aqui a conexão do lote, que é reaproveitada por conectar_bd().
+_contexto_lote = threading.local()
+
+class ConexaoDoComando:
+    """Conexão entregue às funções deste módulo durante um lote (ver usando_conexao).
+
+    commit() confirma apenas o SAVEPOINT do comando, rollback() desfaz só o
+    comando, e close() sem commit descarta o que o comando escreveu, como
+    aconteceria com uma conexão própria.
+    """
+    def __init__(self, conn, nome_savepoint):
+        self._conn = conn
+        self._savepoint = nome_savepoint
+        self._confirmado = False
+        self._conn.execute(f"SAVEPOINT {self._savepoint}")
+
+    @property
+    def row_factory(self):
+        return self._conn.row_factory
+
+    @row_factory.setter
+    def row_factory(self, valor):
+        pass
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def execute(self, *args):
+        return self._conn.execute(*args)
+
+    def commit(self):
+        if not self._confirmado:
+            self._conn.execute(f"RELEASE {self._savepoint}")
+            self._confirmado = True
+
+    def rollback(self):
+        if not self._confirmado:
+            self._conn.execute(f"ROLLBACK TO {self._savepoint}")
+
+    def close(self):
+        if not self._confirmado:
+            self._conn.execute(f"ROLLBACK TO {self._savepoint}")
+            self._conn.execute(f"RELEASE {self._savepoint}")
+            self._confirmado = True
+
+@contextmanager
+def usando_conexao(conn, nome_savepoint):
+    """Faz as funções deste módulo, nesta thread, usarem `conn` num SAVEPOINT próprio.
+
+    Usado pela fila de escrita (um SAVEPOINT por comando do lote) e pelo
+    terminal offline (operações aplicadas na central ou na réplica). Ao sair,
+    o que não foi confirmado com commit() é desfeito.
+    """
+    conexao = ConexaoDoComando(conn, nome_savepoint)
+    _contexto_lote.conexao = conexao
+    try:
+        yield conexao
+    finally:
+        _contexto_lote.conexao = None
+        conexao.close()
+
+# Conexões reaproveitadas: cada thread guarda uma conexão ociosa por arquivo de
+# banco. close() devolve a conexão ao cache (fechando os cursores e desfazendo o
+# que não foi confirmado, como o fechamento de verdade faria), e o próximo
+# conectar_bd() da thread a reutiliza. Assim o esquema não é relido a cada
+# chamada e as instruções preparadas ficam no cache do sqlite3 (cached_statements).
+REUTILIZAR_CONEXOES = True
+CACHE_INSTRUCOES = 256
+_conexoes_ociosas = threading.local()
+
+class ConexaoReutilizavel(sqlite3.Connection):
+    def __init__(self, caminho, *args, **kwargs):
+        super().__init__(caminho, *args, **kwargs)
+        self.caminho = caminho
+        self._cursores = []
+
+    def cursor(self, *args):
+        cursor = super().cursor(*args)
+        self._cursores.append(cursor)
+        return cursor
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def close(self):
+        for cursor in self._cursores:
+            cursor.close()
+        self._cursores.clear()
+        if self.in_transaction:
+            self.rollback()
+        ociosas = _conexoes_ociosas.__dict__
+        if ociosas.get(self.caminho) is None:
+            ociosas[self.caminho] = self
+        elif ociosas[self.caminho] is not self:
+            self.fechar()
+
+    def fechar(self):
+        """Fecha a conexão de verdade, sem devolvê-la ao cache."""
+        super().close()
+
+def fechar_conexoes():
+    """Fecha as conexões ociosas desta thread (ao trocar ou apagar o arquivo do banco)."""
+    ociosas = _conexoes_ociosas.__dict__
+    for conn in list(ociosas.values()):
+        conn.fechar()
+    ociosas.clear()
+
+def conectar_bd(reutilizar=None):
+    """Conecta ao banco de dados SQLite e retorna a conexão e o cursor.
+
+    Com `reutilizar=False` (ou REUTILIZAR_CONEXOES desligado) a conexão é nova
+    e close() a fecha de fato: para quem altera PRAGMAs da conexão ou cria
+    tabelas temporárias.
+    """
+    conexao_lote = getattr(_contexto_lote, 'conexao', None)
+    if conexao_lote is not None:
+        return conexao_lote, conexao_lote.cursor()
+    if REUTILIZAR_CONEXOES if reutilizar is None else reutilizar:
+        conn = _conexoes_ociosas.__dict__.pop(NOME_BANCO_DADOS, None)
+        if conn is None:
+            conn = sqlite3.connect(NOME_BANCO_DADOS, factory=ConexaoReutilizavel,
+                                   cached_statements=CACHE_INSTRUCOES, uri=True)
+            conn.execute("PRAGMA foreign_keys = ON")
+    else:
+        conn = sqlite3.connect(NOME_BANCO_DADOS, uri=True)
+        conn.execute("PRAGMA foreign_keys = ON")
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     return conn, cursor
 
-def criar_tabelas():
-    """Cria as tabelas do banco de dados se elas não existirem."""
+# Leituras de relatório (buscar_historico, faturamento, analise.py, relatorios.py)
+# passam por conectar_leitura(), que as envia para um dos destinos:
+#   'principal'        a mesma conexão de conectar_bd() (como sempre foi)
+#   'somente_leitura'  outra conexão ao mesmo arquivo, com mode=ro e query_only
+#   'copia'            uma cópia do banco, renovada de tempos em tempos por
+#                      backup.atualizar_copia_leitura(); as varreduras longas não
+#                      seguram o WAL do banco principal, que pode ser esvaziado
+# As telas de balcão continuam lendo e gravando pelo conectar_bd().
+DESTINOS_LEITURA = ('principal', 'somente_leitura', 'copia')
+DESTINO_LEITURA = 'principal'
+
+def definir_destino_leitura(destino):
+    global DESTINO_LEITURA
+    if destino not in DESTINOS_LEITURA:
+        raise ValueError(f"Destino de leitura desconhecido: '{destino}'. Use um de {', '.join(DESTINOS_LEITURA)}.")
+    DESTINO_LEITURA = destino
+
+def caminho_copia_leitura():
+    """Arquivo da cópia de leitura: ao lado do banco, com o sufixo -leitura."""
+    base, extensao = os.path.splitext(NOME_BANCO_DADOS)
+    return f"{base}-leitura{extensao or '.db'}"
+
+def caminho_leitura():
+    """Arquivo que as leituras de relatório usam no destino atual."""
+    if DESTINO_LEITURA == 'copia' and not banco_em_memoria() and os.path.exists(caminho_copia_leitura()):
+        return caminho_copia_leitura()
+    return NOME_BANCO_DADOS
+
+def uri_leitura():
+    """URI somente leitura de caminho_leitura(); no banco em memória, o próprio URI dele."""
+    if banco_em_memoria():
+        return NOME_BANCO_DADOS
+    return f"file:{os.path.abspath(caminho_leitura())}?mode=ro"
+
+def conectar_leitura():
+    """Conexão para consultas de relatório, conforme DESTINO_LEITURA.
+
+    Dentro de um lote da fila de escrita (ou de terminal.py) a conexão do lote
+    é reaproveitada, como em conectar_bd(). Sem a cópia ainda criada, o destino
+    'copia' lê o banco principal em modo somente leitura.
+    """
+    if DESTINO_LEITURA == 'principal' or getattr(_contexto_lote, 'conexao', None) is not None:
+        return conectar_bd()
+    conn = sqlite3.connect(uri_leitura(), uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    conn.row_factory = sqlite3.Row
+    return conn, conn.cursor()
+
+# =============================================================================
+# DESTINO DO BANCO: ARQUIVO OU MEMÓRIA
+# =============================================================================
+# definir_banco() troca o banco usado por todo o módulo: um arquivo ou
+# ':memory:', para testes e demonstrações. O banco em memória é compartilhado
+# (cache=shared) entre as conexões do processo e existe enquanto a conexão
+# âncora guardada aqui estiver aberta; `limite_mb` limita o seu tamanho.
+# No cache compartilhado os bloqueios são por tabela e não esperam: o modo é
+# para um balcão por vez, não para as threads de relatório concorrentes.
+#
+# criar_snapshot() guarda uma cópia em memória do banco atual (já semeado) e
+# restaurar_snapshot() a devolve pela API de backup, em milissegundos, para
+# cada cenário de teste começar do mesmo estado.
+
+_ancora_memoria = None
+_bancos_em_memoria = itertools.count(1)
+
+def banco_em_memoria():
+    return NOME_BANCO_DADOS.startswith("file:") and "mode=memory" in NOME_BANCO_DADOS
+
+def definir_banco(destino, limite_mb=None):
+    """Passa a usar o arquivo `destino` ou, com ':memory:', um banco novo em memória.
+
+    Cria as tabelas no destino e retorna o NOME_BANCO_DADOS resultante.
+    """
+    global NOME_BANCO_DADOS, _ancora_memoria
+    fechar_conexoes()
+    if _ancora_memoria is not None:
+        _ancora_memoria.close()
+        _ancora_memoria = None
+    if destino == ':memory:':
+        NOME_BANCO_DADOS = f"file:locadora-memoria-{next(_bancos_em_memoria)}?mode=memory&cache=shared"
+        _ancora_memoria = sqlite3.connect(NOME_BANCO_DADOS, uri=True, check_same_thread=False)
+        if limite_mb:
+            tamanho_pagina = _ancora_memoria.execute("PRAGMA page_size").fetchone()[0]
+            _ancora_memoria.execute(f"PRAGMA max_page_count = {int(limite_mb * 2**20 // tamanho_pagina)}")
+    else:
+        NOME_BANCO_DADOS = destino
+    criar_tabelas()
+    return NOME_BANCO_DADOS
+
+def criar_snapshot():
+    """Cópia do banco atual numa conexão em memória própria, para restaurar_snapshot()."""
+    snapshot = sqlite3.connect(":memory:", check_same_thread=False)
+    conn, _ = conectar_bd()
+    try:
+        conn.backup(snapshot)
+    finally:
+        conn.close()
+    return snapshot
+
+def restaurar_snapshot(snapshot):
+    """Volta o banco atual ao estado de `snapshot` (de criar_snapshot())."""
+    conn, _ = conectar_bd()
+    try:
+        snapshot.backup(conn)
+    finally:
+        conn.close()
+    precificacao.descartar_tabelas()
+    marcar_restauracao()
+
+# =============================================================================
+# INSTRUÇÕES SQL REGISTRADAS
+# =============================================================================
+# As instruções fixas das operações de balcão e de cadastro ficam definidas
+# uma vez aqui, pelo nome. _executar() roda a instrução no cursor recebido e
+# soma, por nome, as chamadas e o tempo do execute() (para um SELECT, até a
+# primeira linha), lidos em estatisticas_instrucoes(). Com o texto sempre
+# igual, a conexão reaproveitada encontra a instrução já preparada.
+
+INSTRUCOES = {
+    # Contadores do painel e resumo por cliente
+    "ajustar_contador": "INSERT INTO estatisticas (chave, valor) VALUES (?, ?) "
+                        "ON CONFLICT(chave) DO UPDATE SET valor = valor + excluded.valor",
+    "resumo_aluguel_iniciado": """
+        INSERT INTO resumo_clientes (cpf, qtd_alugueis, alugueis_ativos, primeira_retirada, ultima_retirada)
+        VALUES (?, 1, 1, ?, ?)
+        ON CONFLICT(cpf) DO UPDATE SET
+            qtd_alugueis = qtd_alugueis + 1,
+            alugueis_ativos = alugueis_ativos + 1,
+            primeira_retirada = MIN(COALESCE(primeira_retirada, excluded.primeira_retirada), excluded.primeira_retirada),
+            ultima_retirada = MAX(COALESCE(ultima_retirada, excluded.ultima_retirada), excluded.ultima_retirada)
+    """,
+    "resumo_aluguel_finalizado": """
+        UPDATE resumo_clientes SET
+            qtd_finalizados = qtd_finalizados + 1,
+            alugueis_ativos = MAX(alugueis_ativos - 1, 0),
+            dias_alugados = dias_alugados + ?,
+            valor_gasto = valor_gasto + ?
+        WHERE cpf = ?
+    """,
+    "ler_resumo_cliente": "SELECT * FROM resumo_clientes WHERE cpf = ?",
+    "alugueis_ativos_do_cliente": "SELECT id, placa_carro, data_retirada, data_prevista FROM alugueis "
+                                  "WHERE cpf_cliente = ? AND status = 'Ativo' ORDER BY data_retirada",
+    "remover_resumo_cliente": "DELETE FROM resumo_clientes WHERE cpf = ?",
+    # Log de eventos
+    "ler_veiculos": "SELECT * FROM veiculos WHERE placa = ?",
+    "ler_clientes": "SELECT * FROM clientes WHERE cpf = ?",
+    "ler_alugueis": "SELECT * FROM alugueis WHERE id = ?",
+    "ler_manutencoes": "SELECT * FROM manutencoes WHERE id = ?",
+    "registrar_evento": "INSERT INTO eventos (instante, tipo, entidade, chave, antes, depois) VALUES (?, ?, ?, ?, ?, ?)",
+    "mudar_status_veiculo": "UPDATE veiculos SET status = ? WHERE placa = ?",
+    "ultimo_seq_eventos": "SELECT COALESCE(MAX(seq), 0) FROM eventos",
+    "posicao_consumidor": "SELECT ultimo_seq FROM consumidores_eventos WHERE nome = ?",
+    "confirmar_eventos": "INSERT INTO consumidores_eventos (nome, ultimo_seq) VALUES (?, ?) "
+                         "ON CONFLICT(nome) DO UPDATE SET ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq)",
+    "versao_dados": "PRAGMA data_version",
+    "chaves_alteradas": "SELECT seq, entidade, chave FROM eventos WHERE seq > ? ORDER BY seq LIMIT ?",
+    # Veículos e clientes
+    "inserir_veiculo": "INSERT INTO veiculos (placa, marca, modelo, ano, cor, valor_diaria, categoria_id) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "atualizar_veiculo": "UPDATE veiculos SET marca=?, modelo=?, ano=?, cor=?, valor_diaria=? WHERE placa=?",
+    "remover_veiculo": "DELETE FROM veiculos WHERE placa = ?",
+    "status_veiculo": "SELECT status FROM veiculos WHERE placa = ?",
+    "diaria_veiculo": "SELECT valor_diaria FROM veiculos WHERE placa = ?",
+    "inserir_cliente": "INSERT INTO clientes (cpf, nome, telefone, email) VALUES (?, ?, ?, ?)",
+    "atualizar_cliente": "UPDATE clientes SET nome=?, telefone=?, email=? WHERE cpf=?",
+    "remover_cliente": "DELETE FROM clientes WHERE cpf = ?",
+    "cliente_existe": "SELECT nome FROM clientes WHERE cpf = ?",
+    # Categorias
+    "ler_categoria": "SELECT * FROM categorias WHERE id = ?",
+    "inserir_categoria": "INSERT INTO categorias (nome, valor_diaria_padrao) VALUES (?, ?)",
+    "atualizar_categoria": "UPDATE categorias SET nome = ?, valor_diaria_padrao = ? WHERE id = ?",
+    "remover_categoria": "DELETE FROM categorias WHERE id = ?",
+    "remover_contador": "DELETE FROM estatisticas WHERE chave = ?",
+    "definir_categoria_veiculo": "UPDATE veiculos SET categoria_id = ? WHERE placa = ?",
+    "ler_contador": "SELECT valor FROM estatisticas WHERE chave = ?",
+    # Disponíveis da categoria, do alugado há mais tempo (ou nunca) para o mais recente
+    "candidatos_categoria": """
+        SELECT v.placa FROM veiculos AS v
+        WHERE v.categoria_id = ? AND v.status = 'Disponível'
+        ORDER BY (SELECT MAX(a.data_retirada) FROM alugueis AS a WHERE a.placa_carro = v.placa), v.placa
+    """,
+    # Aluguéis e manutenções
+    "inserir_aluguel": "INSERT INTO alugueis (placa_carro, cpf_cliente, data_retirada, status, data_prevista) "
+                       "VALUES (?, ?, ?, ?, ?)",
+    "aluguel_ativo_do_veiculo": "SELECT * FROM alugueis WHERE placa_carro = ? AND status = 'Ativo'",
+    "finalizar_aluguel": "UPDATE alugueis SET data_devolucao = ?, valor_total = ?, status = 'Finalizado' WHERE id = ?",
+    "inserir_manutencao": "INSERT INTO manutencoes (placa_carro, data_entrada, descricao, custo, status, plano_id) "
+                          "VALUES (?, ?, ?, ?, ?, ?)",
+    "atualizar_manutencao": "UPDATE manutencoes SET descricao = ?, custo = ? WHERE id = ?",
+    "manutencao_em_andamento": "SELECT * FROM manutencoes WHERE id = ? AND status = 'Em Andamento'",
+    "concluir_manutencao": "UPDATE manutencoes SET data_saida = ?, status = 'Concluída' WHERE id = ?",
+}
+
+# nome -> [chamadas, segundos]
+_estatisticas_instrucoes = {}
+_trava_estatisticas = threading.Lock()
+
+def _contabilizar(nome, segundos):
+    with _trava_estatisticas:
+        estatistica = _estatisticas_instrucoes.setdefault(nome, [0, 0.0])
+        estatistica[0] += 1
+        estatistica[1] += segundos
+
+def _executar(cursor, nome, params=(), sql=None):
+    """Executa a instrução `nome` de INSTRUCOES (ou `sql`, contabilizado como `nome`)."""
+    inicio = time.perf_counter()
+    try:
+        return cursor.execute(sql or INSTRUCOES[nome], params)
+    finally:
+        _contabilizar(nome, time.perf_counter() - inicio)
+
+def _executar_varios(cursor, nome, lista_params):
+    inicio = time.perf_counter()
+    try:
+        return cursor.executemany(INSTRUCOES[nome], lista_params)
+    finally:
+        _contabilizar(nome, time.perf_counter() - inicio)
+
+def estatisticas_instrucoes():
+    """Chamadas e tempo de cada instrução desde o início (ou a última zerada), da mais cara à mais barata."""
+    with _trava_estatisticas:
+        copia = {nome: tuple(valores) for nome, valores in _estatisticas_instrucoes.items()}
+    return sorted(({"nome": nome, "chamadas": chamadas, "total_ms": segundos * 1000,
+                    "media_us": segundos * 1e6 / chamadas}
+                   for nome, (chamadas, segundos) in copia.items()),
+                  key=lambda linha: linha["total_ms"], reverse=True)
+
+def zerar_estatisticas_instrucoes():
+    with _trava_estatisticas:
+        _estatisticas_instrucoes.clear()
+
+# Índices usados pelos filtros e ordenações de listar_*/buscar_historico.
+# As colunas de texto usam NOCASE para casar com LIKE e com a ordenação.
+INDICES_LISTAGENS = (
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_status ON veiculos (status)",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_marca_modelo ON veiculos (marca COLLATE NOCASE, modelo COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_modelo ON veiculos (modelo COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_ano ON veiculos (ano)",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_valor_diaria ON veiculos (valor_diaria)",
+    "CREATE INDEX IF NOT EXISTS idx_veiculos_categoria_status ON veiculos (categoria_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_data_retirada ON alugueis (data_retirada)",
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_status_retirada ON alugueis (status, data_retirada)",
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_cpf_retirada ON alugueis (cpf_cliente, data_retirada)",
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_placa_status ON alugueis (placa_carro, status)",
+    "CREATE INDEX IF NOT EXISTS idx_manutencoes_status_entrada ON manutencoes (status, data_entrada)",
+    "CREATE INDEX IF NOT EXISTS idx_manutencoes_placa_entrada ON manutencoes (placa_carro, data_entrada)",
+)
+
+# Índices de cobertura das consultas de analise.py: permitem agregar os
+# períodos de aluguel/manutenção e o faturamento sem ler as linhas da tabela.
+INDICES_ANALISE = (
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_analise ON alugueis (placa_carro, data_retirada, data_devolucao, valor_total)",
+    "CREATE INDEX IF NOT EXISTS idx_alugueis_devolucao ON alugueis (data_devolucao, data_retirada, valor_total)",
+    "CREATE INDEX IF NOT EXISTS idx_manutencoes_analise ON manutencoes (placa_carro, data_entrada, data_saida, custo)",
+    "CREATE INDEX IF NOT EXISTS idx_manutencoes_entrada ON manutencoes (data_entrada, custo)",
+    "CREATE INDEX IF NOT EXISTS idx_manutencoes_saida ON manutencoes (data_saida, data_entrada)",
+)
+
+def versao_esquema_atual():
+    """Retorna a versão do esquema gravada no banco (0 se nunca foi criado)."""
+    conn, cursor = conectar_bd()
+    try:
+        return cursor.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+def criar_tabelas(forcar=False):
+    """Cria as tabelas do banco de dados se elas não existirem.
+
+    Se o banco já estiver na VERSAO_ESQUEMA, nenhum DDL é executado.
+    """
+    # A conexão ociosa desta thread pode ser de um arquivo apagado e recriado
+    # no mesmo caminho (ex.: réplica do terminal refeita): ela ainda enxergaria
+    # o esquema antigo, e o DDL seria pulado.
+    ociosa = _conexoes_ociosas.__dict__.pop(NOME_BANCO_DADOS, None)
+    if ociosa is not None:
+        ociosa.fechar()
+    if not forcar and versao_esquema_atual() >= VERSAO_ESQUEMA:
+        return
     conn, cursor = conectar_bd()
     try:
+        # WAL: leitores (relatórios, backup.py) não bloqueiam as gravações e vice-versa
+        cursor.execute("PRAGMA journal_mode = WAL")
+
+        # Categorias de veículos (ver CATEGORIAS DE VEÍCULOS)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS categorias (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                valor_diaria_padrao REAL NOT NULL
+            );
+        """)
+
         # Tabela de Veículos
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS veiculos (
@@ -29,9 +460,13 @@ def criar_tabelas():
                 ano INTEGER NOT NULL,
                 cor TEXT NOT NULL,
                 valor_diaria REAL NOT NULL,
-                status TEXT NOT NULL DEFAULT 'Disponível'
+                status TEXT NOT NULL DEFAULT 'Disponível',
+                categoria_id INTEGER REFERENCES categorias (id) ON DELETE RESTRICT
             );
         """)
+        # Bancos criados antes das categorias
+        if 'categoria_id' not in {coluna[1] for coluna in cursor.execute("PRAGMA table_info(veiculos)")}:
+            cursor.execute("ALTER TABLE veiculos ADD COLUMN categoria_id INTEGER REFERENCES categorias (id) ON DELETE RESTRICT")
         
         # Tabela de Clientes
         cursor.execute("""
@@ -53,10 +488,14 @@ def criar_tabelas():
                 data_devolucao TEXT,
                 valor_total REAL,
                 status TEXT NOT NULL,
+                data_prevista TEXT,
                 FOREIGN KEY (placa_carro) REFERENCES veiculos (placa) ON DELETE RESTRICT,
                 FOREIGN KEY (cpf_cliente) REFERENCES clientes (cpf) ON DELETE RESTRICT
             );
         """)
+        # Bancos criados antes da data prevista de devolução (usada na multa por atraso)
+        if 'data_prevista' not in {coluna[1] for coluna in cursor.execute("PRAGMA table_info(alugueis)")}:
+            cursor.execute("ALTER TABLE alugueis ADD COLUMN data_prevista TEXT")
 
         # Tabela de Manutenções
         cursor.execute("""
@@ -68,10 +507,174 @@ def criar_tabelas():
                 descricao TEXT NOT NULL,
                 custo REAL NOT NULL,
                 status TEXT NOT NULL,
+                plano_id INTEGER,
                 FOREIGN KEY (placa_carro) REFERENCES veiculos (placa) ON DELETE RESTRICT
             );
         """)
-        
+        # Bancos criados antes dos planos de manutenção preventiva
+        if 'plano_id' not in {coluna[1] for coluna in cursor.execute("PRAGMA table_info(manutencoes)")}:
+            cursor.execute("ALTER TABLE manutencoes ADD COLUMN plano_id INTEGER")
+
+        # Contadores do painel (ver _ajustar_contadores)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS estatisticas (
+                chave TEXT PRIMARY KEY,
+                valor REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+        # Log de eventos (ver _registrar_evento)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS eventos (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                instante TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                entidade TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                antes TEXT,
+                depois TEXT
+            );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_eventos_entidade_chave ON eventos (entidade, chave, seq)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS consumidores_eventos (
+                nome TEXT PRIMARY KEY,
+                ultimo_seq INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+
+        # Partições anuais criadas por arquivamento.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS particoes_arquivo (
+                tabela_origem TEXT NOT NULL,
+                ano INTEGER NOT NULL,
+                nome TEXT NOT NULL UNIQUE,
+                qtd INTEGER NOT NULL DEFAULT 0,
+                inicio_min TEXT,
+                inicio_max TEXT,
+                fim_min TEXT,
+                fim_max TEXT,
+                PRIMARY KEY (tabela_origem, ano)
+            );
+        """)
+        _migrar_particoes(cursor)
+
+        # Totais de cada cliente (ver _resumo_aluguel_iniciado); na criação da
+        # tabela, preenchidos a partir do histórico já gravado
+        resumo_novo = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumo_clientes'").fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS resumo_clientes (
+                cpf TEXT PRIMARY KEY,
+                qtd_alugueis INTEGER NOT NULL DEFAULT 0,
+                qtd_finalizados INTEGER NOT NULL DEFAULT 0,
+                alugueis_ativos INTEGER NOT NULL DEFAULT 0,
+                valor_gasto REAL NOT NULL DEFAULT 0,
+                dias_alugados REAL NOT NULL DEFAULT 0,
+                primeira_retirada TEXT,
+                ultima_retirada TEXT,
+                FOREIGN KEY (cpf) REFERENCES clientes (cpf) ON DELETE CASCADE
+            );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_alugueis_cpf_ativo ON alugueis (cpf_cliente) WHERE status = 'Ativo'")
+        if resumo_novo:
+            _reconstruir_resumo_clientes(cursor)
+
+        # Operações enviadas pelos terminais offline (terminal.py), para que um
+        # reenvio depois de uma falha não aplique a mesma operação duas vezes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS operacoes_recebidas (
+                terminal TEXT NOT NULL,
+                operacao_id INTEGER NOT NULL,
+                recebida_em TEXT NOT NULL,
+                sucesso INTEGER NOT NULL,
+                mensagens TEXT,
+                PRIMARY KEY (terminal, operacao_id)
+            );
+        """)
+
+        # Regras de preço (precificacao.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS temporadas_preco (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT NOT NULL,
+                inicio TEXT NOT NULL,
+                fim TEXT NOT NULL,
+                fator REAL NOT NULL
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS faixas_duracao_preco (
+                dias_minimos INTEGER PRIMARY KEY,
+                desconto REAL NOT NULL
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS descontos_clientes (
+                cpf TEXT PRIMARY KEY,
+                desconto REAL NOT NULL,
+                FOREIGN KEY (cpf) REFERENCES clientes (cpf) ON DELETE CASCADE
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS parametros_preco (
+                chave TEXT PRIMARY KEY,
+                valor REAL NOT NULL
+            );
+        """)
+        # Qualquer alteração nas regras muda a versão, e quem tem a tabela de
+        # preços compilada em memória sabe que precisa recarregá-la.
+        cursor.execute("INSERT OR IGNORE INTO estatisticas (chave, valor) VALUES (?, 0)",
+                       (precificacao.CHAVE_VERSAO_REGRAS,))
+        for tabela in precificacao.TABELAS_REGRAS:
+            for operacao in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{operacao.lower()} AFTER {operacao} ON {tabela}
+                    BEGIN
+                        UPDATE estatisticas SET valor = valor + 1 WHERE chave = '{precificacao.CHAVE_VERSAO_REGRAS}';
+                    END
+                """)
+
+        # Manutenção preventiva (manutencao_preventiva.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS planos_manutencao (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                descricao TEXT NOT NULL,
+                placa TEXT,
+                intervalo_dias INTEGER,
+                intervalo_alugueis INTEGER,
+                custo_estimado REAL NOT NULL DEFAULT 0,
+                antecedencia_dias INTEGER NOT NULL DEFAULT 7,
+                antecedencia_alugueis INTEGER NOT NULL DEFAULT 2,
+                bloquear_aluguel INTEGER NOT NULL DEFAULT 1,
+                criado_em TEXT NOT NULL
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS agenda_manutencao (
+                placa TEXT NOT NULL,
+                plano_id INTEGER NOT NULL,
+                ultima_execucao TEXT,
+                vence_em TEXT,
+                alugueis_desde INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (placa, plano_id)
+            );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_manutencao_vence ON agenda_manutencao (vence_em)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agenda_manutencao_plano ON agenda_manutencao (plano_id)")
+        # Parcial: só as manutenções concluídas de um plano contam como última execução
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_manutencoes_plano ON manutencoes (plano_id, placa_carro, data_saida) WHERE status = 'Concluída'")
+        for gatilho in manutencao_preventiva.GATILHOS_AGENDA:
+            cursor.execute(gatilho)
+
+        # Índices para os filtros e ordenações das listagens
+        for indice in INDICES_LISTAGENS + INDICES_ANALISE:
+            cursor.execute(indice)
+
+        _normalizar_datas(cursor)
+        _recalcular_contadores(cursor)
+
+        cursor.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
         conn.commit()
     except Exception as e:
         print(f"Erro ao criar tabelas: {e}")
@@ -79,86 +682,780 @@ def criar_tabelas():
         conn.close()
 
 # =============================================================================
-# FUNÇÕES DE VALIDAÇÃO (CORRIGIDA)
+# DATAS E HORÁRIOS
 # =============================================================================
+# Datas com hora são gravadas como texto 'AAAA-MM-DD HH:MM:SS' (hora local).
+# Com largura fixa e do campo mais significativo para o menos, a ordem do
+# texto é a ordem cronológica: os filtros de período comparam a coluna pura
+# com limites no mesmo formato (início inclusivo, fim exclusivo) e são
+# varreduras de faixa no índice da coluna. O que impede o uso do índice é
+# aplicar uma função à coluna, como date(data_devolucao), ou ter linhas
+# gravadas em outro formato; normalizar_datas() converte as linhas antigas.
 
-def validar_placa(placa):
-    """Valida placas no formato antigo (ABC-1234) e Mercosul (ABC1D23)."""
-    if not isinstance(placa, str) or not placa.strip():
-        return "O campo 'Placa' é obrigatório."
-    placa = placa.upper().strip()
-    
-    padrao_mercosul = re.compile(r'^[A-Z]{3}\d[A-Z]\d{2}$')
-    padrao_antigo = re.compile(r'^[A-Z]{3}-\d{4}$')
-    
-    # CORREÇÃO: Verifica a 'placa' diretamente contra os dois padrões.
-    if padrao_mercosul.match(placa) or padrao_antigo.match(placa):
-        return None
-        
-    return "Formato de placa inválido. Use 'ABC1D23' ou 'ABC-1234'."
+FORMATO_DATA_HORA = '%Y-%m-%d %H:%M:%S'
+
+# Colunas de data e hora de cada tabela (e das partições de arquivo dela)
+COLUNAS_DATA = {
+    "alugueis": ("data_retirada", "data_devolucao", "data_prevista"),
+    "manutencoes": ("data_entrada", "data_saida"),
+}
+_PADRAO_DATA_HORA = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]"
 
-def validar_ano(ano):
-    if not ano: return "O campo 'Ano' é obrigatório."
+def agora_texto():
+    return datetime.now().strftime(FORMATO_DATA_HORA)
+
+def como_texto(instante):
+    return instante.strftime(FORMATO_DATA_HORA)
+
+def como_datetime(texto):
+    """Lê uma data gravada no banco; fromisoformat é bem mais rápido que strptime."""
+    return datetime.fromisoformat(texto)
+
+def dia_seguinte(data):
+    """'AAAA-MM-DD' do dia seguinte: o limite exclusivo de um período que termina em `data`."""
+    return (datetime.strptime(data, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def _normalizar_datas(cursor):
+    """Converte para 'AAAA-MM-DD HH:MM:SS' as datas gravadas em outro formato ISO.
+
+    Retorna ({tabela.coluna: convertidas}, {tabela.coluna: não reconhecidas}).
+    """
+    convertidas, invalidas = {}, {}
+    tabelas = [(tabela, tabela) for tabela in COLUNAS_DATA]
+    tabelas += cursor.execute("SELECT tabela_origem, nome FROM particoes_arquivo").fetchall()
+    for origem, tabela in tabelas:
+        existentes = {coluna[1] for coluna in cursor.execute(f"PRAGMA table_info({tabela})")}
+        alteradas = 0
+        for coluna in COLUNAS_DATA[origem]:
+            if coluna not in existentes:
+                continue
+            fora_do_padrao = f"{coluna} IS NOT NULL AND {coluna} NOT GLOB '{_PADRAO_DATA_HORA}'"
+            cursor.execute(
+                f"UPDATE {tabela} SET {coluna} = strftime('%Y-%m-%d %H:%M:%S', {coluna}) "
+                f"WHERE {fora_do_padrao} AND strftime('%Y-%m-%d %H:%M:%S', {coluna}) IS NOT NULL"
+            )
+            qtd = cursor.execute("SELECT changes()").fetchone()[0]
+            if qtd:
+                convertidas[f"{tabela}.{coluna}"] = qtd
+                alteradas += qtd
+            restantes = cursor.execute(f"SELECT COUNT(*) FROM {tabela} WHERE {fora_do_padrao}").fetchone()[0]
+            if restantes:
+                invalidas[f"{tabela}.{coluna}"] = restantes
+        if alteradas and tabela != origem:
+            # A faixa de datas da partição é usada para escolher onde procurar
+            col_inicio, col_fim = TABELAS_ARQUIVAVEIS[origem][:2]
+            cursor.execute(f"""
+                UPDATE particoes_arquivo SET
+                    inicio_min = faixa.inicio_min, inicio_max = faixa.inicio_max,
+                    fim_min = faixa.fim_min, fim_max = faixa.fim_max
+                FROM (SELECT MIN({col_inicio}) AS inicio_min, MAX({col_inicio}) AS inicio_max,
+                             MIN({col_fim}) AS fim_min, MAX({col_fim}) AS fim_max FROM {tabela}) AS faixa
+                WHERE nome = ?
+            """, (tabela,))
+    return convertidas, invalidas
+
+def normalizar_datas():
+    """Migração de bancos antigos: deixa todas as datas no formato usado pelos filtros de período."""
+    conn, cursor = conectar_bd()
     try:
-        ano_int = int(ano)
-        ano_atual = datetime.now().year
-        if not (1950 <= ano_int <= ano_atual + 1):
-            return f"Ano inválido. Deve ser entre 1950 e {ano_atual + 1}."
-        return None
-    except (ValueError, TypeError):
-        return "O ano deve ser um número inteiro válido."
+        convertidas, invalidas = _normalizar_datas(cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao normalizar as datas: {e}"])
+    finally:
+        conn.close()
+    msgs = [f"{coluna}: {qtd} data(s) convertida(s)." for coluna, qtd in convertidas.items()]
+    msgs += [f"{coluna}: {qtd} data(s) em formato não reconhecido, corrija manualmente." for coluna, qtd in invalidas.items()]
+    return (not invalidas, msgs or ["Todas as datas já estão no formato 'AAAA-MM-DD HH:MM:SS'."])
+
+# =============================================================================
+# CONTADORES DO PAINEL
+# =============================================================================
+# A tabela `estatisticas` guarda contadores que as funções de escrita ajustam
+# na mesma transação em que alteram veículos, aluguéis e manutenções: se a
+# operação falhar, o ajuste é desfeito junto. O painel lê só essas linhas,
+# qualquer que seja o tamanho do banco. reconciliar_contadores() recalcula
+# tudo a partir das tabelas e corrige eventuais divergências.
+
+CONTADOR_POR_STATUS = {
+    'Disponível': 'veiculos_disponiveis',
+    'Alugado': 'veiculos_alugados',
+    'Em Manutenção': 'veiculos_em_manutencao',
+}
+CONTADORES = tuple(CONTADOR_POR_STATUS.values()) + ('alugueis_ativos', 'manutencoes_em_andamento')
+
+def _chave_receita_dia(data):
+    """Chave do faturamento do dia 'AAAA-MM-DD' (devoluções realizadas no dia)."""
+    return f"receita_dia:{data}"
+
+def _chave_disponiveis_categoria(categoria_id):
+    """Chave dos veículos disponíveis da categoria (ver CATEGORIAS DE VEÍCULOS)."""
+    return f"disponiveis_categoria:{categoria_id}"
 
-def validar_valor(valor):
-    if not valor: return "O campo 'Valor' é obrigatório."
+def _ajustar_contadores(cursor, **deltas):
+    _executar_varios(cursor, "ajustar_contador", list(deltas.items()))
+
+def _recalcular_contadores(cursor):
+    """Recalcula os contadores a partir das tabelas; retorna {chave: (antes, depois)} do que mudou."""
+    hoje = datetime.now().strftime('%Y-%m-%d')
+    corretos = dict.fromkeys(CONTADORES, 0)
+    cursor.execute("SELECT status, COUNT(*) FROM veiculos GROUP BY status")
+    for status, qtd in cursor.fetchall():
+        if status in CONTADOR_POR_STATUS:
+            corretos[CONTADOR_POR_STATUS[status]] = qtd
+    corretos['alugueis_ativos'] = cursor.execute(
+        "SELECT COUNT(*) FROM alugueis WHERE status = 'Ativo'").fetchone()[0]
+    corretos['manutencoes_em_andamento'] = cursor.execute(
+        "SELECT COUNT(*) FROM manutencoes WHERE status = 'Em Andamento'").fetchone()[0]
+    for (categoria_id,) in cursor.execute("SELECT id FROM categorias").fetchall():
+        corretos[_chave_disponiveis_categoria(categoria_id)] = 0
+    cursor.execute("SELECT categoria_id, COUNT(*) FROM veiculos "
+                   "WHERE status = 'Disponível' AND categoria_id IS NOT NULL GROUP BY categoria_id")
+    for categoria_id, qtd in cursor.fetchall():
+        corretos[_chave_disponiveis_categoria(categoria_id)] = qtd
+    corretos[_chave_receita_dia(hoje)] = cursor.execute(
+        "SELECT TOTAL(valor_total) FROM alugueis WHERE data_devolucao >= ? AND data_devolucao < ?",
+        (hoje, dia_seguinte(hoje))
+    ).fetchone()[0]
+
+    cursor.execute(f"SELECT chave, valor FROM estatisticas WHERE chave IN ({', '.join('?' * len(corretos))})",
+                   list(corretos))
+    atuais = {chave: valor for chave, valor in cursor.fetchall()}
+    divergencias = {chave: (atuais.get(chave), valor) for chave, valor in corretos.items()
+                    if atuais.get(chave) is None or abs(atuais[chave] - valor) > 1e-6}
+    cursor.executemany(
+        "INSERT INTO estatisticas (chave, valor) VALUES (?, ?) "
+        "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+        [(chave, depois) for chave, (_, depois) in divergencias.items()]
+    )
+    return divergencias
+
+def reconciliar_contadores():
+    """Confere os contadores do painel com as tabelas e corrige os que divergirem."""
+    conn, cursor = conectar_bd()
     try:
-        valor_float = float(str(valor).replace(",", "."))
-        if valor_float < 0:
-            return "O valor não pode ser negativo."
-        return None
-    except (ValueError, TypeError):
-        return "O valor deve ser um número válido."
+        divergencias = _recalcular_contadores(cursor)
+        conn.commit()
+        if not divergencias:
+            return (True, ["Contadores conferidos: nenhuma divergência."])
+        return (True, [f"{chave}: {antes} -> {depois}" for chave, (antes, depois) in divergencias.items()])
+    except Exception as e:
+        return (False, [f"Erro ao reconciliar contadores: {e}"])
+    finally:
+        conn.close()
 
-def validar_cpf(cpf):
-    if not cpf: return "O campo 'CPF' é obrigatório."
-    cpf_numerico = ''.join(filter(str.isdigit, str(cpf)))
-    if len(cpf_numerico) != 11 or len(set(cpf_numerico)) == 1:
-        return "CPF inválido. Verifique o número digitado."
-    
-    soma = sum(int(cpf_numerico[i]) * (10 - i) for i in range(9))
-    d1 = (soma * 10) % 11
-    if d1 == 10: d1 = 0
-    if d1 != int(cpf_numerico[9]):
-        return "CPF inválido. Verifique o número digitado."
+def obter_painel():
+    """Lê os contadores do painel e o faturamento de hoje (sem varrer as tabelas)."""
+    chave_receita = _chave_receita_dia(datetime.now().strftime('%Y-%m-%d'))
+    chaves = CONTADORES + (chave_receita,)
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute(f"SELECT chave, valor FROM estatisticas WHERE chave IN ({', '.join('?' * len(chaves))})",
+                       chaves)
+        valores = {chave: valor for chave, valor in cursor.fetchall()}
+    finally:
+        conn.close()
+    painel = {chave: int(valores.get(chave, 0)) for chave in CONTADORES}
+    painel['receita_hoje'] = valores.get(chave_receita, 0.0)
+    return painel
+
+# =============================================================================
+# RESUMO POR CLIENTE
+# =============================================================================
+# resumo_clientes guarda os totais de toda a vida de cada cliente: aluguéis,
+# gasto, dias alugados, primeira e última retirada e aluguéis em andamento.
+# realizar_aluguel e realizar_devolucao ajustam a linha do cliente na mesma
+# transação, como fazem com os contadores do painel, e o perfil mostrado no
+# balcão é uma leitura pela chave primária. Os totais incluem os aluguéis já
+# arquivados (o arquivamento não mexe nesta tabela); reconstruir_resumo_clientes()
+# refaz tudo a partir da tabela principal e das partições.
+
+_RESUMO_VAZIO = {
+    "qtd_alugueis": 0, "qtd_finalizados": 0, "alugueis_ativos": 0, "valor_gasto": 0.0,
+    "dias_alugados": 0.0, "primeira_retirada": None, "ultima_retirada": None,
+}
 
-    soma = sum(int(cpf_numerico[i]) * (11 - i) for i in range(10))
-    d2 = (soma * 10) % 11
-    if d2 == 10: d2 = 0
-    if d2 != int(cpf_numerico[10]):
-        return "CPF inválido. Verifique o número digitado."
+def _resumo_aluguel_iniciado(cursor, cpf, data_retirada):
+    _executar(cursor, "resumo_aluguel_iniciado", (cpf, data_retirada, data_retirada))
 
-    return None
+def _resumo_aluguel_finalizado(cursor, cpf, dias_alugados, valor_total):
+    _executar(cursor, "resumo_aluguel_finalizado", (dias_alugados, valor_total, cpf))
+
+def _reconstruir_resumo_clientes(cursor):
+    """Recalcula resumo_clientes inteira a partir dos aluguéis; retorna quantos clientes têm aluguéis."""
+    fonte = fonte_com_arquivo(cursor, "alugueis")
+    cursor.execute("DELETE FROM resumo_clientes")
+    cursor.execute(f"""
+        INSERT INTO resumo_clientes (cpf, qtd_alugueis, qtd_finalizados, alugueis_ativos, valor_gasto,
+                                     dias_alugados, primeira_retirada, ultima_retirada)
+        SELECT cpf_cliente, COUNT(*), SUM(status = 'Finalizado'), SUM(status = 'Ativo'),
+               TOTAL(CASE WHEN status = 'Finalizado' THEN valor_total END),
+               TOTAL(CASE WHEN status = 'Finalizado' THEN julianday(data_devolucao) - julianday(data_retirada) END),
+               MIN(data_retirada), MAX(data_retirada)
+        FROM {fonte}
+        GROUP BY cpf_cliente
+    """)
+    return cursor.execute("SELECT changes()").fetchone()[0]
+
+def reconstruir_resumo_clientes():
+    """Refaz os totais de todos os clientes a partir do histórico (carga inicial ou correção)."""
+    conn, cursor = conectar_bd()
+    try:
+        qtd = _reconstruir_resumo_clientes(cursor)
+        conn.commit()
+        return (True, [f"Resumo reconstruído para {qtd} cliente(s) com aluguéis."])
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao reconstruir o resumo dos clientes: {e}"])
+    finally:
+        conn.close()
+
+def obter_resumo_cliente(cpf):
+    """Perfil do cliente: os totais de resumo_clientes, a duração média e os aluguéis em andamento."""
+    cpf_limpo = limpar_cpf(cpf)
+    conn, cursor = conectar_bd()
+    try:
+        _executar(cursor, "ler_resumo_cliente", (cpf_limpo,))
+        linha = cursor.fetchone()
+        resumo = dict(linha) if linha else dict(_RESUMO_VAZIO, cpf=cpf_limpo)
+        resumo["em_andamento"] = []
+        if resumo["alugueis_ativos"]:
+            _executar(cursor, "alugueis_ativos_do_cliente", (cpf_limpo,))
+            resumo["em_andamento"] = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    resumo["media_dias"] = resumo["dias_alugados"] / resumo["qtd_finalizados"] if resumo["qtd_finalizados"] else 0.0
+    return resumo
 
 # =============================================================================
-# OPERAÇÕES CRUD - VEÍCULOS
+# LOG DE EVENTOS
 # =============================================================================
-def adicionar_veiculo(placa, marca, modelo, ano, cor, valor_diaria):
-    erros = list(filter(None, [
-        validar_placa(placa),
-        "O campo 'Marca' é obrigatório." if not marca.strip() else None,
-        "O campo 'Modelo' é obrigatório." if not modelo.strip() else None,
-        validar_ano(ano),
-        "O campo 'Cor' é obrigatório." if not cor.strip() else None,
-        validar_valor(valor_diaria)
-    ]))
-    if erros:
-        return (False, erros)
+# Toda operação que altera veículos, clientes, aluguéis ou manutenções grava,
+# na mesma transação, um evento por linha alterada com a linha antes e depois
+# (em JSON). Quem precisa acompanhar as mudanças (relatórios, sincronização)
+# lê os eventos depois do último `seq` que já processou, em vez de varrer as
+# tabelas. O `seq` só cresce, mesmo depois de uma compactação.
+
+CHAVE_POR_TABELA = {"veiculos": "placa", "clientes": "cpf", "alugueis": "id", "manutencoes": "id"}
+
+def _ler_linha(cursor, tabela, chave):
+    _executar(cursor, f"ler_{tabela}", (chave,))
+    linha = cursor.fetchone()
+    return dict(linha) if linha else None
+
+def _registrar_evento(cursor, tipo, tabela, chave, antes=None, removido=False):
+    """Grava o evento com a linha `antes` e a linha atual da tabela (nenhuma se `removido`)."""
+    depois = None if removido else _ler_linha(cursor, tabela, chave)
+    _executar(
+        cursor, "registrar_evento",
+        (agora_texto(), tipo, tabela, str(chave),
+         json.dumps(antes, ensure_ascii=False) if antes is not None else None,
+         json.dumps(depois, ensure_ascii=False) if depois is not None else None)
+    )
+
+def _mudar_status_veiculo(cursor, placa, novo_status):
+    antes = _ler_linha(cursor, "veiculos", placa)
+    _executar(cursor, "mudar_status_veiculo", (novo_status, placa))
+    _registrar_evento(cursor, "veiculo_status_alterado", "veiculos", placa, antes)
+    # Aluguéis, devoluções e manutenções passam todos por aqui: o contador da
+    # categoria muda na mesma transação
+    if antes and antes["categoria_id"] is not None and (antes["status"] == 'Disponível') != (novo_status == 'Disponível'):
+        _ajustar_contadores(cursor, **{_chave_disponiveis_categoria(antes["categoria_id"]):
+                                       1 if novo_status == 'Disponível' else -1})
+
+def _evento_como_dict(linha):
+    evento = dict(linha)
+    for campo in ("antes", "depois"):
+        if evento[campo] is not None:
+            evento[campo] = json.loads(evento[campo])
+    return evento
 
+def ler_eventos(apos_seq=0, limite=1000, tipos=None, entidade=None):
+    """Eventos com seq > apos_seq, em ordem, até `limite` (uma varredura pela chave primária)."""
+    query = "SELECT * FROM eventos WHERE seq > ?"
+    params = [apos_seq]
+    if tipos:
+        query += f" AND tipo IN ({', '.join('?' * len(tipos))})"
+        params += list(tipos)
+    if entidade:
+        query += " AND entidade = ?"
+        params.append(entidade)
+    query += " ORDER BY seq LIMIT ?"
+    params.append(int(limite))
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute(query, params)
+        return [_evento_como_dict(linha) for linha in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def ultimo_seq_eventos():
+    conn, cursor = conectar_bd()
+    try:
+        return _executar(cursor, "ultimo_seq_eventos").fetchone()[0]
+    finally:
+        conn.close()
+
+def posicao_consumidor(nome):
+    """Último seq confirmado pelo consumidor `nome` (0 se ainda não leu nada)."""
+    conn, cursor = conectar_bd()
+    try:
+        linha = _executar(cursor, "posicao_consumidor", (nome,)).fetchone()
+        return linha[0] if linha else 0
+    finally:
+        conn.close()
+
+def confirmar_eventos(nome, ate_seq):
+    """Registra que o consumidor `nome` já processou os eventos até `ate_seq`."""
+    conn, cursor = conectar_bd()
+    try:
+        _executar(cursor, "confirmar_eventos", (nome, ate_seq))
+        conn.commit()
+    finally:
+        conn.close()
+
+def acompanhar_eventos(nome, tamanho_lote=500, intervalo=1.0, parar=None):
+    """Gerador que entrega os eventos novos ao consumidor `nome`, indefinidamente.
+
+    Começa depois da última posição confirmada e confirma cada lote assim que
+    o consumidor pede o próximo. Quando não há eventos novos, espera
+    `intervalo` segundos; `parar` (threading.Event) encerra o gerador.
+    """
+    apos_seq = posicao_consumidor(nome)
+    while parar is None or not parar.is_set():
+        lote = ler_eventos(apos_seq, tamanho_lote)
+        if not lote:
+            if parar is not None:
+                parar.wait(intervalo)
+            else:
+                time.sleep(intervalo)
+            continue
+        yield from lote
+        apos_seq = lote[-1]["seq"]
+        confirmar_eventos(nome, apos_seq)
+
+def compactar_eventos(ate_seq=None):
+    """Apaga os eventos com seq <= ate_seq que já têm um evento mais novo da mesma linha.
+
+    Sem `ate_seq`, usa a menor posição confirmada entre os consumidores, para
+    não apagar eventos que alguém ainda não leu. O estado final de cada linha
+    continua reconstruível a partir do log. Retorna (True, [mensagem]).
+    """
+    conn, cursor = conectar_bd()
+    try:
+        if ate_seq is None:
+            ate_seq = cursor.execute("SELECT COALESCE(MIN(ultimo_seq), 0) FROM consumidores_eventos").fetchone()[0]
+        cursor.execute("""
+            DELETE FROM eventos
+            WHERE seq <= ? AND seq < (
+                SELECT MAX(posterior.seq) FROM eventos AS posterior
+                WHERE posterior.entidade = eventos.entidade AND posterior.chave = eventos.chave
+            )
+        """, (ate_seq,))
+        removidos = cursor.rowcount
+        conn.commit()
+        return (True, [f"{removidos} evento(s) compactado(s) até o seq {ate_seq}."])
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao compactar eventos: {e}"])
+    finally:
+        conn.close()
+
+# =============================================================================
+# AVISO DE ALTERAÇÕES ENTRE JANELAS
+# =============================================================================
+# Várias janelas (ou balcões) abertas no mesmo banco descobrem o que as outras
+# alteraram sem recarregar as listas. O ObservadorAlteracoes mantém uma conexão
+# própria e, a cada verificar(), lê o PRAGMA data_version: o número só muda
+# quando outra conexão confirma uma transação, e a leitura não toca nas
+# tabelas nem pega bloqueio. Só quando ele muda o observador lê do log de
+# eventos as chaves alteradas (sem o JSON antes/depois) e as entrega agrupadas
+# por tabela, para as telas buscarem e trocarem apenas essas linhas.
+
+# Acima disso numa tabela (importação, arquivamento), recarregar a lista sai mais barato.
+LIMITE_CHAVES_ALTERADAS = 500
+# Um backup ou snapshot restaurado volta o log de eventos, e os seq seguintes
+# repetem números já vistos. Quem restaura grava aqui um valor aleatório novo;
+# o observador que encontra outro valor recarrega tudo.
+CHAVE_GERACAO_BANCO = 'geracao_banco'
+
+def marcar_restauracao():
+    """Registra que o conteúdo do banco foi substituído (backup ou snapshot restaurado)."""
     conn, cursor = conectar_bd()
     try:
         cursor.execute(
-            "INSERT INTO veiculos (placa, marca, modelo, ano, cor, valor_diaria) VALUES (?, ?, ?, ?, ?, ?)",
-            (placa.upper().strip(), marca.strip(), modelo.strip(), int(ano), cor.strip(), float(str(valor_diaria).replace(",", ".")))
+            "INSERT INTO estatisticas (chave, valor) VALUES (?, ?) "
+            "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            (CHAVE_GERACAO_BANCO, random.getrandbits(52))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+class ObservadorAlteracoes:
+    def __init__(self):
+        self._abrir()
+
+    def _abrir(self):
+        self.caminho = NOME_BANCO_DADOS
+        self._conn = sqlite3.connect(self.caminho, uri=True)
+        self._conn.execute("PRAGMA query_only = ON")
+        self._cursor = self._conn.cursor()
+        self._versao = _executar(self._cursor, "versao_dados").fetchone()[0]
+        self._geracao = self._ler_geracao()
+        self.ultimo_seq = _executar(self._cursor, "ultimo_seq_eventos").fetchone()[0]
+
+    def _ler_geracao(self):
+        linha = _executar(self._cursor, "ler_contador", (CHAVE_GERACAO_BANCO,)).fetchone()
+        return linha[0] if linha else None
+
+    def fechar(self):
+        self._conn.close()
+
+    def verificar(self):
+        """Chaves alteradas desde a última chamada: {tabela: conjunto de chaves}.
+
+        As chaves seguem CHAVE_POR_TABELA (placa, cpf, id). Uma tabela com
+        None no lugar das chaves deve ser recarregada inteira: alterações
+        demais de uma vez, ou o banco foi trocado ou restaurado.
+        """
+        if self.caminho != NOME_BANCO_DADOS:
+            self.fechar()
+            self._abrir()
+            return dict.fromkeys(CHAVE_POR_TABELA)
+        versao = _executar(self._cursor, "versao_dados").fetchone()[0]
+        if versao == self._versao:
+            return {}
+        self._versao = versao
+
+        geracao = self._ler_geracao()
+        if geracao != self._geracao:
+            # Backup ou snapshot restaurado, mesmo que já haja escritas depois dele
+            self._geracao = geracao
+            self.ultimo_seq = _executar(self._cursor, "ultimo_seq_eventos").fetchone()[0]
+            return dict.fromkeys(CHAVE_POR_TABELA)
+
+        alteracoes = {}
+        _executar(self._cursor, "chaves_alteradas", (self.ultimo_seq, LIMITE_CHAVES_ALTERADAS * len(CHAVE_POR_TABELA)))
+        linhas = self._cursor.fetchall()
+        if not linhas:
+            ultimo_seq = _executar(self._cursor, "ultimo_seq_eventos").fetchone()[0]
+            if ultimo_seq < self.ultimo_seq:
+                # O log voltou atrás: banco substituído sem marcar_restauracao()
+                self.ultimo_seq = ultimo_seq
+                return dict.fromkeys(CHAVE_POR_TABELA)
+            return {}
+        for _, tabela, chave in linhas:
+            chaves = alteracoes.setdefault(tabela, set())
+            if chaves is not None:
+                chaves.add(int(chave) if CHAVE_POR_TABELA[tabela] == "id" else chave)
+                if len(chaves) > LIMITE_CHAVES_ALTERADAS:
+                    alteracoes[tabela] = None
+        self.ultimo_seq = linhas[-1][0]
+        if len(linhas) == LIMITE_CHAVES_ALTERADAS * len(CHAVE_POR_TABELA):
+            # Ainda há eventos depois do lote: as telas recarregam tudo e o observador pula para o fim
+            self.ultimo_seq = _executar(self._cursor, "ultimo_seq_eventos").fetchone()[0]
+            return dict.fromkeys(CHAVE_POR_TABELA)
+        return alteracoes
+
+# =============================================================================
+# ARQUIVO: PARTIÇÕES ANUAIS DE REGISTROS ENCERRADOS
+# =============================================================================
+# arquivamento.py move aluguéis 'Finalizado' e manutenções 'Concluída' antigos
+# para tabelas por ano (ex.: alugueis_arquivo_2022), registradas em
+# particoes_arquivo com as datas mínima e máxima de cada uma. As consultas de
+# histórico e faturamento usam fonte_com_arquivo() para ler a tabela principal
+# junto com as partições que podem ter linhas no período pedido.
+
+# tabela: (coluna de início, coluna de fim, status encerrado, colunas)
+TABELAS_ARQUIVAVEIS = {
+    "alugueis": ("data_retirada", "data_devolucao", "Finalizado",
+                 "id, placa_carro, cpf_cliente, data_retirada, data_devolucao, valor_total, status, data_prevista"),
+    "manutencoes": ("data_entrada", "data_saida", "Concluída",
+                    "id, placa_carro, data_entrada, data_saida, descricao, custo, status, plano_id"),
+}
+
+def _migrar_particoes(cursor):
+    """Acrescenta às partições já criadas as colunas incluídas depois na tabela principal."""
+    for tabela_origem, nome in cursor.execute("SELECT tabela_origem, nome FROM particoes_arquivo").fetchall():
+        existentes = {coluna[1] for coluna in cursor.execute(f"PRAGMA table_info({nome})")}
+        for _, coluna, tipo, *_ in cursor.execute(f"PRAGMA table_info({tabela_origem})").fetchall():
+            if coluna not in existentes:
+                cursor.execute(f"ALTER TABLE {nome} ADD COLUMN {coluna} {tipo}")
+
+# Qual faixa de datas da partição é comparada com o período pedido:
+# a coluna de início, a de fim, ou o intervalo inteiro (início até fim).
+_FAIXAS_PARTICAO = {
+    "inicio": ("inicio_min", "inicio_max"),
+    "fim": ("fim_min", "fim_max"),
+    "intervalo": ("inicio_min", "fim_max"),
+}
+
+def particoes_arquivo(cursor, tabela, faixa="inicio", data_inicio=None, data_fim=None):
+    """Nomes das partições de `tabela` com datas que podem cair em [data_inicio, data_fim]."""
+    col_min, col_max = _FAIXAS_PARTICAO[faixa]
+    query = "SELECT nome FROM particoes_arquivo WHERE tabela_origem = ?"
+    params = [tabela]
+    if data_fim:
+        query += f" AND {col_min} <= ?"
+        params.append(data_fim)
+    if data_inicio:
+        query += f" AND {col_max} >= ?"
+        params.append(data_inicio)
+    cursor.execute(query + " ORDER BY ano", params)
+    return [row[0] for row in cursor.fetchall()]
+
+def fonte_com_arquivo(cursor, tabela, faixa="inicio", data_inicio=None, data_fim=None,
+                      colunas=None, indice=None, apelido=None):
+    """Expressão para o FROM com a tabela principal e as partições relevantes.
+
+    Sem partições relevantes devolve a própria tabela, e a consulta fica igual
+    à de antes do arquivamento. `indice` é aplicado (INDEXED BY) só à tabela
+    principal.
+    """
+    colunas = colunas or TABELAS_ARQUIVAVEIS[tabela][3]
+    sufixo = f" AS {apelido}" if apelido else ""
+    indexado = f" INDEXED BY {indice}" if indice else ""
+    particoes = particoes_arquivo(cursor, tabela, faixa, data_inicio, data_fim)
+    if not particoes:
+        return f"{tabela}{sufixo}{indexado}"
+    partes = [f"SELECT {colunas} FROM {tabela}{indexado}"] + [f"SELECT {colunas} FROM {nome}" for nome in particoes]
+    return f"({' UNION ALL '.join(partes)}){sufixo}"
+
+# =============================================================================
+# INTEGRIDADE REFERENCIAL
+# =============================================================================
+# conectar_bd() liga PRAGMA foreign_keys em toda conexão: remover um veículo
+# ou cliente com histórico falha com IntegrityError (ON DELETE RESTRICT) e o
+# resumo e os descontos do cliente removido saem junto (ON DELETE CASCADE).
+# A cada DELETE o SQLite procura filhos pela chave estrangeira; os índices
+# que começam por placa_carro e cpf_cliente (INDICES_LISTAGENS/INDICES_ANALISE)
+# tornam essa procura uma busca no índice, não uma varredura da tabela.
+# As partições de arquivo não têm FOREIGN KEY: remover_* as confere com
+# _historico_arquivado(), também pelo índice de cada partição.
+#
+# Bancos antigos, usados sem foreign_keys, podem ter aluguéis e manutenções
+# órfãos. verificar_integridade() os aponta, e reparar_orfaos() recria o
+# veículo ou cliente que falta (marcado como removido, preservando o histórico
+# e o faturamento) ou, com apagar=True, apaga as linhas órfãs.
+
+# Colunas das partições de arquivo que referenciam veículos e clientes
+_REFERENCIAS_ARQUIVO = {
+    "alugueis": (("placa_carro", "veiculos", "placa"), ("cpf_cliente", "clientes", "cpf")),
+    "manutencoes": (("placa_carro", "veiculos", "placa"),),
+}
+NOME_REGISTRO_REMOVIDO = "(removido)"
+STATUS_VEICULO_REMOVIDO = "Removido"
+
+def _historico_arquivado(cursor, coluna, valor):
+    """Se alguma partição de arquivo tem linhas com `coluna` = valor."""
+    for tabela, referencias in _REFERENCIAS_ARQUIVO.items():
+        if coluna not in {coluna_filha for coluna_filha, _, _ in referencias}:
+            continue
+        for nome in particoes_arquivo(cursor, tabela):
+            if cursor.execute(f"SELECT 1 FROM {nome} WHERE {coluna} = ? LIMIT 1", (valor,)).fetchone():
+                return True
+    return False
+
+def _referencias(cursor):
+    """(tabela filha, coluna, tabela pai, coluna pai) de cada chave estrangeira, com as partições."""
+    referencias = []
+    tabelas = [linha[0] for linha in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for tabela in tabelas:
+        for fk in cursor.execute(f"PRAGMA foreign_key_list({tabela})").fetchall():
+            referencias.append((tabela, fk["from"], fk["table"], fk["to"]))
+    for tabela, colunas in _REFERENCIAS_ARQUIVO.items():
+        for nome in particoes_arquivo(cursor, tabela):
+            referencias += [(nome, coluna, pai, coluna_pai) for coluna, pai, coluna_pai in colunas]
+    return referencias
+
+def _coluna_indexada(cursor, tabela, coluna):
+    """Se algum índice de `tabela` começa por `coluna` (ou ela é a chave primária)."""
+    for indice in cursor.execute(f"PRAGMA index_list({tabela})").fetchall():
+        colunas = cursor.execute(f"PRAGMA index_info({indice['name']})").fetchall()
+        if colunas and colunas[0]["name"] == coluna:
+            return True
+    return False
+
+def _orfaos(cursor):
+    """{(tabela, coluna, pai): quantidade} das linhas cuja referência não existe."""
+    orfaos = {}
+    for tabela, coluna, pai, coluna_pai in _referencias(cursor):
+        qtd = cursor.execute(f"""
+            SELECT COUNT(*) FROM {tabela}
+            WHERE {coluna} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {pai} WHERE {coluna_pai} = {tabela}.{coluna})
+        """).fetchone()[0]
+        if qtd:
+            orfaos[(tabela, coluna, pai)] = qtd
+    return orfaos
+
+def verificar_integridade():
+    """Aponta linhas órfãs e chaves estrangeiras sem índice; retorna (sem_problemas, [mensagens])."""
+    conn, cursor = conectar_bd()
+    try:
+        mensagens = [f"{tabela}.{coluna}: {qtd} linha(s) sem {pai} correspondente."
+                     for (tabela, coluna, pai), qtd in _orfaos(cursor).items()]
+        mensagens += [f"{tabela}.{coluna} não tem índice: remover de {pai} varre a tabela."
+                      for tabela, coluna, pai, _ in _referencias(cursor)
+                      if not _coluna_indexada(cursor, tabela, coluna)]
+    finally:
+        conn.close()
+    return (not mensagens, mensagens or ["Nenhum registro órfão; todas as chaves estrangeiras têm índice."])
+
+def reparar_orfaos(apagar=False):
+    """Corrige as linhas órfãs: recria os veículos/clientes que faltam ou, com `apagar`, apaga as órfãs.
+
+    O resumo e os descontos de clientes inexistentes são sempre apagados; os
+    contadores do painel e o resumo por cliente são recalculados no fim.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        orfaos = _orfaos(cursor)
+        if not orfaos:
+            return (True, ["Nenhum registro órfão."])
+        mensagens = []
+        for (tabela, coluna, pai), qtd in orfaos.items():
+            coluna_pai = "placa" if pai == "veiculos" else "cpf"
+            sem_pai = f"NOT EXISTS (SELECT 1 FROM {pai} WHERE {coluna_pai} = {tabela}.{coluna})"
+            if apagar or tabela in ("resumo_clientes", "descontos_clientes"):
+                cursor.execute(f"DELETE FROM {tabela} WHERE {coluna} IS NOT NULL AND {sem_pai}")
+                mensagens.append(f"{tabela}: {cursor.rowcount} linha(s) órfã(s) apagada(s).")
+                continue
+            chaves = [linha[0] for linha in cursor.execute(
+                f"SELECT DISTINCT {coluna} FROM {tabela} WHERE {coluna} IS NOT NULL AND {sem_pai}")]
+            for chave in chaves:
+                if pai == "veiculos":
+                    cursor.execute(
+                        "INSERT INTO veiculos (placa, marca, modelo, ano, cor, valor_diaria, status) "
+                        "VALUES (?, ?, ?, 0, '-', 0, ?)",
+                        (chave, NOME_REGISTRO_REMOVIDO, NOME_REGISTRO_REMOVIDO, STATUS_VEICULO_REMOVIDO))
+                    _registrar_evento(cursor, "veiculo_recriado", "veiculos", chave)
+                else:
+                    cursor.execute("INSERT INTO clientes (cpf, nome, telefone, email) VALUES (?, ?, '', NULL)",
+                                   (chave, NOME_REGISTRO_REMOVIDO))
+                    _registrar_evento(cursor, "cliente_recriado", "clientes", chave)
+            mensagens.append(f"{tabela}: {len(chaves)} {pai} recriado(s) para {qtd} linha(s) órfã(s).")
+        _recalcular_contadores(cursor)
+        _reconstruir_resumo_clientes(cursor)
+        conn.commit()
+        return (True, mensagens)
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao reparar registros órfãos: {e}"])
+    finally:
+        conn.close()
+
+# =============================================================================
+# FUNÇÕES DE VALIDAÇÃO (CORRIGIDA)
+# =============================================================================
+
+# Os validadores ficam em validacao.py (padrões compilados uma vez e verificação
+# do CPF por tabela); os nomes continuam disponíveis aqui para quem já os usa.
+from validacao import (
+    validar_placa, validar_ano, validar_valor, validar_cpf,
+    validar_veiculo, validar_cliente, limpar_cpf
+)
+
+# =============================================================================
+# FILTROS E ORDENAÇÃO DAS LISTAGENS
+# =============================================================================
+
+# Colunas que cada listagem aceita em `ordenar_por`, com a expressão SQL usada.
+ORDENACAO_VEICULOS = {
+    "placa": "placa", "marca": "marca COLLATE NOCASE", "modelo": "modelo COLLATE NOCASE",
+    "ano": "ano", "cor": "cor COLLATE NOCASE", "valor_diaria": "valor_diaria", "status": "status",
+    "categoria": "(SELECT nome FROM categorias WHERE id = categoria_id)"
+}
+ORDENACAO_CLIENTES = {
+    "cpf": "cpf", "nome": "nome COLLATE NOCASE", "telefone": "telefone", "email": "email"
+}
+ORDENACAO_ALUGUEIS = {
+    "id": "id", "placa_carro": "placa_carro", "cpf_cliente": "cpf_cliente",
+    "data_retirada": "data_retirada", "data_devolucao": "data_devolucao",
+    "valor_total": "valor_total", "status": "status"
+}
+ORDENACAO_MANUTENCOES = {
+    "id": "id", "placa_carro": "placa_carro", "data_entrada": "data_entrada", "data_saida": "data_saida",
+    "descricao": "descricao COLLATE NOCASE", "custo": "custo", "status": "status"
+}
+
+def _prefixo_like(texto):
+    """Monta o padrão de LIKE 'começa com', escapando os curingas digitados."""
+    texto = texto.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return texto + "%"
+
+def _montar_consulta(tabela, condicoes, ordenacao, ordenar_por, decrescente, ordem_padrao=None, limite=None):
+    """Monta SELECT * com WHERE, ORDER BY e LIMIT a partir dos filtros informados.
+
+    `condicoes` é uma lista de (trecho_sql, parametro) e `ordenacao` é um dos
+    dicionários ORDENACAO_*; colunas fora dele geram ValueError. O texto de
+    cada combinação de filtros é montado uma vez e reaproveitado, e a
+    instrução preparada correspondente continua no cache da conexão.
+    """
+    params = [param for _, param in condicoes]
+    if ordenar_por:
+        if ordenar_por not in ordenacao:
+            raise ValueError(f"Não é possível ordenar pela coluna '{ordenar_por}'.")
+        ordem = f"{ordenacao[ordenar_por]} {'DESC' if decrescente else 'ASC'}"
+    else:
+        ordem = ordem_padrao
+    if limite:
+        params.append(int(limite))
+    return _texto_consulta(tabela, tuple(trecho for trecho, _ in condicoes), ordem, bool(limite)), params
+
+@functools.lru_cache(maxsize=CACHE_INSTRUCOES)
+def _texto_consulta(tabela, trechos, ordem, com_limite):
+    query = f"SELECT * FROM {tabela}"
+    if trechos:
+        query += " WHERE " + " AND ".join(trechos)
+    if ordem:
+        query += f" ORDER BY {ordem}"
+    if com_limite:
+        query += " LIMIT ?"
+    return query
+
+def _filtro_chaves(coluna, chaves):
+    """Condição 'coluna IN (chaves)' com um único parâmetro (lista em JSON), para o texto da consulta não variar."""
+    return (f"{coluna} IN (SELECT value FROM json_each(?))", json.dumps(list(chaves)))
+
+def _filtro_periodo(coluna, data_inicio, data_fim):
+    """Condições de intervalo de datas ('AAAA-MM-DD', fim inclusivo) comparáveis pelo índice da coluna."""
+    condicoes = []
+    if data_inicio:
+        condicoes.append((f"{coluna} >= ?", data_inicio))
+    if data_fim:
+        condicoes.append((f"{coluna} < ?", dia_seguinte(data_fim)))
+    return condicoes
+
+# =============================================================================
+# OPERAÇÕES CRUD - VEÍCULOS
+# =============================================================================
+def adicionar_veiculo(placa, marca, modelo, ano, cor, valor_diaria, categoria_id=None):
+    """Cadastra o veículo; com `categoria_id` e sem `valor_diaria`, usa a diária padrão da categoria."""
+    conn, cursor = conectar_bd()
+    try:
+        if categoria_id is not None:
+            categoria = _executar(cursor, "ler_categoria", (categoria_id,)).fetchone()
+            if not categoria:
+                return (False, ["Categoria não encontrada."])
+            if not str(valor_diaria or "").strip():
+                valor_diaria = categoria["valor_diaria_padrao"]
+        erros = validar_veiculo(placa, marca, modelo, ano, cor, valor_diaria)
+        if erros:
+            return (False, erros)
+
+        _executar(
+            cursor, "inserir_veiculo",
+            (placa.upper().strip(), marca.strip(), modelo.strip(), int(ano), cor.strip(),
+             float(str(valor_diaria).replace(",", ".")), categoria_id)
         )
+        contadores = {"veiculos_disponiveis": 1}
+        if categoria_id is not None:
+            contadores[_chave_disponiveis_categoria(categoria_id)] = 1
+        _ajustar_contadores(cursor, **contadores)
+        _registrar_evento(cursor, "veiculo_adicionado", "veiculos", placa.upper().strip())
         conn.commit()
         return (True, ["Veículo adicionado com sucesso."])
     except sqlite3.IntegrityError:
@@ -167,22 +1464,19 @@ def adicionar_veiculo(placa, marca, modelo, ano, cor, valor_diaria):
         conn.close()
 
 def atualizar_veiculo(placa, marca, modelo, ano, cor, valor_diaria):
-    erros = list(filter(None, [
-        "O campo 'Marca' é obrigatório." if not marca.strip() else None,
-        "O campo 'Modelo' é obrigatório." if not modelo.strip() else None,
-        validar_ano(ano),
-        "O campo 'Cor' é obrigatório." if not cor.strip() else None,
-        validar_valor(valor_diaria)
-    ]))
+    erros = validar_veiculo(placa, marca, modelo, ano, cor, valor_diaria, com_placa=False)
     if erros:
         return (False, erros)
 
     conn, cursor = conectar_bd()
     try:
-        cursor.execute(
-            "UPDATE veiculos SET marca=?, modelo=?, ano=?, cor=?, valor_diaria=? WHERE placa=?",
+        antes = _ler_linha(cursor, "veiculos", placa.upper().strip())
+        _executar(
+            cursor, "atualizar_veiculo",
             (marca.strip(), modelo.strip(), int(ano), cor.strip(), float(str(valor_diaria).replace(",", ".")), placa.upper().strip())
         )
+        if antes:
+            _registrar_evento(cursor, "veiculo_atualizado", "veiculos", placa.upper().strip(), antes)
         conn.commit()
         return (True, ["Veículo atualizado com sucesso."])
     except Exception as e:
@@ -193,9 +1487,17 @@ def atualizar_veiculo(placa, marca, modelo, ano, cor, valor_diaria):
 def remover_veiculo(placa):
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("DELETE FROM veiculos WHERE placa = ?", (placa.upper().strip(),))
-        if cursor.rowcount == 0:
+        veiculo = _ler_linha(cursor, "veiculos", placa.upper().strip())
+        if not veiculo:
             return (False, [f"Nenhum veículo encontrado com a placa '{placa.upper().strip()}'."])
+        if _historico_arquivado(cursor, "placa_carro", veiculo['placa']):
+            raise sqlite3.IntegrityError("histórico arquivado")
+        _executar(cursor, "remover_veiculo", (placa.upper().strip(),))
+        if veiculo['status'] in CONTADOR_POR_STATUS:
+            _ajustar_contadores(cursor, **{CONTADOR_POR_STATUS[veiculo['status']]: -1})
+        if veiculo['status'] == 'Disponível' and veiculo['categoria_id'] is not None:
+            _ajustar_contadores(cursor, **{_chave_disponiveis_categoria(veiculo['categoria_id']): -1})
+        _registrar_evento(cursor, "veiculo_removido", "veiculos", veiculo['placa'], veiculo, removido=True)
         conn.commit()
         return (True, ["Veículo removido com sucesso."])
     except sqlite3.IntegrityError:
@@ -203,36 +1505,183 @@ def remover_veiculo(placa):
     finally:
         conn.close()
 
-def listar_veiculos(status_filtro=None):
-    conn, cursor = conectar_bd()
-    query = "SELECT * FROM veiculos"
-    params = []
+def listar_veiculos(status_filtro=None, marca=None, modelo=None, ano_min=None, ano_max=None,
+                    valor_min=None, valor_max=None, ordenar_por=None, decrescente=False, limite=None, placas=None):
+    condicoes = []
+    if placas is not None:
+        condicoes.append(_filtro_chaves("placa", placas))
     if status_filtro:
-        query += " WHERE status = ?"
-        params.append(status_filtro)
-    cursor.execute(query, params)
+        condicoes.append(("status = ?", status_filtro))
+    if marca:
+        condicoes.append(("marca LIKE ? ESCAPE '\\'", _prefixo_like(marca)))
+    if modelo:
+        condicoes.append(("modelo LIKE ? ESCAPE '\\'", _prefixo_like(modelo)))
+    if ano_min:
+        condicoes.append(("ano >= ?", int(ano_min)))
+    if ano_max:
+        condicoes.append(("ano <= ?", int(ano_max)))
+    if valor_min:
+        condicoes.append(("valor_diaria >= ?", float(str(valor_min).replace(",", "."))))
+    if valor_max:
+        condicoes.append(("valor_diaria <= ?", float(str(valor_max).replace(",", "."))))
+    query, params = _montar_consulta("veiculos", condicoes, ORDENACAO_VEICULOS, ordenar_por, decrescente, limite=limite)
+
+    conn, cursor = conectar_bd()
+    _executar(cursor, "listar_veiculos", params, sql=query)
     veiculos = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return veiculos
 
+# =============================================================================
+# CATEGORIAS DE VEÍCULOS
+# =============================================================================
+# Cada veículo pode pertencer a uma categoria (econômico, SUV, utilitário...),
+# com uma diária padrão usada no cadastro de veículos sem diária informada.
+# Os veículos disponíveis de cada categoria ficam num contador em
+# `estatisticas` ('disponiveis_categoria:<id>'), ajustado na mesma transação
+# que muda o status do veículo (_mudar_status_veiculo), o cadastra, o remove
+# ou troca a sua categoria; reconciliar_contadores() também o confere.
+# "Tem SUV livre?" é então a leitura de uma linha pela chave primária.
+
+def _validar_categoria(nome, valor_diaria_padrao):
+    erros = [] if (nome or "").strip() else ["O campo 'Nome' é obrigatório."]
+    erro_valor = validar_valor(valor_diaria_padrao)
+    if erro_valor:
+        erros.append(erro_valor)
+    return erros
+
+def adicionar_categoria(nome, valor_diaria_padrao):
+    erros = _validar_categoria(nome, valor_diaria_padrao)
+    if erros:
+        return (False, erros)
+    conn, cursor = conectar_bd()
+    try:
+        _executar(cursor, "inserir_categoria", (nome.strip(), float(str(valor_diaria_padrao).replace(",", "."))))
+        _ajustar_contadores(cursor, **{_chave_disponiveis_categoria(cursor.lastrowid): 0})
+        conn.commit()
+        return (True, [f"Categoria '{nome.strip()}' adicionada com sucesso."])
+    except sqlite3.IntegrityError:
+        return (False, [f"A categoria '{nome.strip()}' já está cadastrada."])
+    finally:
+        conn.close()
+
+def atualizar_categoria(categoria_id, nome, valor_diaria_padrao):
+    """Renomeia a categoria ou muda a diária padrão (as diárias dos veículos já cadastrados não mudam)."""
+    erros = _validar_categoria(nome, valor_diaria_padrao)
+    if erros:
+        return (False, erros)
+    conn, cursor = conectar_bd()
+    try:
+        _executar(cursor, "atualizar_categoria",
+                  (nome.strip(), float(str(valor_diaria_padrao).replace(",", ".")), categoria_id))
+        if not cursor.rowcount:
+            return (False, ["Categoria não encontrada."])
+        conn.commit()
+        return (True, ["Categoria atualizada com sucesso."])
+    except sqlite3.IntegrityError:
+        return (False, [f"A categoria '{nome.strip()}' já está cadastrada."])
+    finally:
+        conn.close()
+
+def remover_categoria(categoria_id):
+    conn, cursor = conectar_bd()
+    try:
+        _executar(cursor, "remover_categoria", (categoria_id,))
+        if not cursor.rowcount:
+            return (False, ["Categoria não encontrada."])
+        _executar(cursor, "remover_contador", (_chave_disponiveis_categoria(categoria_id),))
+        conn.commit()
+        return (True, ["Categoria removida com sucesso."])
+    except sqlite3.IntegrityError:
+        return (False, ["Não é possível remover a categoria, pois há veículos nela."])
+    finally:
+        conn.close()
+
+def definir_categoria_veiculo(placa, categoria_id):
+    """Coloca o veículo na categoria (None tira o veículo de qualquer categoria)."""
+    conn, cursor = conectar_bd()
+    try:
+        antes = _ler_linha(cursor, "veiculos", placa.upper().strip())
+        if not antes:
+            return (False, [f"Nenhum veículo encontrado com a placa '{placa.upper().strip()}'."])
+        if categoria_id is not None and not _executar(cursor, "ler_categoria", (categoria_id,)).fetchone():
+            return (False, ["Categoria não encontrada."])
+        if antes["categoria_id"] == categoria_id:
+            return (True, ["O veículo já está nesta categoria."])
+        _executar(cursor, "definir_categoria_veiculo", (categoria_id, antes["placa"]))
+        if antes["status"] == 'Disponível':
+            contadores = {}
+            if antes["categoria_id"] is not None:
+                contadores[_chave_disponiveis_categoria(antes["categoria_id"])] = -1
+            if categoria_id is not None:
+                contadores[_chave_disponiveis_categoria(categoria_id)] = 1
+            _ajustar_contadores(cursor, **contadores)
+        _registrar_evento(cursor, "veiculo_atualizado", "veiculos", antes["placa"], antes)
+        conn.commit()
+        return (True, ["Categoria do veículo atualizada com sucesso."])
+    except Exception as e:
+        return (False, [f"Erro ao definir a categoria: {e}"])
+    finally:
+        conn.close()
+
+def listar_categorias():
+    """Categorias em ordem de nome, com os veículos disponíveis de cada uma (`disponiveis`)."""
+    conn, cursor = conectar_bd()
+    try:
+        cursor.execute("""
+            SELECT c.id, c.nome, c.valor_diaria_padrao, CAST(COALESCE(e.valor, 0) AS INTEGER) AS disponiveis
+            FROM categorias AS c
+            LEFT JOIN estatisticas AS e ON e.chave = 'disponiveis_categoria:' || c.id
+            ORDER BY c.nome
+        """)
+        return [dict(linha) for linha in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def disponiveis_por_categoria(categoria_id):
+    """Quantos veículos da categoria estão disponíveis agora (lê só o contador)."""
+    conn, cursor = conectar_bd()
+    try:
+        linha = _executar(cursor, "ler_contador", (_chave_disponiveis_categoria(categoria_id),)).fetchone()
+        return int(linha[0]) if linha else 0
+    finally:
+        conn.close()
+
+def escolher_veiculo(categoria_id):
+    """Melhor veículo disponível da categoria para um aluguel: (True, placa) ou (False, [mensagem]).
+
+    Entre os disponíveis sem manutenção preventiva vencida, o que foi alugado
+    há mais tempo (ou nunca), para distribuir o uso pela frota da categoria.
+    """
+    conn, cursor = conectar_bd()
+    try:
+        linha = _executar(cursor, "ler_contador", (_chave_disponiveis_categoria(categoria_id),)).fetchone()
+        if not linha or linha[0] <= 0:
+            return (False, ["Nenhum veículo disponível nesta categoria."])
+        # Cursor à parte: a consulta da manutenção preventiva usa o outro
+        for (placa,) in _executar(conn.cursor(), "candidatos_categoria", (categoria_id,)):
+            if not manutencao_preventiva.manutencao_bloqueante(cursor, placa):
+                return (True, placa)
+        return (False, ["Os veículos disponíveis nesta categoria aguardam manutenção preventiva."])
+    finally:
+        conn.close()
+
 # =============================================================================
 # OPERAÇÕES CRUD - CLIENTES
 # =============================================================================
 def adicionar_cliente(cpf, nome, telefone, email):
-    erros = list(filter(None, [
-        validar_cpf(cpf),
-        "O campo 'Nome' é obrigatório." if not nome.strip() else None
-    ]))
+    erros = validar_cliente(cpf, nome)
     if erros:
         return (False, erros)
     
-    cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
+    cpf_limpo = limpar_cpf(cpf)
     conn, cursor = conectar_bd()
     try:
-        cursor.execute(
-            "INSERT INTO clientes (cpf, nome, telefone, email) VALUES (?, ?, ?, ?)",
+        _executar(
+            cursor, "inserir_cliente",
             (cpf_limpo, nome.strip(), telefone.strip(), email.strip().lower())
         )
+        _registrar_evento(cursor, "cliente_adicionado", "clientes", cpf_limpo)
         conn.commit()
         return (True, ["Cliente adicionado com sucesso."])
     except sqlite3.IntegrityError as e:
@@ -245,20 +1694,20 @@ def adicionar_cliente(cpf, nome, telefone, email):
         conn.close()
 
 def atualizar_cliente(cpf, nome, telefone, email):
-    erros = list(filter(None, [
-        validar_cpf(cpf),
-        "O campo 'Nome' é obrigatório." if not nome.strip() else None
-    ]))
+    erros = validar_cliente(cpf, nome)
     if erros:
         return (False, erros)
         
-    cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
+    cpf_limpo = limpar_cpf(cpf)
     conn, cursor = conectar_bd()
     try:
-        cursor.execute(
-            "UPDATE clientes SET nome=?, telefone=?, email=? WHERE cpf=?",
+        antes = _ler_linha(cursor, "clientes", cpf_limpo)
+        _executar(
+            cursor, "atualizar_cliente",
             (nome.strip(), telefone.strip(), email.strip().lower(), cpf_limpo)
         )
+        if antes:
+            _registrar_evento(cursor, "cliente_atualizado", "clientes", cpf_limpo, antes)
         conn.commit()
         return (True, ["Cliente atualizado com sucesso."])
     except sqlite3.IntegrityError:
@@ -267,12 +1716,17 @@ def atualizar_cliente(cpf, nome, telefone, email):
         conn.close()
 
 def remover_cliente(cpf):
-    cpf_limpo = ''.join(filter(str.isdigit, str(cpf)))
+    cpf_limpo = limpar_cpf(cpf)
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("DELETE FROM clientes WHERE cpf = ?", (cpf_limpo,))
+        antes = _ler_linha(cursor, "clientes", cpf_limpo)
+        if antes and _historico_arquivado(cursor, "cpf_cliente", cpf_limpo):
+            raise sqlite3.IntegrityError("histórico arquivado")
+        _executar(cursor, "remover_cliente", (cpf_limpo,))
         if cursor.rowcount == 0:
             return (False, [f"Nenhum cliente encontrado com o CPF '{cpf_limpo}'."])
+        _executar(cursor, "remover_resumo_cliente", (cpf_limpo,))
+        _registrar_evento(cursor, "cliente_removido", "clientes", cpf_limpo, antes, removido=True)
         conn.commit()
         return (True, ["Cliente removido com sucesso."])
     except sqlite3.IntegrityError:
@@ -280,9 +1734,16 @@ def remover_cliente(cpf):
     finally:
         conn.close()
 
-def listar_clientes():
+def listar_clientes(nome=None, ordenar_por=None, decrescente=False, limite=None, cpfs=None):
+    condicoes = []
+    if cpfs is not None:
+        condicoes.append(_filtro_chaves("cpf", cpfs))
+    if nome:
+        condicoes.append(("nome LIKE ? ESCAPE '\\'", _prefixo_like(nome)))
+    query, params = _montar_consulta("clientes", condicoes, ORDENACAO_CLIENTES, ordenar_por, decrescente, limite=limite)
+
     conn, cursor = conectar_bd()
-    cursor.execute("SELECT * FROM clientes")
+    _executar(cursor, "listar_clientes", params, sql=query)
     clientes = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return clientes
@@ -290,30 +1751,48 @@ def listar_clientes():
 # =============================================================================
 # OPERAÇÕES DE ALUGUEL
 # =============================================================================
-def realizar_aluguel(placa_carro, cpf_cliente):
+def realizar_aluguel(placa_carro, cpf_cliente, data_hora=None, data_prevista=None):
+    """Registra o aluguel; `data_hora` ('AAAA-MM-DD HH:MM:SS') é a retirada, por padrão agora.
+
+    `data_prevista` é a devolução combinada com o cliente; depois dela (e da
+    tolerância) a devolução paga a multa por atraso definida em precificacao.py.
+    """
     if not placa_carro or not cpf_cliente:
         return (False, ["Placa do carro e CPF do cliente são obrigatórios."])
+    if data_prevista:
+        try:
+            data_prevista = como_texto(precificacao.como_datetime(data_prevista))
+        except ValueError:
+            return (False, ["Data prevista inválida. Use 'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'."])
 
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("SELECT status FROM veiculos WHERE placa = ?", (placa_carro.upper().strip(),))
+        _executar(cursor, "status_veiculo", (placa_carro.upper().strip(),))
         carro = cursor.fetchone()
         if not carro:
             return (False, ["Veículo não encontrado."])
         if carro['status'] != 'Disponível':
             return (False, [f"Veículo não está disponível (Status: {carro['status']})."])
+        pendente = manutencao_preventiva.manutencao_bloqueante(cursor, placa_carro.upper().strip())
+        if pendente:
+            return (False, [f"Veículo com manutenção preventiva vencida: {pendente}."])
 
-        cpf_limpo = ''.join(filter(str.isdigit, str(cpf_cliente)))
-        cursor.execute("SELECT nome FROM clientes WHERE cpf = ?", (cpf_limpo,))
+        cpf_limpo = limpar_cpf(cpf_cliente)
+        _executar(cursor, "cliente_existe", (cpf_limpo,))
         if not cursor.fetchone():
             return (False, ["Cliente não encontrado."])
 
-        data_hoje = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute(
-            "INSERT INTO alugueis (placa_carro, cpf_cliente, data_retirada, status) VALUES (?, ?, ?, ?)",
-            (placa_carro.upper().strip(), cpf_limpo, data_hoje, 'Ativo')
+        data_hoje = data_hora or agora_texto()
+        if data_prevista and data_prevista <= data_hoje:
+            return (False, ["A data prevista de devolução deve ser posterior à retirada."])
+        _executar(
+            cursor, "inserir_aluguel",
+            (placa_carro.upper().strip(), cpf_limpo, data_hoje, 'Ativo', data_prevista)
         )
-        cursor.execute("UPDATE veiculos SET status = 'Alugado' WHERE placa = ?", (placa_carro.upper().strip(),))
+        _registrar_evento(cursor, "aluguel_iniciado", "alugueis", cursor.lastrowid)
+        _resumo_aluguel_iniciado(cursor, cpf_limpo, data_hoje)
+        _mudar_status_veiculo(cursor, placa_carro.upper().strip(), 'Alugado')
+        _ajustar_contadores(cursor, veiculos_disponiveis=-1, veiculos_alugados=1, alugueis_ativos=1)
         conn.commit()
         return (True, ["Aluguel registrado com sucesso."])
     except Exception as e:
@@ -321,33 +1800,44 @@ def realizar_aluguel(placa_carro, cpf_cliente):
     finally:
         conn.close()
 
-def realizar_devolucao(placa_carro):
+def realizar_devolucao(placa_carro, data_hora=None):
+    """Finaliza o aluguel ativo do veículo; `data_hora` é a devolução, por padrão agora."""
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("SELECT * FROM alugueis WHERE placa_carro = ? AND status = 'Ativo'", (placa_carro.upper().strip(),))
+        _executar(cursor, "aluguel_ativo_do_veiculo", (placa_carro.upper().strip(),))
         aluguel = cursor.fetchone()
         if not aluguel:
             return (False, ["Nenhum aluguel ativo encontrado para este veículo."], None)
 
-        cursor.execute("SELECT valor_diaria FROM veiculos WHERE placa = ?", (placa_carro.upper().strip(),))
+        _executar(cursor, "diaria_veiculo", (placa_carro.upper().strip(),))
         carro = cursor.fetchone()
         valor_diaria = carro['valor_diaria']
 
-        data_retirada = datetime.strptime(aluguel["data_retirada"], "%Y-%m-%d %H:%M:%S")
-        data_devolucao = datetime.now()
-        duracao = data_devolucao - data_retirada
-        dias_alugado = math.ceil(duracao.total_seconds() / 86400)
-        dias_alugado = max(1, dias_alugado) 
-        valor_total = dias_alugado * valor_diaria
+        data_retirada = como_datetime(aluguel["data_retirada"])
+        data_devolucao = como_datetime(data_hora) if data_hora else datetime.now().replace(microsecond=0)
+        data_prevista = aluguel["data_prevista"]
+        preco = precificacao.tabela_vigente(cursor).calcular(
+            valor_diaria, data_retirada, data_devolucao, aluguel["cpf_cliente"],
+            como_datetime(data_prevista) if data_prevista else None
+        )
+        dias_alugado = preco["dias"]
+        valor_total = preco["total"]
 
-        cursor.execute(
-            "UPDATE alugueis SET data_devolucao = ?, valor_total = ?, status = 'Finalizado' WHERE id = ?",
-            (data_devolucao.strftime('%Y-%m-%d %H:%M:%S'), valor_total, aluguel['id'])
+        _executar(
+            cursor, "finalizar_aluguel",
+            (como_texto(data_devolucao), valor_total, aluguel['id'])
         )
-        cursor.execute("UPDATE veiculos SET status = 'Disponível' WHERE placa = ?", (placa_carro.upper().strip(),))
+        _registrar_evento(cursor, "aluguel_finalizado", "alugueis", aluguel['id'], dict(aluguel))
+        _resumo_aluguel_finalizado(cursor, aluguel['cpf_cliente'],
+                                   (data_devolucao - data_retirada).total_seconds() / 86400, valor_total)
+        _mudar_status_veiculo(cursor, placa_carro.upper().strip(), 'Disponível')
+        _ajustar_contadores(cursor, veiculos_alugados=-1, veiculos_disponiveis=1, alugueis_ativos=-1,
+                            **{_chave_receita_dia(data_devolucao.strftime('%Y-%m-%d')): valor_total})
         conn.commit()
         
         msg = f"Devolução realizada. Total: R$ {valor_total:.2f} ({dias_alugado} dia(s))."
+        if preco["multa_atraso"]:
+            msg += f" Inclui multa por {preco['dias_atraso']} dia(s) de atraso: R$ {preco['multa_atraso']:.2f}."
         return (True, [msg], valor_total)
     except Exception as e:
         return (False, [f"Erro ao realizar devolução: {e}"], None)
@@ -358,7 +1848,8 @@ def realizar_devolucao(placa_carro):
 # OPERAÇÕES DE MANUTENÇÃO
 # =============================================================================
 
-def enviar_para_manutencao(placa, descricao, custo):
+def enviar_para_manutencao(placa, descricao, custo, data_hora=None, plano_id=None):
+    """Envia o veículo para manutenção; com `plano_id`, a visita cumpre esse plano preventivo."""
     erros = list(filter(None, [
         "Placa é obrigatória." if not placa else None,
         "Descrição é obrigatória." if not descricao.strip() else None,
@@ -369,21 +1860,23 @@ def enviar_para_manutencao(placa, descricao, custo):
 
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("SELECT status FROM veiculos WHERE placa = ?", (placa.upper(),))
+        _executar(cursor, "status_veiculo", (placa.upper(),))
         veiculo = cursor.fetchone()
         if not veiculo:
             return (False, ["Veículo não encontrado."])
         if veiculo['status'] != 'Disponível':
             return (False, [f"Apenas veículos 'Disponíveis' podem ser enviados para manutenção. Status atual: {veiculo['status']}."])
 
-        data_entrada = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data_entrada = data_hora or agora_texto()
         custo_float = float(str(custo).replace(",", "."))
         
-        cursor.execute(
-            "INSERT INTO manutencoes (placa_carro, data_entrada, descricao, custo, status) VALUES (?, ?, ?, ?, ?)",
-            (placa.upper(), data_entrada, descricao.strip(), custo_float, 'Em Andamento')
+        _executar(
+            cursor, "inserir_manutencao",
+            (placa.upper(), data_entrada, descricao.strip(), custo_float, 'Em Andamento', plano_id)
         )
-        cursor.execute("UPDATE veiculos SET status = 'Em Manutenção' WHERE placa = ?", (placa.upper(),))
+        _registrar_evento(cursor, "manutencao_iniciada", "manutencoes", cursor.lastrowid)
+        _mudar_status_veiculo(cursor, placa.upper(), 'Em Manutenção')
+        _ajustar_contadores(cursor, veiculos_disponiveis=-1, veiculos_em_manutencao=1, manutencoes_em_andamento=1)
         conn.commit()
         return (True, ["Veículo enviado para manutenção com sucesso."])
     except Exception as e:
@@ -403,12 +1896,14 @@ def atualizar_manutencao(manutencao_id, descricao, custo):
     conn, cursor = conectar_bd()
     try:
         custo_float = float(str(custo).replace(",", "."))
-        cursor.execute(
-            "UPDATE manutencoes SET descricao = ?, custo = ? WHERE id = ?",
+        antes = _ler_linha(cursor, "manutencoes", manutencao_id)
+        _executar(
+            cursor, "atualizar_manutencao",
             (descricao.strip(), custo_float, manutencao_id)
         )
         if cursor.rowcount == 0:
             return (False, ["Nenhum registro de manutenção encontrado com este ID."])
+        _registrar_evento(cursor, "manutencao_atualizada", "manutencoes", manutencao_id, antes)
         
         conn.commit()
         return (True, ["Manutenção atualizada com sucesso."])
@@ -421,19 +1916,21 @@ def atualizar_manutencao(manutencao_id, descricao, custo):
 def registrar_retorno_manutencao(manutencao_id):
     conn, cursor = conectar_bd()
     try:
-        cursor.execute("SELECT placa_carro FROM manutencoes WHERE id = ? AND status = 'Em Andamento'", (manutencao_id,))
+        _executar(cursor, "manutencao_em_andamento", (manutencao_id,))
         manutencao = cursor.fetchone()
         if not manutencao:
             return (False, ["Registro de manutenção 'Em Andamento' não encontrado."])
 
         placa = manutencao['placa_carro']
-        data_saida = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data_saida = agora_texto()
         
-        cursor.execute(
-            "UPDATE manutencoes SET data_saida = ?, status = 'Concluída' WHERE id = ?",
+        _executar(
+            cursor, "concluir_manutencao",
             (data_saida, manutencao_id)
         )
-        cursor.execute("UPDATE veiculos SET status = 'Disponível' WHERE placa = ?", (placa,))
+        _registrar_evento(cursor, "manutencao_concluida", "manutencoes", manutencao_id, dict(manutencao))
+        _mudar_status_veiculo(cursor, placa, 'Disponível')
+        _ajustar_contadores(cursor, veiculos_em_manutencao=-1, veiculos_disponiveis=1, manutencoes_em_andamento=-1)
         conn.commit()
         return (True, ["Retorno da manutenção registrado com sucesso."])
     except Exception as e:
@@ -442,15 +1939,21 @@ def registrar_retorno_manutencao(manutencao_id):
     finally:
         conn.close()
 
-def listar_manutencoes(status_filtro=None):
-    conn, cursor = conectar_bd()
-    query = "SELECT * FROM manutencoes"
-    params = []
+def listar_manutencoes(status_filtro=None, placa=None, data_inicio=None, data_fim=None,
+                       ordenar_por=None, decrescente=False, limite=None, ids=None):
+    condicoes = []
+    if ids is not None:
+        condicoes.append(_filtro_chaves("id", ids))
     if status_filtro:
-        query += " WHERE status = ?"
-        params.append(status_filtro)
-    query += " ORDER BY data_entrada DESC"
-    cursor.execute(query, params)
+        condicoes.append(("status = ?", status_filtro))
+    if placa:
+        condicoes.append(("placa_carro = ?", placa.upper().strip()))
+    condicoes += _filtro_periodo("data_entrada", data_inicio, data_fim)
+    query, params = _montar_consulta("manutencoes", condicoes, ORDENACAO_MANUTENCOES, ordenar_por, decrescente,
+                                     ordem_padrao="data_entrada DESC", limite=limite)
+
+    conn, cursor = conectar_bd()
+    _executar(cursor, "listar_manutencoes", params, sql=query)
     manutencoes = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return manutencoes
@@ -458,26 +1961,45 @@ def listar_manutencoes(status_filtro=None):
 # =============================================================================
 # CONSULTAS E RELATÓRIOS
 # =============================================================================
-def listar_alugueis_ativos():
+def listar_alugueis_ativos(ordenar_por=None, decrescente=False, ids=None):
+    condicoes = [("status = ?", 'Ativo')]
+    if ids is not None:
+        condicoes.append(_filtro_chaves("id", ids))
+    query, params = _montar_consulta("alugueis", condicoes, ORDENACAO_ALUGUEIS, ordenar_por,
+                                     decrescente, ordem_padrao="data_retirada DESC")
     conn, cursor = conectar_bd()
-    cursor.execute("SELECT * FROM alugueis WHERE status = 'Ativo' ORDER BY data_retirada DESC")
+    _executar(cursor, "listar_alugueis_ativos", params, sql=query)
     alugueis = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return alugueis
 
-def buscar_historico(filtro_cpf=None):
-    conn, cursor = conectar_bd()
-    query = "SELECT * FROM alugueis"
-    params = []
+def consulta_historico(cursor, filtro_cpf=None, placa=None, status=None, data_inicio=None, data_fim=None,
+                       ordenar_por=None, decrescente=False, limite=None):
+    """(query, params) do histórico de aluguéis com os filtros de buscar_historico()."""
+    condicoes = []
     if filtro_cpf:
-        cpf_numerico = ''.join(filter(str.isdigit, str(filtro_cpf)))
-        query += " WHERE cpf_cliente = ?"
-        params.append(cpf_numerico)
-    
-    query += " ORDER BY data_retirada DESC"
-    cursor.execute(query, params)
-    historico = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        cpf_numerico = limpar_cpf(filtro_cpf)
+        condicoes.append(("cpf_cliente = ?", cpf_numerico))
+    if placa:
+        condicoes.append(("placa_carro = ?", placa.upper().strip()))
+    if status:
+        condicoes.append(("status = ?", status))
+    condicoes += _filtro_periodo("data_retirada", data_inicio, data_fim)
+    fonte = fonte_com_arquivo(cursor, "alugueis", "inicio", data_inicio,
+                              f"{data_fim} 23:59:59" if data_fim else None)
+    return _montar_consulta(fonte, condicoes, ORDENACAO_ALUGUEIS, ordenar_por, decrescente,
+                            ordem_padrao="data_retirada DESC", limite=limite)
+
+def buscar_historico(filtro_cpf=None, placa=None, status=None, data_inicio=None, data_fim=None,
+                     ordenar_por=None, decrescente=False, limite=None):
+    conn, cursor = conectar_leitura()
+    try:
+        query, params = consulta_historico(cursor, filtro_cpf, placa, status, data_inicio, data_fim,
+                                           ordenar_por, decrescente, limite)
+        _executar(cursor, "buscar_historico", params, sql=query)
+        historico = [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
     return historico
 
 def calcular_faturamento_periodo(data_inicio, data_fim):
@@ -487,13 +2009,16 @@ def calcular_faturamento_periodo(data_inicio, data_fim):
     except (ValueError, TypeError):
         return (False, ["Formato de data inválido. Use 'AAAA-MM-DD'."])
 
-    conn, cursor = conectar_bd()
+    conn, cursor = conectar_leitura()
     try:
-        cursor.execute("""
+        fim_exclusivo = dia_seguinte(data_fim)
+        fonte = fonte_com_arquivo(cursor, "alugueis", "fim", data_inicio, fim_exclusivo)
+        # Só aluguéis finalizados têm data_devolucao: a faixa no índice basta
+        cursor.execute(f"""
             SELECT SUM(valor_total) AS faturamento
-            FROM alugueis
-            WHERE status = 'Finalizado' AND date(data_devolucao) BETWEEN ? AND ?
-        """, (data_inicio, data_fim))
+            FROM {fonte}
+            WHERE data_devolucao >= ? AND data_devolucao < ?
+        """, (data_inicio, fim_exclusivo))
         
         resultado = cursor.fetchone()
         faturamento = resultado['faturamento'] if resultado['faturamento'] is not None else 0
@@ -501,4 +2026,36 @@ def calcular_faturamento_periodo(data_inicio, data_fim):
     except Exception as e:
         return (False, [f"Erro ao calcular faturamento: {e}"])
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+if __name__ == '__main__':
+    # Uso: python database.py reconstruir-resumo   (carga inicial ou correção de resumo_clientes)
+    #      python database.py normalizar-datas     (datas de bancos antigos no formato dos filtros)
+    #      python database.py verificar-integridade  (aluguéis/manutenções órfãos, chaves sem índice)
+    #      python database.py reparar-orfaos | apagar-orfaos
+    #      python database.py categorias | adicionar-categoria <nome> <diaria_padrao>
+    #      python database.py categoria-veiculo <placa> <id_categoria>
+    import sys
+
+    def _mostrar_categorias():
+        categorias = listar_categorias()
+        return (True, [f"{c['id']:>4}  {c['nome']:<20} diária R$ {c['valor_diaria_padrao']:>8.2f}  "
+                       f"{c['disponiveis']} disponível(is)" for c in categorias] or ["Nenhuma categoria cadastrada."])
+
+    comandos = {'reconstruir-resumo': reconstruir_resumo_clientes, 'normalizar-datas': normalizar_datas,
+                'verificar-integridade': verificar_integridade, 'reparar-orfaos': reparar_orfaos,
+                'apagar-orfaos': lambda: reparar_orfaos(apagar=True), 'categorias': _mostrar_categorias,
+                'adicionar-categoria': adicionar_categoria,
+                'categoria-veiculo': lambda placa, categoria_id: definir_categoria_veiculo(placa, int(categoria_id))}
+    # Comandos com argumentos e quantos recebem
+    argumentos = {'adicionar-categoria': 2, 'categoria-veiculo': 2}
+    if len(sys.argv) >= 2 and sys.argv[1] in comandos and len(sys.argv) - 2 == argumentos.get(sys.argv[1], 0):
+        criar_tabelas()
+        sucesso, msgs = comandos[sys.argv[1]](*sys.argv[2:])
+    else:
+        sucesso, msgs = False, ["Uso: python database.py reconstruir-resumo | normalizar-datas | "
+                                "verificar-integridade | reparar-orfaos | apagar-orfaos | categorias | "
+                                "adicionar-categoria <nome> <diaria_padrao> | categoria-veiculo <placa> <id_categoria>"]
+    print("\n".join(msgs))
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,314 @@
+import os
+import re
+import sys
+import html
+from datetime import datetime, timedelta
+
+import database as db
+import precificacao
+
+# =============================================================================
+# CONTRATOS E RECIBOS DE ALUGUEL
+# =============================================================================
+# Os documentos saem de modelos de texto com campos $nome (como em
+# string.Template). Cada modelo é compilado uma vez, na importação ou em
+# registrar_modelo(), para uma string de str.format: emitir um documento é só
+# um format_map() com os campos do aluguel, sem reler o modelo.
+#   contrato  emitido na retirada: cliente, veículo, diária e devolução prevista
+#   recibo    emitido na devolução: dias cobrados e valor total
+# Formatos: 'texto' (impressora térmica, e-mail) e 'html' (navegador, PDF
+# pelo próprio navegador); no HTML os valores são escapados.
+#
+# Os recibos de um período (reemissão no fechamento do mês) são lidos do
+# banco em lotes por um cursor aberto e entregues um a um por iterar_recibos():
+# a memória usada não cresce com o tamanho do período.
+#
+# Uso: python documentos.py recibo|contrato <id_aluguel> [texto|html]
+#      python documentos.py periodo <data_inicio> <data_fim> <pasta> [texto|html]
+
+NOME_LOCADORA = "Locadora de Veículos"
+FORMATOS = ("texto", "html")
+EXTENSOES = {"texto": "txt", "html": "html"}
+TAMANHO_LOTE_DOCUMENTOS = 500
+
+CAMPOS = {
+    "locadora", "numero", "emitido_em",
+    "cliente_nome", "cliente_cpf", "cliente_telefone", "cliente_email",
+    "placa", "marca", "modelo", "ano", "cor", "valor_diaria",
+    "data_retirada", "data_prevista", "data_devolucao", "dias", "valor_total",
+}
+
+_MODELOS_PADRAO = {
+    ("contrato", "texto"): """\
+$locadora
+CONTRATO DE LOCAÇÃO Nº $numero
+Emitido em $emitido_em
+
+Locatário: $cliente_nome
+CPF: $cliente_cpf   Telefone: $cliente_telefone
+E-mail: $cliente_email
+
+Veículo: $marca $modelo $ano ($cor)
+Placa: $placa
+Diária: $valor_diaria
+
+Retirada: $data_retirada
+Devolução prevista: $data_prevista
+
+O valor final é calculado na devolução, conforme a tabela de preços vigente.
+
+_______________________________
+$cliente_nome
+""",
+    ("recibo", "texto"): """\
+$locadora
+RECIBO DE LOCAÇÃO Nº $numero
+Emitido em $emitido_em
+
+Cliente: $cliente_nome (CPF $cliente_cpf)
+Veículo: $marca $modelo - placa $placa
+
+Retirada:  $data_retirada
+Devolução: $data_devolucao
+Diárias cobradas: $dias
+
+TOTAL PAGO: $valor_total
+""",
+    ("contrato", "html"): """\
+<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Contrato $numero</title>
+<style>body { font-family: Arial, sans-serif; max-width: 40em; margin: 2em auto; }
+th { text-align: left; padding-right: 1em; } .assinatura { margin-top: 4em; border-top: 1px solid; width: 20em; }</style>
+</head><body>
+<h1>$locadora</h1>
+<h2>Contrato de Locação nº $numero</h2>
+<p>Emitido em $emitido_em</p>
+<table>
+<tr><th>Locatário</th><td>$cliente_nome</td></tr>
+<tr><th>CPF</th><td>$cliente_cpf</td></tr>
+<tr><th>Telefone</th><td>$cliente_telefone</td></tr>
+<tr><th>E-mail</th><td>$cliente_email</td></tr>
+<tr><th>Veículo</th><td>$marca $modelo $ano ($cor)</td></tr>
+<tr><th>Placa</th><td>$placa</td></tr>
+<tr><th>Diária</th><td>$valor_diaria</td></tr>
+<tr><th>Retirada</th><td>$data_retirada</td></tr>
+<tr><th>Devolução prevista</th><td>$data_prevista</td></tr>
+</table>
+<p>O valor final é calculado na devolução, conforme a tabela de preços vigente.</p>
+<p class="assinatura">$cliente_nome</p>
+</body></html>
+""",
+    ("recibo", "html"): """\
+<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Recibo $numero</title>
+<style>body { font-family: Arial, sans-serif; max-width: 40em; margin: 2em auto; }
+th { text-align: left; padding-right: 1em; } .total { font-size: 1.3em; font-weight: bold; }</style>
+</head><body>
+<h1>$locadora</h1>
+<h2>Recibo de Locação nº $numero</h2>
+<p>Emitido em $emitido_em</p>
+<table>
+<tr><th>Cliente</th><td>$cliente_nome (CPF $cliente_cpf)</td></tr>
+<tr><th>Veículo</th><td>$marca $modelo - placa $placa</td></tr>
+<tr><th>Retirada</th><td>$data_retirada</td></tr>
+<tr><th>Devolução</th><td>$data_devolucao</td></tr>
+<tr><th>Diárias cobradas</th><td>$dias</td></tr>
+</table>
+<p class="total">Total pago: $valor_total</p>
+</body></html>
+""",
+}
+
+_CAMPO_MODELO = re.compile(r"\$(\w+)")
+
+def _compilar(modelo):
+    """Converte os $campo do modelo em {campo} e devolve o format_map da string resultante."""
+    # As chaves do texto (CSS, por exemplo) são dobradas para o str.format
+    texto = modelo.replace("{", "{{").replace("}", "}}")
+    desconhecidos = set(_CAMPO_MODELO.findall(texto)) - CAMPOS
+    if desconhecidos:
+        raise ValueError(f"Campo(s) desconhecido(s) no modelo: {', '.join(sorted(desconhecidos))}.")
+    return _CAMPO_MODELO.sub(r"{\1}", texto).format_map
+
+_modelos = {chave: _compilar(modelo) for chave, modelo in _MODELOS_PADRAO.items()}
+
+def registrar_modelo(tipo, formato, modelo):
+    """Troca o modelo de `tipo` ('contrato' ou 'recibo') no `formato`; retorna (sucesso, mensagens)."""
+    if (tipo, formato) not in _modelos:
+        return (False, [f"Documento '{tipo}' no formato '{formato}' não existe."])
+    try:
+        _modelos[tipo, formato] = _compilar(modelo)
+    except ValueError as e:
+        return (False, [str(e)])
+    return (True, [f"Modelo de {tipo} ({formato}) registrado."])
+
+# =============================================================================
+# CAMPOS DOS DOCUMENTOS
+# =============================================================================
+
+def _moeda(valor):
+    return f"R$ {float(valor or 0):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _cpf(cpf):
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}" if cpf and len(cpf) == 11 else (cpf or "")
+
+def _telefone(telefone):
+    numeros = ''.join(filter(str.isdigit, telefone or ""))
+    if len(numeros) == 11:
+        return f"({numeros[:2]}) {numeros[2:7]}-{numeros[7:]}"
+    if len(numeros) == 10:
+        return f"({numeros[:2]}) {numeros[2:6]}-{numeros[6:]}"
+    return telefone or "-"
+
+def _data(texto):
+    """'AAAA-MM-DD HH:MM' como 'DD/MM/AAAA HH:MM' (ou '-' se não houver)."""
+    if not texto:
+        return "-"
+    return f"{texto[8:10]}/{texto[5:7]}/{texto[:4]} {texto[11:16]}".rstrip()
+
+def _campos(linha, emitido_em, dias_cobrados):
+    """Campos do modelo a partir de uma linha de _CONSULTA_DOCUMENTOS (sqlite3.Row)."""
+    devolucao = linha["data_devolucao"]
+    return {
+        "locadora": NOME_LOCADORA,
+        "numero": f"{linha['id']:06d}",
+        "emitido_em": emitido_em,
+        "cliente_nome": linha["nome"] or db.NOME_REGISTRO_REMOVIDO,
+        "cliente_cpf": _cpf(linha["cpf_cliente"]),
+        "cliente_telefone": _telefone(linha["telefone"]),
+        "cliente_email": linha["email"] or "-",
+        "placa": linha["placa_carro"],
+        "marca": (linha["marca"] or "").title() or db.NOME_REGISTRO_REMOVIDO,
+        "modelo": (linha["modelo"] or "").title(),
+        "ano": linha["ano"] or "",
+        "cor": (linha["cor"] or "-").title(),
+        "valor_diaria": _moeda(linha["valor_diaria"]),
+        "data_retirada": _data(linha["data_retirada"]),
+        "data_prevista": _data(linha["data_prevista"]),
+        "data_devolucao": _data(devolucao),
+        "dias": dias_cobrados(db.como_datetime(linha["data_retirada"]), db.como_datetime(devolucao)) if devolucao else "-",
+        "valor_total": _moeda(linha["valor_total"]),
+    }
+
+def _renderizar(tipo, formato, campos):
+    if formato == "html":
+        campos = {nome: html.escape(str(valor)) for nome, valor in campos.items()}
+    return _modelos[tipo, formato](campos)
+
+# {alugueis} é trocado pela tabela ou por db.fonte_com_arquivo()
+_CONSULTA_DOCUMENTOS = """
+    SELECT a.id, a.placa_carro, a.cpf_cliente, a.data_retirada, a.data_prevista,
+           a.data_devolucao, a.valor_total,
+           v.marca, v.modelo, v.ano, v.cor, v.valor_diaria, c.nome, c.telefone, c.email
+    FROM {alugueis} AS a
+    LEFT JOIN veiculos AS v ON v.placa = a.placa_carro
+    LEFT JOIN clientes AS c ON c.cpf = a.cpf_cliente
+"""
+
+# =============================================================================
+# EMISSÃO
+# =============================================================================
+
+def gerar_documento(id_aluguel, tipo=None, formato="texto"):
+    """Contrato ou recibo de um aluguel; retorna (True, texto) ou (False, [mensagem]).
+
+    Sem `tipo`, sai o recibo dos aluguéis finalizados e o contrato dos ativos.
+    Aluguéis já arquivados só têm recibo.
+    """
+    if formato not in FORMATOS:
+        return (False, [f"Formato inválido. Use: {', '.join(FORMATOS)}."])
+    conn, cursor = db.conectar_leitura()
+    try:
+        consulta = _CONSULTA_DOCUMENTOS + " WHERE a.id = ?"
+        linha = cursor.execute(consulta.format(alugueis="alugueis"),
+                               (id_aluguel,)).fetchone()
+        if linha is None:
+            fonte = db.fonte_com_arquivo(cursor, "alugueis", "fim")
+            linha = cursor.execute(consulta.format(alugueis=fonte), (id_aluguel,)).fetchone()
+        if linha is None:
+            return (False, ["Aluguel não encontrado."])
+        tipo = tipo or ("recibo" if linha["data_devolucao"] else "contrato")
+        if tipo not in ("contrato", "recibo"):
+            return (False, ["Tipo de documento inválido. Use 'contrato' ou 'recibo'."])
+        if tipo == "recibo" and not linha["data_devolucao"]:
+            return (False, ["O recibo só é emitido depois da devolução."])
+        dias_cobrados = precificacao.tabela_vigente(cursor).dias_cobrados
+        campos = _campos(linha, datetime.now().strftime('%d/%m/%Y %H:%M'), dias_cobrados)
+        return (True, _renderizar(tipo, formato, campos))
+    except Exception as e:
+        return (False, [f"Erro ao gerar o documento: {e}"])
+    finally:
+        conn.close()
+
+def iterar_recibos(data_inicio, data_fim, formato="texto", tamanho_lote=TAMANHO_LOTE_DOCUMENTOS):
+    """Gerador de (id_aluguel, texto) dos recibos devolvidos em [data_inicio, data_fim] ('AAAA-MM-DD').
+
+    Inclui as partições de arquivo do período. O cursor fica aberto até o fim
+    da iteração e só `tamanho_lote` linhas ficam em memória de cada vez.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido. Use: {', '.join(FORMATOS)}.")
+    inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+    fim_exclusivo = (datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    emitido_em = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    conn, cursor = db.conectar_leitura()
+    try:
+        dias_cobrados = precificacao.tabela_vigente(cursor).dias_cobrados
+        fonte = db.fonte_com_arquivo(cursor, "alugueis", "fim", data_inicio, fim_exclusivo)
+        cursor.execute(
+            _CONSULTA_DOCUMENTOS.format(alugueis=fonte)
+            + " WHERE a.data_devolucao >= ? AND a.data_devolucao < ? ORDER BY a.data_devolucao",
+            (inicio.strftime('%Y-%m-%d'), fim_exclusivo)
+        )
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote:
+                break
+            for linha in lote:
+                yield linha["id"], _renderizar("recibo", formato, _campos(linha, emitido_em, dias_cobrados))
+    finally:
+        conn.close()
+
+def emitir_recibos_periodo(data_inicio, data_fim, pasta, formato="html", ao_progredir=None):
+    """Grava em `pasta` um arquivo por recibo do período (recibo-<id>.<ext>).
+
+    `ao_progredir(quantidade)` é chamada a cada TAMANHO_LOTE_DOCUMENTOS
+    arquivos. Retorna (sucesso, mensagens).
+    """
+    try:
+        datetime.strptime(data_inicio, '%Y-%m-%d')
+        datetime.strptime(data_fim, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return (False, ["Formato de data inválido. Use 'AAAA-MM-DD'."])
+    if formato not in FORMATOS:
+        return (False, [f"Formato inválido. Use: {', '.join(FORMATOS)}."])
+    quantidade = 0
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        for id_aluguel, texto in iterar_recibos(data_inicio, data_fim, formato):
+            with open(os.path.join(pasta, f"recibo-{id_aluguel:06d}.{EXTENSOES[formato]}"), "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto)
+            quantidade += 1
+            if ao_progredir and quantidade % TAMANHO_LOTE_DOCUMENTOS == 0:
+                ao_progredir(quantidade)
+    except Exception as e:
+        return (False, [f"Erro ao emitir os recibos ({quantidade} gravado(s)): {e}"])
+    return (True, [f"{quantidade} recibo(s) gravado(s) em {pasta}."])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] in ("recibo", "contrato"):
+        sucesso, resultado = gerar_documento(int(sys.argv[2]), sys.argv[1], sys.argv[3] if len(sys.argv) > 3 else "texto")
+        print(resultado if sucesso else resultado[0])
+    elif len(sys.argv) >= 5 and sys.argv[1] == "periodo":
+        sucesso, msgs = emitir_recibos_periodo(sys.argv[2], sys.argv[3], sys.argv[4],
+                                               sys.argv[5] if len(sys.argv) > 5 else "html",
+                                               ao_progredir=lambda feitos: print(f"\r{feitos} recibo(s)", end=""))
+        print()
+        print(msgs[0])
+    else:
+        print("Uso: python documentos.py recibo|contrato <id_aluguel> [texto|html]")
+        print("     python documentos.py periodo <data_inicio> <data_fim> <pasta> [texto|html]")
+        sucesso = False
+    sys.exit(0 if sucesso else 1)
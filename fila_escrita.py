@@ -0,0 +1,120 @@
+import sqlite3
+import queue
+import threading
+from concurrent.futures import Future
+
+import database as db
+
+# =============================================================================
+# FILA DE ESCRITA COM COMMIT EM GRUPO
+# =============================================================================
+# Uso opcional: em vez de chamar db.realizar_devolucao(placa) diretamente,
+# vários balcões podem chamar fila.executar(db.realizar_devolucao, placa).
+# Uma única thread escritora agrupa os comandos recebidos e aplica todos na
+# mesma transação, com um SAVEPOINT por comando. Cada chamador recebe o mesmo
+# retorno (sucesso, mensagens) que teria recebido chamando a função direto,
+# mas o fsync do COMMIT é pago uma vez por lote.
+
+class FilaEscrita:
+    """Fila de comandos de escrita aplicados por uma única thread em lotes."""
+
+    def __init__(self, tamanho_max_lote=64, espera_max=0.002):
+        self.tamanho_max_lote = tamanho_max_lote
+        self.espera_max = espera_max
+        self._fila = queue.Queue()
+        self._thread = None
+        self.total_comandos = 0
+        self.total_commits = 0
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._laco_escritor, name="fila-escrita", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        if self._thread is not None:
+            self._fila.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def enviar(self, funcao, *args, **kwargs):
+        """Enfileira a chamada e devolve um Future com o retorno da função."""
+        if self._thread is None:
+            raise RuntimeError("A fila de escrita não foi iniciada.")
+        futuro = Future()
+        self._fila.put((futuro, funcao, args, kwargs))
+        return futuro
+
+    def executar(self, funcao, *args, **kwargs):
+        """Enfileira a chamada e espera o commit do lote que a contém."""
+        return self.enviar(funcao, *args, **kwargs).result()
+
+    def _coletar_lote(self):
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return None, True
+        lote = [primeiro]
+        parar = False
+        while len(lote) < self.tamanho_max_lote:
+            try:
+                item = self._fila.get(timeout=self.espera_max)
+            except queue.Empty:
+                break
+            if item is None:
+                parar = True
+                break
+            lote.append(item)
+        return lote, parar
+
+    def _laco_escritor(self):
+        conn = sqlite3.connect(db.NOME_BANCO_DADOS, isolation_level=None, uri=True)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            while True:
+                lote, parar = self._coletar_lote()
+                if lote:
+                    self._aplicar_lote(conn, lote)
+                if parar:
+                    break
+        finally:
+            conn.close()
+
+    def _aplicar_lote(self, conn, lote):
+        resultados = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            for futuro, *_ in lote:
+                futuro.set_exception(e)
+            return
+
+        for i, (futuro, funcao, args, kwargs) in enumerate(lote):
+            with db.usando_conexao(conn, f"cmd_{i}"):
+                try:
+                    resultados.append((futuro, funcao(*args, **kwargs), None))
+                except Exception as e:
+                    resultados.append((futuro, None, e))
+
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK")
+            for futuro, *_ in lote:
+                futuro.set_exception(e)
+            return
+
+        self.total_comandos += len(lote)
+        self.total_commits += 1
+        for futuro, resultado, erro in resultados:
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(resultado)
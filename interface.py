@@ -1,9 +1,28 @@
+import sys
+import time
+import string
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
+
+# Referência para o modo de medição de inicialização (--medir-inicio).
+_INICIO_PROCESSO = time.perf_counter()
 # Importa as funções do seu arquivo de banco de dados
 # Certifique-se de que este arquivo se chame 'database.py' e esteja na mesma pasta
 import database as db
+import analise
+import relatorios
+import backup
+import terminal
+import manutencao_preventiva
+import balcao_expresso
+import documentos
+
+# Quem executa as operações de escrita: o próprio database.py ou, no modo
+# balcão (--terminal <banco_central>), um terminal.TerminalOffline que grava na
+# réplica local e sincroniza com a central.
+operacoes = db
 
 # =============================================================================
 # WIDGET PERSONALIZADO COM PLACEHOLDER
@@ -43,6 +62,242 @@ class EntryComTextoDeAjuda(ttk.Entry):
         else:
             self.mostrando_texto_ajuda = False
 
+# =============================================================================
+# LISTA VIRTUAL (RENDERIZA APENAS AS LINHAS VISÍVEIS)
+# =============================================================================
+
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def sem_caixa(valor):
+    """Valor comparado por COLLATE NOCASE: só as letras A-Z viram minúsculas."""
+    return None if valor is None else str(valor).translate(_MINUSCULAS_ASCII)
+
+class ListaVirtual(ttk.Frame):
+    """Lista com cara de Treeview que guarda os dados numa lista Python.
+
+    Só existem no Tcl os itens das linhas visíveis; ao rolar, os mesmos itens
+    recebem os valores da nova janela de linhas. Cada linha é um dicionário
+    (como os retornados por database.py) identificado por `coluna_chave`, e
+    `formatar_linha` só é chamada para as linhas que aparecem na tela.
+
+    Se `ao_ordenar(coluna, decrescente)` for informado, o clique no cabeçalho
+    delega a ordenação a ele (normalmente recarregando do banco já ordenado)
+    em vez de ordenar a lista em Python. As linhas trocadas por
+    atualizar_linhas() são então reposicionadas como o ORDER BY do banco faria:
+    `chaves_ordenacao` dá, por coluna, a função que devolve o valor comparado
+    pelo SQL (sem_caixa para COLLATE NOCASE, o nome para colunas calculadas).
+    """
+    def __init__(self, master, colunas, coluna_chave, formatar_linha, largura_coluna=None, ao_ordenar=None,
+                 chaves_ordenacao=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.colunas = colunas
+        self.coluna_chave = coluna_chave
+        self.formatar_linha = formatar_linha
+        self.ao_ordenar = ao_ordenar
+        self.chaves_ordenacao = chaves_ordenacao or {}
+        self.linhas = []
+        self._posicoes = {}
+        self._slots = []
+        self._inicio = 0
+        self._qtd_visivel = 1
+        self._altura = 0
+        self._chave_selecionada = None
+        self._coluna_ordem = None
+        self._ordem_decrescente = False
+
+        self.tree = ttk.Treeview(self, columns=colunas, show="headings", selectmode="none")
+        for col in colunas:
+            self.tree.heading(col, text=obter_cabecalho_exibicao(col), command=lambda c=col: self.ordenar_por(c))
+            self.tree.column(col, anchor=tk.CENTER)
+            if largura_coluna:
+                self.tree.column(col, width=largura_coluna)
+        self.tree.pack(expand=True, fill="both", side="left")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._ao_rolar_barra)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._ao_redimensionar)
+        self.tree.bind("<MouseWheel>", self._ao_girar_roda)
+        self.tree.bind("<Button-4>", self._ao_girar_roda)
+        self.tree.bind("<Button-5>", self._ao_girar_roda)
+
+    def bind(self, sequence=None, func=None, add=None):
+        # Os eventos de clique acontecem no Treeview interno.
+        return self.tree.bind(sequence, func, add)
+
+    def carregar(self, linhas):
+        """Substitui os dados da lista, mantendo a ordenação escolhida pelo usuário."""
+        self.linhas = list(linhas)
+        self._chave_selecionada = None
+        self._inicio = 0
+        if self._coluna_ordem and not self.ao_ordenar:
+            self._ordenar()
+        self._indexar()
+        self._renderizar()
+
+    def atualizar_linhas(self, chaves, linhas):
+        """Troca só as linhas das `chaves` alteradas, sem recarregar a lista.
+
+        `linhas` são as que continuam pertencendo à lista (consultadas com os
+        filtros da tela); as chaves sem linha saem da lista e as linhas novas
+        entram na ordem do cabeçalho (ou no fim, sem ordem escolhida).
+        """
+        novas = {linha[self.coluna_chave]: linha for linha in linhas}
+        mudou_posicoes = False
+        for chave in chaves:
+            posicao = self._posicoes.get(chave)
+            linha = novas.get(chave)
+            if posicao is not None:
+                self.linhas[posicao] = linha
+                mudou_posicoes = mudou_posicoes or linha is None
+            elif linha is not None:
+                self.linhas.append(linha)
+                mudou_posicoes = True
+        if mudou_posicoes:
+            self.linhas = [linha for linha in self.linhas if linha is not None]
+        if self._chave_selecionada in chaves and self._chave_selecionada not in novas:
+            self._chave_selecionada = None
+        if self._coluna_ordem:
+            # Lista quase ordenada: o sort do Python a percorre em tempo linear
+            self._ordenar()
+            mudou_posicoes = True
+        if mudou_posicoes:
+            self._indexar()
+        self._renderizar()
+
+    def ordenar_por(self, coluna):
+        if self._coluna_ordem == coluna:
+            self._ordem_decrescente = not self._ordem_decrescente
+        else:
+            if self._coluna_ordem:
+                self.tree.heading(self._coluna_ordem, text=obter_cabecalho_exibicao(self._coluna_ordem))
+            self._coluna_ordem = coluna
+            self._ordem_decrescente = False
+        seta = "▼" if self._ordem_decrescente else "▲"
+        self.tree.heading(coluna, text=f"{obter_cabecalho_exibicao(coluna)} {seta}")
+        if self.ao_ordenar:
+            self.ao_ordenar(coluna, self._ordem_decrescente)
+            return
+        self._ordenar()
+        self._indexar()
+        self._inicio = 0
+        self._renderizar()
+
+    def ordem_atual(self):
+        """Retorna (coluna, decrescente) escolhidos no cabeçalho; coluna é None se não houver."""
+        return self._coluna_ordem, self._ordem_decrescente
+
+    def _ordenar(self):
+        coluna = self._coluna_ordem
+        valor = self.chaves_ordenacao.get(coluna) or (lambda linha: linha.get(coluna))
+        if self.ao_ordenar:
+            # Como no ORDER BY do SQLite: NULL antes dos demais valores na ordem crescente
+            chave = lambda linha: (valor(linha) is not None, valor(linha))
+        else:
+            # Valores ausentes ficam sempre no fim da ordenação crescente.
+            chave = lambda linha: (valor(linha) is None, valor(linha))
+        self.linhas.sort(key=chave, reverse=self._ordem_decrescente)
+
+    def _indexar(self):
+        chave = self.coluna_chave
+        self._posicoes = {linha[chave]: i for i, linha in enumerate(self.linhas)}
+
+    def identificar_chave(self, y):
+        """Retorna a chave da linha exibida na coordenada y, ou None."""
+        slot = self.tree.identify_row(y)
+        if not slot or slot not in self._slots:
+            return None
+        posicao = self._inicio + self._slots.index(slot)
+        if posicao >= len(self.linhas):
+            return None
+        return self.linhas[posicao][self.coluna_chave]
+
+    def valores(self, chave):
+        """Valores formatados (como exibidos) da linha com a chave informada."""
+        return self.formatar_linha(self.linhas[self._posicoes[chave]])
+
+    def linha(self, chave):
+        """A linha (dicionário) com a chave informada."""
+        return self.linhas[self._posicoes[chave]]
+
+    def selecionar(self, chave):
+        """Seleciona a linha pela chave e rola a lista até ela, se preciso."""
+        if chave not in self._posicoes:
+            return
+        self._chave_selecionada = chave
+        posicao = self._posicoes[chave]
+        if not (self._inicio <= posicao < self._inicio + self._qtd_visivel):
+            self._inicio = posicao
+        self._renderizar()
+
+    def chave_selecionada(self):
+        return self._chave_selecionada
+
+    def limpar_selecao(self):
+        self._chave_selecionada = None
+        self.tree.selection_set(())
+
+    def _ao_rolar_barra(self, acao, quantidade, unidade=None):
+        if acao == "moveto":
+            self._rolar_para(int(float(quantidade) * len(self.linhas)))
+        elif acao == "scroll":
+            passo = self._qtd_visivel if unidade == "pages" else 1
+            self._rolar_para(self._inicio + int(quantidade) * passo)
+
+    def _ao_girar_roda(self, event):
+        para_cima = event.num == 4 or event.delta > 0
+        self._rolar_para(self._inicio + (-3 if para_cima else 3))
+        return "break"
+
+    def _rolar_para(self, inicio):
+        inicio = max(0, min(inicio, len(self.linhas) - self._qtd_visivel))
+        if inicio != self._inicio:
+            self._inicio = inicio
+            self._renderizar()
+
+    def _ao_redimensionar(self, event):
+        self._altura = event.height
+        # A primeira estimativa usa medidas padrão; depois de renderizar, a
+        # posição real da primeira linha permite corrigir a quantidade.
+        if self._ajustar_qtd_visivel():
+            self._ajustar_qtd_visivel()
+
+    def _ajustar_qtd_visivel(self):
+        topo, altura_linha = 25, 20
+        if self._slots:
+            caixa = self.tree.bbox(self._slots[0])
+            if caixa:
+                topo, altura_linha = caixa[1], caixa[3]
+        qtd_visivel = max(1, (self._altura - topo) // altura_linha)
+        if qtd_visivel == self._qtd_visivel:
+            return False
+        self._qtd_visivel = qtd_visivel
+        self._renderizar()
+        return True
+
+    def _renderizar(self):
+        total = len(self.linhas)
+        self._inicio = max(0, min(self._inicio, total - self._qtd_visivel))
+        fim = min(total, self._inicio + self._qtd_visivel)
+        janela = self.linhas[self._inicio:fim]
+
+        while len(self._slots) < len(janela):
+            self._slots.append(self.tree.insert("", "end"))
+        while len(self._slots) > len(janela):
+            self.tree.delete(self._slots.pop())
+
+        selecionados = []
+        for slot, linha in zip(self._slots, janela):
+            self.tree.item(slot, values=self.formatar_linha(linha))
+            if self._chave_selecionada is not None and linha[self.coluna_chave] == self._chave_selecionada:
+                selecionados.append(slot)
+        self.tree.selection_set(selecionados)
+
+        if total:
+            self.scrollbar.set(self._inicio / total, fim / total)
+        else:
+            self.scrollbar.set(0, 1)
+
 # =============================================================================
 # FUNÇÕES AUXILIARES DE FORMATAÇÃO E UI
 # =============================================================================
@@ -62,6 +317,28 @@ def criar_cabecalho_secao(parent, text):
     ).grid(row=0, column=1, sticky="ew", padx=10)
     ttk.Separator(frame_cabecalho, orient="horizontal").grid(row=0, column=2, sticky="ew", padx=10)
 
+def configurar_ordenacao_cabecalho(tree, colunas, ao_ordenar):
+    """Faz o clique no cabeçalho de um Treeview chamar ao_ordenar(coluna, decrescente).
+
+    Retorna o dicionário com a ordem escolhida, para ser usado nas consultas.
+    """
+    ordem = {"coluna": None, "decrescente": False}
+
+    def ao_clicar(coluna):
+        if ordem["coluna"] == coluna:
+            ordem["decrescente"] = not ordem["decrescente"]
+        else:
+            if ordem["coluna"]:
+                tree.heading(ordem["coluna"], text=obter_cabecalho_exibicao(ordem["coluna"]))
+            ordem["coluna"], ordem["decrescente"] = coluna, False
+        seta = "▼" if ordem["decrescente"] else "▲"
+        tree.heading(coluna, text=f"{obter_cabecalho_exibicao(coluna)} {seta}")
+        ao_ordenar(coluna, ordem["decrescente"])
+
+    for col in colunas:
+        tree.heading(col, command=lambda c=col: ao_clicar(c))
+    return ordem
+
 def formatar_cpf(cpf):
     cpf_numerico = ''.join(filter(str.isdigit, str(cpf)))
     if len(cpf_numerico) == 11:
@@ -89,6 +366,11 @@ def desformatar_moeda(valor_str):
     except (ValueError, TypeError):
         return 0.0
 
+def formatar_percentual(valor):
+    if valor is None:
+        return "N/A"
+    return f"{valor * 100:.1f}%".replace(".", ",")
+
 def formatar_texto_capitalizado(texto):
     if isinstance(texto, str):
         return texto.title()
@@ -101,27 +383,90 @@ def obter_cabecalho_exibicao(nome_coluna):
         "data_retirada": "Data de Retirada", "data_devolucao": "Data de Devolução",
         "nome_cliente": "Nome do Cliente", "valor_total": "Valor Total", "carro": "Carro",
         "cliente": "Cliente", "data_entrada": "Data de Entrada", "data_saida": "Data de Saída",
-        "custo": "Custo Previsto", "descricao": "Descrição"
+        "custo": "Custo Previsto", "descricao": "Descrição", "mes": "Mês", "qtd_veiculos": "Qtd. Veículos",
+        "dias_alugados": "Dias Alugados", "dias_disponiveis": "Dias Disponíveis", "utilizacao": "Utilização",
+        "receita": "Receita", "custo_manutencao": "Custo de Manutenção", "margem": "Margem",
+        "situacao": "Situação", "vence_em": "Vence em", "alugueis_restantes": "Aluguéis Restantes",
+        "custo_estimado": "Custo Estimado", "dia": "Dia", "qtd_alugueis": "Qtd. Aluguéis",
+        "qtd_manutencoes": "Qtd. Manutenções"
     }
     return cabecalhos.get(nome_coluna, nome_coluna.replace("_", " ").title())
 
+# Intervalos do painel: leitura dos contadores e conferência com as tabelas.
+INTERVALO_ATUALIZACAO_PAINEL_MS = 5_000
+INTERVALO_RECONCILIACAO_MS = 10 * 60_000
+# Backups automáticos (backup.py), só com BACKUP_AUTOMATICO (--backup-automatico):
+# a cada hora, guardando as últimas 24 cópias em backup.PASTA_BACKUPS.
+BACKUP_AUTOMATICO = False
+INTERVALO_BACKUP_S = 60 * 60
+BACKUPS_MANTIDOS = 24
+# Relatórios com --leitura-relatorios copia: renovação da cópia de leitura.
+INTERVALO_COPIA_LEITURA_S = 5 * 60
+# Balcão expresso: recarga do índice de aluguéis ativos e carros disponíveis.
+INTERVALO_RECARGA_EXPRESSO_MS = 30_000
+LINHAS_REGISTRO_EXPRESSO = 500
+# Alterações feitas por outras janelas no mesmo banco (database.ObservadorAlteracoes).
+INTERVALO_ALTERACOES_MS = 1_000
+# Modo balcão: frequência da linha de estado da sincronização.
+INTERVALO_ESTADO_TERMINAL_MS = 2_000
+# Falhas das tarefas em segundo plano (backups, cópia de leitura) na linha de avisos.
+INTERVALO_AVISOS_MS = 5_000
+
 # =============================================================================
 # CLASSE PRINCIPAL DA APLICAÇÃO
 # =============================================================================
 
 class LocadoraApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, medir_inicio=False, terminal_balcao=None):
         super().__init__()
+        self.medir_inicio = medir_inicio
+        self.terminal_balcao = terminal_balcao
+        self.backup_agendado = self.copia_leitura = None
+        # Falhas em segundo plano ainda exibidas na linha de avisos: origem -> mensagem
+        self._avisos = {}
+        self.tempos_inicio = [("tk.Tk()", time.perf_counter())]
         self.title("Sistema de Gerenciamento de Locadora")
         self.geometry("1200x750")
 
         db.criar_tabelas()
+        self._marcar_etapa("verificação do esquema")
+        # No modo balcão a réplica é reescrita pela sincronização sem passar pelo
+        # log de eventos; as abas continuam sendo recarregadas ao serem selecionadas.
+        self.observador = db.ObservadorAlteracoes() if self.terminal_balcao is None else None
+        if self.terminal_balcao is not None:
+            # Os backups ficam com a central; o balcão só sincroniza
+            self.terminal_balcao.iniciar()
+        elif BACKUP_AUTOMATICO and not self.medir_inicio:
+            self.backup_agendado = backup.BackupAgendado(INTERVALO_BACKUP_S, BACKUPS_MANTIDOS).iniciar()
+        if db.DESTINO_LEITURA == 'copia' and not self.medir_inicio:
+            self.copia_leitura = backup.CopiaLeituraAgendada(INTERVALO_COPIA_LEITURA_S).iniciar()
 
         self._configurar_estilos()
         self._criar_widgets_principais()
+        self._marcar_etapa("janela e abas")
         
         self.focus_set()
         self.ao_mudar_aba(None)
+        self._marcar_etapa("primeira aba")
+
+        if self.medir_inicio:
+            self.after_idle(self._relatar_inicio)
+
+    def _marcar_etapa(self, nome):
+        if self.medir_inicio:
+            self.tempos_inicio.append((nome, time.perf_counter()))
+
+    def _relatar_inicio(self):
+        """Chamado no primeiro ciclo ocioso do mainloop, com a janela já desenhada."""
+        self.update_idletasks()
+        self._marcar_etapa("primeiro quadro interativo")
+        anterior = _INICIO_PROCESSO
+        print("Tempo de inicialização:")
+        for nome, instante in self.tempos_inicio:
+            print(f"  {nome:<28} +{(instante - anterior) * 1000:8.1f} ms")
+            anterior = instante
+        print(f"  {'total':<28} {(anterior - _INICIO_PROCESSO) * 1000:9.1f} ms")
+        self.destroy()
 
     def _configurar_estilos(self):
         style = ttk.Style(self)
@@ -137,33 +482,113 @@ class LocadoraApp(tk.Tk):
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(pady=5, padx=10, expand=True, fill="both")
 
-        self.tab_veiculos = AbaVeiculos(self.notebook)
-        self.tab_clientes = AbaClientes(self.notebook)
-        self.tab_alugueis = AbaAlugueis(self.notebook)
-        self.tab_manutencao = AbaManutencao(self.notebook)
-        self.tab_relatorios = AbaRelatorios(self.notebook)
-
-        self.notebook.add(self.tab_veiculos, text="🚗\u2009Veículos")
-        self.notebook.add(self.tab_clientes, text="👥\u2009Clientes")
-        self.notebook.add(self.tab_alugueis, text="🔑\u2009Aluguéis")
-        self.notebook.add(self.tab_manutencao, text="🛠️\u2009Manutenção")
-        self.notebook.add(self.tab_relatorios, text="📊\u2009Relatórios")
+        # As abas são construídas só quando selecionadas pela primeira vez;
+        # até lá o notebook guarda apenas um frame vazio para cada uma.
+        abas = [
+            ("tab_painel", AbaPainel, "📋\u2009Painel"),
+            ("tab_veiculos", AbaVeiculos, "🚗\u2009Veículos"),
+            ("tab_clientes", AbaClientes, "👥\u2009Clientes"),
+            ("tab_alugueis", AbaAlugueis, "🔑\u2009Aluguéis"),
+            ("tab_expresso", AbaBalcaoExpresso, "⚡\u2009Balcão Expresso"),
+            ("tab_manutencao", AbaManutencao, "🛠️\u2009Manutenção"),
+            ("tab_relatorios", AbaRelatorios, "📊\u2009Relatórios"),
+        ]
+        self._abas_pendentes = {}
+        self._atributos_abas = [atributo for atributo, _, _ in abas]
+        for atributo, classe_aba, texto in abas:
+            container = ttk.Frame(self.notebook)
+            self.notebook.add(container, text=texto)
+            self._abas_pendentes[str(container)] = (atributo, classe_aba, container)
+            setattr(self, atributo, None)
         
         self.notebook.bind("<<NotebookTabChanged>>", self.ao_mudar_aba)
+        self.after(INTERVALO_RECONCILIACAO_MS, self._reconciliar_contadores)
+        if self.observador is not None:
+            self.after(INTERVALO_ALTERACOES_MS, self._verificar_alteracoes)
+
+        if self.terminal_balcao is not None:
+            self.estado_terminal_label = ttk.Label(self, font=("Arial", 10), anchor="w")
+            self.estado_terminal_label.pack(fill="x", padx=10, pady=(0, 5))
+            self._atualizar_estado_terminal()
+
+        self.avisos_label = ttk.Label(self, font=("Arial", 10), foreground="#b00020", anchor="w")
+        self.avisos_label.pack(fill="x", padx=10, pady=(0, 5))
+        self.after(INTERVALO_AVISOS_MS, self._verificar_tarefas)
+
+    def _avisar(self, origem, mensagem=None):
+        """Mostra (ou, sem mensagem, retira) o aviso de falha de uma tarefa em segundo plano."""
+        if mensagem:
+            self._avisos[origem] = f"{datetime.now():%H:%M} {mensagem}"
+        else:
+            self._avisos.pop(origem, None)
+        self.avisos_label.config(text="  |  ".join(f"⚠️ {origem}: {texto}" for origem, texto in self._avisos.items()))
+
+    def _verificar_tarefas(self):
+        """Lê o último resultado das threads de backup e da cópia de leitura."""
+        for origem, tarefa in (("Backup", self.backup_agendado), ("Cópia de leitura", self.copia_leitura)):
+            if tarefa is not None and tarefa.ultimo_resultado is not None:
+                sucesso, msgs = tarefa.ultimo_resultado
+                self._avisar(origem, None if sucesso else msgs[0])
+        self.after(INTERVALO_AVISOS_MS, self._verificar_tarefas)
+
+    def _atualizar_estado_terminal(self):
+        """Mostra se o balcão está conectado à central e quantas operações aguardam envio."""
+        contagem = self.terminal_balcao.contar_operacoes()
+        if self.terminal_balcao.online is None:
+            texto = "⏳ Conectando à central..."
+        elif self.terminal_balcao.online:
+            hora = self.terminal_balcao.ultima_sincronizacao.strftime('%H:%M:%S')
+            texto = f"🟢 Conectado à central (sincronizado às {hora})"
+        else:
+            texto = "🔴 Sem conexão com a central: operações guardadas neste balcão"
+        texto += f"  |  Pendentes: {contagem.get('Pendente', 0)}"
+        if contagem.get('Conflito'):
+            texto += f"  |  ⚠️ Em conflito: {contagem['Conflito']}"
+        self.estado_terminal_label.config(text=texto)
+        self.after(INTERVALO_ESTADO_TERMINAL_MS, self._atualizar_estado_terminal)
+
+    def _reconciliar_contadores(self):
+        """Confere periodicamente os contadores do painel com as tabelas."""
+        sucesso, msgs = db.reconciliar_contadores()
+        self._avisar("Contadores", None if sucesso else msgs[0])
+        self.after(INTERVALO_RECONCILIACAO_MS, self._reconciliar_contadores)
+
+    def _verificar_alteracoes(self):
+        """Repassa às abas já construídas as chaves alteradas neste ou em outro processo."""
+        alteracoes = self.observador.verificar()
+        if alteracoes:
+            for atributo in self._atributos_abas:
+                aba = getattr(self, atributo)
+                if aba is not None and hasattr(aba, "aplicar_alteracoes"):
+                    aba.aplicar_alteracoes(alteracoes)
+        self.after(INTERVALO_ALTERACOES_MS, self._verificar_alteracoes)
+
+    def _construir_aba(self, aba_selecionada):
+        pendente = self._abas_pendentes.pop(str(aba_selecionada), None)
+        if pendente:
+            atributo, classe_aba, container = pendente
+            aba = classe_aba(container)
+            aba.pack(expand=True, fill="both")
+            setattr(self, atributo, aba)
 
     def ao_mudar_aba(self, event):
         self.focus_set()
         try:
             aba_selecionada = self.notebook.select()
+            self._construir_aba(aba_selecionada)
             nome_da_aba = self.notebook.tab(aba_selecionada, "text")
 
-            if "Veículos" in nome_da_aba:
+            if "Painel" in nome_da_aba:
+                self.tab_painel.atualizar()
+            elif "Veículos" in nome_da_aba:
                 self.tab_veiculos.popular_lista_veiculos()
             elif "Clientes" in nome_da_aba:
                 self.tab_clientes.popular_lista_clientes()
             elif "Aluguéis" in nome_da_aba:
                 self.tab_alugueis.popular_alugueis_ativos()
                 self.tab_alugueis.atualizar_sugestoes()
+            elif "Expresso" in nome_da_aba:
+                self.tab_expresso.ativar()
             elif "Manutenção" in nome_da_aba:
                 self.tab_manutencao.popular_manutencoes_ativas()
                 self.tab_manutencao.atualizar_veiculos_disponiveis()
@@ -173,13 +598,79 @@ class LocadoraApp(tk.Tk):
         except tk.TclError:
             pass
 
+# =============================================================================
+# ABA DO PAINEL
+# =============================================================================
+
+class AbaPainel(ttk.Frame):
+    """Resumo da frota lido dos contadores de db.obter_painel()."""
+    INDICADORES = (
+        ("veiculos_disponiveis", "🟢\u2009Disponíveis"),
+        ("veiculos_alugados", "🔑\u2009Alugados"),
+        ("veiculos_em_manutencao", "🛠️\u2009Em Manutenção"),
+        ("alugueis_ativos", "📄\u2009Aluguéis Ativos"),
+        ("manutencoes_em_andamento", "🔧\u2009Manutenções em Andamento"),
+        ("receita_hoje", "💲\u2009Faturamento de Hoje"),
+    )
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.labels_valor = {}
+        self._criar_widgets()
+        self.after(INTERVALO_ATUALIZACAO_PAINEL_MS, self._atualizar_periodicamente)
+
+    def _criar_widgets(self):
+        criar_cabecalho_secao(self, "Visão Geral da Frota")
+        frame_indicadores = ttk.Frame(self)
+        frame_indicadores.pack(pady=20)
+        for i, (chave, titulo) in enumerate(self.INDICADORES):
+            cartao = ttk.LabelFrame(frame_indicadores, text=titulo, padding=15)
+            cartao.grid(row=i // 3, column=i % 3, padx=15, pady=15, sticky="nsew")
+            label = ttk.Label(cartao, text="-", font=("Arial", 24, "bold"), anchor="center", width=12)
+            label.pack()
+            self.labels_valor[chave] = label
+
+        frame_botoes = ttk.Frame(self)
+        frame_botoes.pack(pady=5)
+        ttk.Button(frame_botoes, text="🔄\u2009Atualizar", style="Emoji.TButton", command=self.atualizar).pack(side="left", padx=5)
+        ttk.Button(frame_botoes, text="🧮\u2009Conferir Contadores", style="Emoji.TButton", command=self.conferir_contadores).pack(side="left", padx=5)
+        self.label_atualizado = ttk.Label(self, foreground="grey")
+        self.label_atualizado.pack(pady=5)
+
+    def atualizar(self):
+        painel = db.obter_painel()
+        for chave, label in self.labels_valor.items():
+            valor = painel[chave]
+            label.config(text=formatar_moeda(valor) if chave == "receita_hoje" else str(valor))
+        self.label_atualizado.config(text=f"Atualizado às {datetime.now().strftime('%H:%M:%S')}")
+
+    def _atualizar_periodicamente(self):
+        if self.winfo_viewable():
+            self.atualizar()
+        self.after(INTERVALO_ATUALIZACAO_PAINEL_MS, self._atualizar_periodicamente)
+
+    def aplicar_alteracoes(self, alteracoes):
+        # Os contadores são uma leitura só; não precisam das chaves
+        if self.winfo_viewable():
+            self.atualizar()
+
+    def conferir_contadores(self):
+        sucesso, msgs = db.reconciliar_contadores()
+        if sucesso:
+            messagebox.showinfo("Contadores", "\n".join(msgs))
+            self.atualizar()
+        else:
+            messagebox.showerror("Erro", "\n".join(msgs))
+
 # ... (O restante das classes AbaVeiculos, AbaClientes, AbaAlugueis e AbaRelatorios permanece o mesmo) ...
 class AbaVeiculos(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.item_selecionado = None
+        # Categorias cadastradas: nome -> id e id -> nome
+        self.ids_categorias = {}
+        self.nomes_categorias = {}
         self._criar_widgets()
-        self.popular_lista_veiculos()
 
     def _criar_widgets(self):
         criar_cabecalho_secao(self, "Cadastro de Veículo")
@@ -200,6 +691,10 @@ class AbaVeiculos(ttk.Frame):
             entrada = EntryComTextoDeAjuda(frame_formulario, texto_ajuda=texto_ajuda, width=40)
             entrada.grid(row=i, column=1, padx=(2, 10), pady=5, sticky="ew")
             self.entradas[chave] = entrada
+        # Sem diária informada, o veículo recebe a diária padrão da categoria
+        ttk.Label(frame_formulario, text="Categoria:").grid(row=len(campos), column=0, padx=(10, 2), pady=5, sticky="e")
+        self.combo_categoria = ttk.Combobox(frame_formulario, width=38, state="readonly")
+        self.combo_categoria.grid(row=len(campos), column=1, padx=(2, 10), pady=5, sticky="ew")
 
         frame_botoes = ttk.Frame(self)
         frame_botoes.pack(pady=5)
@@ -210,48 +705,105 @@ class AbaVeiculos(ttk.Frame):
         ttk.Button(frame_botoes, text="🧹\u2009Limpar Campos", style="Emoji.TButton", command=self.limpar_campos).pack(side="left", padx=5)
 
         criar_cabecalho_secao(self, "Lista de Veículos")
+        frame_filtros = ttk.Frame(self)
+        frame_filtros.pack(pady=(0, 5))
+
+        # Chaves iguais aos parâmetros de db.listar_veiculos; campos vazios não filtram.
+        campos_filtro = [
+            ("Marca:", "marca", 12), ("Modelo:", "modelo", 12), ("Ano de:", "ano_min", 6), ("até", "ano_max", 6),
+            ("Diária de:", "valor_min", 8), ("até", "valor_max", 8)
+        ]
+        self.filtros = {}
+        for i, (texto_label, chave, largura) in enumerate(campos_filtro):
+            ttk.Label(frame_filtros, text=texto_label).grid(row=0, column=2 * i, padx=(8, 2))
+            self.filtros[chave] = ttk.Entry(frame_filtros, width=largura)
+            self.filtros[chave].grid(row=0, column=2 * i + 1)
+        ttk.Label(frame_filtros, text="Status:").grid(row=0, column=12, padx=(8, 2))
+        self.filtros["status_filtro"] = ttk.Combobox(frame_filtros, width=14, state="readonly",
+                                                     values=("", "Disponível", "Alugado", "Em Manutenção"))
+        self.filtros["status_filtro"].grid(row=0, column=13)
+        ttk.Button(frame_filtros, text="🔍\u2009Filtrar", style="Emoji.TButton", command=self.popular_lista_veiculos).grid(row=0, column=14, padx=(10, 2))
+        ttk.Button(frame_filtros, text="✖\u2009Limpar Filtros", style="Emoji.TButton", command=self.limpar_filtros).grid(row=0, column=15, padx=2)
+
         frame_lista = ttk.Frame(self)
         frame_lista.pack(expand=True, fill="both", padx=10, pady=(0, 10))
         
-        colunas = ("placa", "marca", "modelo", "ano", "cor", "valor_diaria", "status")
-        self.tree = ttk.Treeview(frame_lista, columns=colunas, show="headings")
-        
-        for col in colunas:
-            self.tree.heading(col, text=obter_cabecalho_exibicao(col))
-            self.tree.column(col, width=100, anchor=tk.CENTER)
-            
-        self.tree.pack(expand=True, fill="both", side="left")
-        scrollbar = ttk.Scrollbar(frame_lista, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        colunas = ("placa", "marca", "modelo", "ano", "cor", "valor_diaria", "status", "categoria")
+        # As mesmas ordens de database.ORDENACAO_VEICULOS
+        chaves_ordenacao = {
+            "marca": lambda v: sem_caixa(v['marca']), "modelo": lambda v: sem_caixa(v['modelo']),
+            "cor": lambda v: sem_caixa(v['cor']), "categoria": lambda v: self.nomes_categorias.get(v['categoria_id']),
+        }
+        self.tree = ListaVirtual(frame_lista, colunas, coluna_chave="placa", formatar_linha=self._formatar_veiculo,
+                                 largura_coluna=100, ao_ordenar=lambda *_: self.popular_lista_veiculos(),
+                                 chaves_ordenacao=chaves_ordenacao)
+        self.tree.pack(expand=True, fill="both")
         
         self.tree.bind("<ButtonRelease-1>", self.ao_clicar_no_item)
 
+    def _formatar_veiculo(self, veiculo):
+        return (
+            veiculo['placa'].upper(), formatar_texto_capitalizado(veiculo['marca']),
+            formatar_texto_capitalizado(veiculo['modelo']), veiculo['ano'],
+            formatar_texto_capitalizado(veiculo['cor']), formatar_moeda(veiculo['valor_diaria']),
+            veiculo['status'], self.nomes_categorias.get(veiculo['categoria_id'], "-")
+        )
+
+    def carregar_categorias(self):
+        categorias = db.listar_categorias()
+        self.ids_categorias = {c['nome']: c['id'] for c in categorias}
+        self.nomes_categorias = {c['id']: c['nome'] for c in categorias}
+        self.combo_categoria['values'] = [""] + list(self.ids_categorias)
+
     def popular_lista_veiculos(self):
         self.item_selecionado = None
-        for linha in self.tree.get_children():
-            self.tree.delete(linha)
-        for veiculo in db.listar_veiculos():
-            valores_para_exibir = (
-                veiculo['placa'].upper(), formatar_texto_capitalizado(veiculo['marca']),
-                formatar_texto_capitalizado(veiculo['modelo']), veiculo['ano'],
-                formatar_texto_capitalizado(veiculo['cor']), formatar_moeda(veiculo['valor_diaria']),
-                veiculo['status']
-            )
-            self.tree.insert("", "end", values=valores_para_exibir)
+        self.carregar_categorias()
+        coluna, decrescente = self.tree.ordem_atual()
+        filtros = {chave: campo.get().strip() for chave, campo in self.filtros.items()}
+        try:
+            veiculos = db.listar_veiculos(**filtros, ordenar_por=coluna, decrescente=decrescente)
+        except ValueError:
+            messagebox.showerror("Erro de Filtro", "Ano e valor da diária devem ser números.")
+            return
+        self.tree.carregar(veiculos)
+
+    def aplicar_alteracoes(self, alteracoes):
+        if "veiculos" not in alteracoes:
+            return
+        placas = alteracoes["veiculos"]
+        if placas is None:
+            self.popular_lista_veiculos()
+            return
+        filtros = {chave: campo.get().strip() for chave, campo in self.filtros.items()}
+        try:
+            veiculos = db.listar_veiculos(**filtros, placas=placas)
+        except ValueError:
+            return
+        if any(v['categoria_id'] not in self.nomes_categorias for v in veiculos if v['categoria_id'] is not None):
+            self.carregar_categorias()
+        self.tree.atualizar_linhas(placas, veiculos)
+        if self.item_selecionado in placas and self.tree.chave_selecionada() is None:
+            self.limpar_campos()
+
+    def limpar_filtros(self):
+        for campo in self.filtros.values():
+            if isinstance(campo, ttk.Combobox):
+                campo.set('')
+            else:
+                campo.delete(0, tk.END)
+        self.popular_lista_veiculos()
 
     def ao_clicar_no_item(self, event):
-        id_item_clicado = self.tree.identify_row(event.y)
-        if not id_item_clicado: return
+        placa_clicada = self.tree.identificar_chave(event.y)
+        if placa_clicada is None: return
         
-        if self.item_selecionado == id_item_clicado:
-            self.tree.selection_remove(id_item_clicado)
+        if self.item_selecionado == placa_clicada:
             self.limpar_campos()
         else:
             self.limpar_campos(limpar_selecao=False)
-            self.tree.selection_set(id_item_clicado)
-            self.item_selecionado = id_item_clicado
-            valores = self.tree.item(id_item_clicado)['values']
+            self.tree.selecionar(placa_clicada)
+            self.item_selecionado = placa_clicada
+            valores = self.tree.valores(placa_clicada)
             valor_sem_cifrao = str(valores[5]).replace("R$", "").replace(".", "").replace(",", ".").strip()
             
             mapa_entradas = {"placa": valores[0], "marca": valores[1], "modelo": valores[2], 
@@ -260,6 +812,7 @@ class AbaVeiculos(ttk.Frame):
                 self.entradas[chave].delete(0, tk.END)
                 self.entradas[chave].insert(0, valor)
                 self.entradas[chave].mostrando_texto_ajuda = False
+            self.combo_categoria.set(valores[7] if valores[7] in self.ids_categorias else "")
             
             self.entradas["placa"].config(state="disabled")
 
@@ -268,16 +821,18 @@ class AbaVeiculos(ttk.Frame):
         for entrada in self.entradas.values():
             entrada.delete(0, "end")
             entrada._ao_perder_foco()
-        if limpar_selecao and self.tree.selection():
-            self.tree.selection_remove(self.tree.selection())
+        self.combo_categoria.set("")
+        if limpar_selecao:
+            self.tree.limpar_selecao()
         self.item_selecionado = None
 
     def adicionar_veiculo(self):
         dados = {chave: entrada.get() for chave, entrada in self.entradas.items()}
         if self.entradas['placa'].mostrando_texto_ajuda: dados['placa'] = ''
-        sucesso, mensagens = db.adicionar_veiculo(
+        if self.entradas['valor_da_diária'].mostrando_texto_ajuda: dados['valor_da_diária'] = ''
+        sucesso, mensagens = operacoes.adicionar_veiculo(
             dados["placa"], dados["marca"], dados["modelo"], dados["ano"], 
-            dados["cor"], dados["valor_da_diária"]
+            dados["cor"], dados["valor_da_diária"], self.ids_categorias.get(self.combo_categoria.get())
         )
         if sucesso:
             messagebox.showinfo("Sucesso", mensagens[0])
@@ -296,10 +851,13 @@ class AbaVeiculos(ttk.Frame):
         dados = {chave: entrada.get() for chave, entrada in self.entradas.items()}
         entrada_placa.config(state="disabled")
 
-        sucesso, mensagens = db.atualizar_veiculo(
+        sucesso, mensagens = operacoes.atualizar_veiculo(
             dados["placa"], dados["marca"], dados["modelo"], dados["ano"], 
             dados["cor"], dados["valor_da_diária"]
         )
+        categoria_id = self.ids_categorias.get(self.combo_categoria.get())
+        if sucesso and categoria_id != self.tree.linha(self.item_selecionado)['categoria_id']:
+            sucesso, mensagens = operacoes.definir_categoria_veiculo(dados["placa"], categoria_id)
         if sucesso:
             messagebox.showinfo("Sucesso", mensagens[0])
             self.limpar_campos()
@@ -318,7 +876,7 @@ class AbaVeiculos(ttk.Frame):
         entrada_placa.config(state="disabled")
 
         if messagebox.askyesno("Confirmar Remoção", f"Remover veículo de placa {placa}?"):
-            sucesso, mensagens = db.remover_veiculo(placa)
+            sucesso, mensagens = operacoes.remover_veiculo(placa)
             if sucesso:
                 messagebox.showinfo("Sucesso", mensagens[0])
                 self.limpar_campos()
@@ -327,11 +885,18 @@ class AbaVeiculos(ttk.Frame):
                 messagebox.showerror("Erro", "\n".join(mensagens))
 
 class AbaClientes(ttk.Frame):
+    CAMPOS_PERFIL = (
+        ("qtd_alugueis", "Aluguéis"),
+        ("valor_gasto", "Gasto Total"),
+        ("media_dias", "Duração Média"),
+        ("ultima_retirada", "Último Aluguel"),
+        ("em_andamento", "Em Andamento"),
+    )
+
     def __init__(self, parent):
         super().__init__(parent)
         self.item_selecionado = None
         self._criar_widgets()
-        self.popular_lista_clientes()
 
     def _criar_widgets(self):
         criar_cabecalho_secao(self, "Cadastro de Cliente")
@@ -360,68 +925,118 @@ class AbaClientes(ttk.Frame):
         ttk.Button(frame_botoes, text="🗑️\u2009Remover", style="Emoji.TButton", command=self.remover_cliente).pack(side="left", padx=5)
         ttk.Button(frame_botoes, text="🧹\u2009Limpar Campos", style="Emoji.TButton", command=self.limpar_campos).pack(side="left", padx=5)
 
+        criar_cabecalho_secao(self, "Perfil do Cliente")
+        frame_perfil = ttk.Frame(self)
+        frame_perfil.pack(pady=(0, 10))
+        self.labels_perfil = {}
+        for i, (chave, titulo) in enumerate(self.CAMPOS_PERFIL):
+            ttk.Label(frame_perfil, text=titulo, foreground="grey").grid(row=0, column=i, padx=12)
+            label = ttk.Label(frame_perfil, text="-", font=("Arial", 11, "bold"))
+            label.grid(row=1, column=i, padx=12)
+            self.labels_perfil[chave] = label
+
         criar_cabecalho_secao(self, "Lista de Clientes")
+        frame_filtros = ttk.Frame(self)
+        frame_filtros.pack(pady=(0, 5))
+        ttk.Label(frame_filtros, text="Nome começa com:").grid(row=0, column=0, padx=(8, 2))
+        self.filtro_nome = ttk.Entry(frame_filtros, width=30)
+        self.filtro_nome.grid(row=0, column=1)
+        ttk.Button(frame_filtros, text="🔍\u2009Filtrar", style="Emoji.TButton", command=self.popular_lista_clientes).grid(row=0, column=2, padx=(10, 2))
+        ttk.Button(frame_filtros, text="✖\u2009Limpar Filtro", style="Emoji.TButton", command=self.limpar_filtro).grid(row=0, column=3, padx=2)
+
         frame_lista = ttk.Frame(self)
         frame_lista.pack(expand=True, fill="both", padx=10, pady=(0, 10))
         
         colunas = ("cpf", "nome", "telefone", "email")
-        self.tree = ttk.Treeview(frame_lista, columns=colunas, show="headings")
-        
-        for col in colunas:
-            self.tree.heading(col, text=obter_cabecalho_exibicao(col))
-            self.tree.column(col, anchor=tk.CENTER)
-            
-        self.tree.pack(expand=True, fill="both", side="left")
-        
-        scrollbar = ttk.Scrollbar(frame_lista, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side="right", fill="y")
+        self.tree = ListaVirtual(frame_lista, colunas, coluna_chave="cpf", formatar_linha=self._formatar_cliente,
+                                 ao_ordenar=lambda *_: self.popular_lista_clientes(),
+                                 chaves_ordenacao={"nome": lambda c: sem_caixa(c['nome'])})
+        self.tree.pack(expand=True, fill="both")
 
         self.tree.bind("<ButtonRelease-1>", self.ao_clicar_no_item)
+
+    @staticmethod
+    def _formatar_cliente(cliente):
+        return (
+            formatar_cpf(cliente['cpf']),
+            formatar_texto_capitalizado(cliente['nome']),
+            formatar_telefone(cliente['telefone']),
+            cliente['email']
+        )
         
+    def mostrar_perfil(self, cpf=None):
+        """Preenche o perfil com db.obter_resumo_cliente(); sem `cpf`, limpa o painel."""
+        if cpf is None:
+            for label in self.labels_perfil.values():
+                label.config(text="-")
+            return
+        resumo = db.obter_resumo_cliente(cpf)
+        ultima = resumo["ultima_retirada"]
+        textos = {
+            "qtd_alugueis": str(resumo["qtd_alugueis"]),
+            "valor_gasto": formatar_moeda(resumo["valor_gasto"]),
+            "media_dias": f"{resumo['media_dias']:.1f} dia(s)" if resumo["qtd_finalizados"] else "-",
+            "ultima_retirada": ultima[:10] if ultima else "-",
+            "em_andamento": ", ".join(a["placa_carro"] for a in resumo["em_andamento"]) or "Nenhum",
+        }
+        for chave, label in self.labels_perfil.items():
+            label.config(text=textos[chave])
+
     def popular_lista_clientes(self):
         self.item_selecionado = None
-        for linha in self.tree.get_children(): self.tree.delete(linha)
-        for cliente in db.listar_clientes():
-            valores = (
-                formatar_cpf(cliente['cpf']),
-                formatar_texto_capitalizado(cliente['nome']),
-                formatar_telefone(cliente['telefone']),
-                cliente['email']
-            )
-            self.tree.insert("", "end", values=valores)
+        self.mostrar_perfil()
+        coluna, decrescente = self.tree.ordem_atual()
+        self.tree.carregar(db.listar_clientes(nome=self.filtro_nome.get(), ordenar_por=coluna, decrescente=decrescente))
+
+    def aplicar_alteracoes(self, alteracoes):
+        if "clientes" in alteracoes:
+            cpfs = alteracoes["clientes"]
+            if cpfs is None:
+                self.popular_lista_clientes()
+                return
+            self.tree.atualizar_linhas(cpfs, db.listar_clientes(nome=self.filtro_nome.get(), cpfs=cpfs))
+            if self.item_selecionado in cpfs and self.tree.chave_selecionada() is None:
+                self.limpar_campos()
+        if self.item_selecionado and "alugueis" in alteracoes:
+            # Os totais do perfil mudam com os aluguéis do cliente
+            self.mostrar_perfil(self.item_selecionado)
+
+    def limpar_filtro(self):
+        self.filtro_nome.delete(0, tk.END)
+        self.popular_lista_clientes()
             
     def ao_clicar_no_item(self, event):
-        id_item_clicado = self.tree.identify_row(event.y)
-        if not id_item_clicado: return
+        cpf_clicado = self.tree.identificar_chave(event.y)
+        if cpf_clicado is None: return
         
-        if self.item_selecionado == id_item_clicado:
-            self.tree.selection_remove(id_item_clicado)
+        if self.item_selecionado == cpf_clicado:
             self.limpar_campos()
         else:
             self.limpar_campos(limpar_selecao=False)
-            self.tree.selection_set(id_item_clicado)
-            self.item_selecionado = id_item_clicado
-            valores = self.tree.item(id_item_clicado)['values']
+            self.tree.selecionar(cpf_clicado)
+            self.item_selecionado = cpf_clicado
+            valores = self.tree.valores(cpf_clicado)
             mapa_entradas = {"cpf": valores[0], "nome": valores[1], "telefone": valores[2], "e_mail": valores[3]}
             for chave, valor in mapa_entradas.items():
                 self.entradas[chave].delete(0, tk.END)
                 self.entradas[chave].insert(0, valor)
                 self.entradas[chave].mostrando_texto_ajuda = False
             self.entradas["cpf"].config(state="disabled")
+            self.mostrar_perfil(cpf_clicado)
 
     def limpar_campos(self, limpar_selecao=True):
         self.entradas["cpf"].config(state="normal")
         for entrada in self.entradas.values():
             entrada.delete(0, "end")
             entrada._ao_perder_foco()
-        if limpar_selecao and self.tree.selection():
-            self.tree.selection_remove(self.tree.selection())
+        if limpar_selecao:
+            self.tree.limpar_selecao()
         self.item_selecionado = None
+        self.mostrar_perfil()
 
     def adicionar_cliente(self):
         dados = {chave: entrada.get() for chave, entrada in self.entradas.items()}
-        sucesso, msgs = db.adicionar_cliente(dados["cpf"], dados["nome"], dados["telefone"], dados["e_mail"])
+        sucesso, msgs = operacoes.adicionar_cliente(dados["cpf"], dados["nome"], dados["telefone"], dados["e_mail"])
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
             self.limpar_campos()
@@ -439,7 +1054,7 @@ class AbaClientes(ttk.Frame):
         dados = {chave: entrada.get() for chave, entrada in self.entradas.items()}
         entrada_cpf.config(state="disabled")
 
-        sucesso, msgs = db.atualizar_cliente(dados["cpf"], dados["nome"], dados["telefone"], dados["e_mail"])
+        sucesso, msgs = operacoes.atualizar_cliente(dados["cpf"], dados["nome"], dados["telefone"], dados["e_mail"])
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
             self.limpar_campos()
@@ -458,7 +1073,7 @@ class AbaClientes(ttk.Frame):
         entrada_cpf.config(state="disabled")
 
         if messagebox.askyesno("Confirmar Remoção", f"Remover o cliente de CPF {cpf}?"):
-            sucesso, msgs = db.remover_cliente(cpf)
+            sucesso, msgs = operacoes.remover_cliente(cpf)
             if sucesso:
                 messagebox.showinfo("Sucesso", msgs[0])
                 self.limpar_campos()
@@ -470,9 +1085,10 @@ class AbaAlugueis(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.item_selecionado = None
+        # Marcado quando outra janela altera veículos ou clientes; as listas das
+        # sugestões são relidas ao abrir a caixa, e não a cada alteração
+        self._sugestoes_desatualizadas = True
         self._criar_widgets()
-        self.popular_alugueis_ativos()
-        self.atualizar_sugestoes()
 
     def _criar_widgets(self):
         criar_cabecalho_secao(self, "Gerenciar Aluguel")
@@ -483,13 +1099,20 @@ class AbaAlugueis(ttk.Frame):
         
         self.entradas = {}
         ttk.Label(frame_formulario, text="Placa do Carro:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-        self.entradas['placa_do_carro'] = ttk.Combobox(frame_formulario, width=38)
+        self.entradas['placa_do_carro'] = ttk.Combobox(frame_formulario, width=38, postcommand=self._atualizar_sugestoes_se_preciso)
         self.entradas['placa_do_carro'].grid(row=0, column=1, padx=(2, 10), pady=5, sticky="ew")
         
         ttk.Label(frame_formulario, text="CPF do Cliente:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-        self.entradas['cpf_do_cliente'] = ttk.Combobox(frame_formulario, width=38)
+        self.entradas['cpf_do_cliente'] = ttk.Combobox(frame_formulario, width=38, postcommand=self._atualizar_sugestoes_se_preciso)
         self.entradas['cpf_do_cliente'].grid(row=1, column=1, padx=(2, 10), pady=5, sticky="ew")
 
+        # Escolher a categoria preenche a placa com o melhor veículo disponível dela
+        ttk.Label(frame_formulario, text="Categoria:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+        self.combo_categoria = ttk.Combobox(frame_formulario, width=38, state="readonly", postcommand=self.carregar_categorias)
+        self.combo_categoria.grid(row=2, column=1, padx=(2, 10), pady=5, sticky="ew")
+        self.combo_categoria.bind("<<ComboboxSelected>>", self.ao_escolher_categoria)
+        self.ids_categorias = {}
+
         frame_botoes = ttk.Frame(self)
         frame_botoes.pack(pady=5)
         
@@ -507,6 +1130,7 @@ class AbaAlugueis(ttk.Frame):
         for col in colunas:
             self.tree.heading(col, text=obter_cabecalho_exibicao(col))
             self.tree.column(col, anchor=tk.CENTER)
+        self.ordem = configurar_ordenacao_cabecalho(self.tree, colunas, lambda *_: self.popular_alugueis_ativos())
 
         self.tree.pack(expand=True, fill="both", side="left")
         scrollbar = ttk.Scrollbar(frame_lista, orient="vertical", command=self.tree.yview)
@@ -519,12 +1143,57 @@ class AbaAlugueis(ttk.Frame):
         for linha in self.tree.get_children(): self.tree.delete(linha)
         
         try:
-            alugueis = db.listar_alugueis_ativos()
+            alugueis = db.listar_alugueis_ativos(ordenar_por=self.ordem["coluna"], decrescente=self.ordem["decrescente"])
             for aluguel in alugueis:
-                valores = (formatar_cpf(aluguel['cpf_cliente']), aluguel['id'], aluguel['placa_carro'].upper(), aluguel['data_retirada'])
-                self.tree.insert("", "end", values=valores)
+                self.tree.insert("", "end", iid=str(aluguel['id']), values=self._formatar_aluguel(aluguel))
         except Exception as e:
             messagebox.showerror("Erro de Banco de Dados", f"Não foi possível buscar os aluguéis:\n{e}")
+
+    def carregar_categorias(self):
+        """Categorias com a quantidade disponível de cada uma (contadores, sem varrer a frota)."""
+        self.ids_categorias = {
+            f"{c['nome']} ({c['disponiveis']} disponível(is))": c['id'] for c in db.listar_categorias()
+        }
+        self.combo_categoria['values'] = list(self.ids_categorias)
+
+    def ao_escolher_categoria(self, event=None):
+        categoria_id = self.ids_categorias.get(self.combo_categoria.get())
+        if categoria_id is None:
+            return
+        sucesso, resultado = db.escolher_veiculo(categoria_id)
+        if sucesso:
+            self.entradas['placa_do_carro'].set(resultado)
+        else:
+            self.entradas['placa_do_carro'].set('')
+            messagebox.showwarning("Aviso", "\n".join(resultado))
+
+    @staticmethod
+    def _formatar_aluguel(aluguel):
+        return (formatar_cpf(aluguel['cpf_cliente']), aluguel['id'], aluguel['placa_carro'].upper(), aluguel['data_retirada'])
+
+    def aplicar_alteracoes(self, alteracoes):
+        if "veiculos" in alteracoes or "clientes" in alteracoes:
+            self._sugestoes_desatualizadas = True
+        if "alugueis" not in alteracoes:
+            return
+        ids = alteracoes["alugueis"]
+        if ids is None:
+            self.popular_alugueis_ativos()
+            return
+        ativos = {aluguel['id']: aluguel for aluguel in db.listar_alugueis_ativos(ids=ids)}
+        for id_aluguel in ids:
+            iid = str(id_aluguel)
+            if id_aluguel in ativos:
+                valores = self._formatar_aluguel(ativos[id_aluguel])
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=valores)
+                else:
+                    # Na ordem padrão (retirada mais recente primeiro) o aluguel novo fica no topo
+                    self.tree.insert("", 0, iid=iid, values=valores)
+            elif self.tree.exists(iid):
+                if self.item_selecionado == iid:
+                    self.limpar_campos()
+                self.tree.delete(iid)
     
     def ao_clicar_no_item(self, event):
         id_item_clicado = self.tree.identify_row(event.y)
@@ -545,13 +1214,16 @@ class AbaAlugueis(ttk.Frame):
             
             self.entradas['placa_do_carro'].config(state="disabled")
             self.entradas['cpf_do_cliente'].config(state="disabled")
+            self.combo_categoria.config(state="disabled")
 
     def limpar_campos(self, limpar_selecao=True):
         self.entradas['placa_do_carro'].config(state="normal")
         self.entradas['cpf_do_cliente'].config(state="normal")
+        self.combo_categoria.config(state="readonly")
         
         self.entradas['placa_do_carro'].set('')
         self.entradas['cpf_do_cliente'].set('')
+        self.combo_categoria.set('')
 
         if limpar_selecao and self.tree.selection():
             self.tree.selection_remove(self.tree.selection())
@@ -565,7 +1237,7 @@ class AbaAlugueis(ttk.Frame):
         placa = self.entradas['placa_do_carro'].get()
         cpf = self.entradas['cpf_do_cliente'].get()
         
-        sucesso, msgs = db.realizar_aluguel(placa, cpf)
+        sucesso, msgs = operacoes.realizar_aluguel(placa, cpf)
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
             self.limpar_campos()
@@ -585,7 +1257,7 @@ class AbaAlugueis(ttk.Frame):
         if not messagebox.askyesno("Confirmar Devolução", f"Registrar a devolução do veículo de placa {placa}?"):
                 return
 
-        sucesso, msgs, _ = db.realizar_devolucao(placa)
+        sucesso, msgs, _ = operacoes.realizar_devolucao(placa)
         if sucesso:
             messagebox.showinfo("Devolução Realizada", msgs[0])
             self.limpar_campos()
@@ -594,17 +1266,97 @@ class AbaAlugueis(ttk.Frame):
         else:
             messagebox.showerror("Erro na Devolução", "\n".join(msgs))
 
+    def _atualizar_sugestoes_se_preciso(self):
+        if self._sugestoes_desatualizadas:
+            self.atualizar_sugestoes()
+
     def atualizar_sugestoes(self):
+        self._sugestoes_desatualizadas = False
         carros_disponiveis = [carro['placa'].upper() for carro in db.listar_veiculos(status_filtro='Disponível')]
         self.entradas['placa_do_carro']['values'] = carros_disponiveis
         
         cpfs_formatados = [formatar_cpf(c['cpf']) for c in db.listar_clientes()]
         self.entradas['cpf_do_cliente']['values'] = cpfs_formatados
 
+class AbaBalcaoExpresso(ttk.Frame):
+    """Aluguéis e devoluções só pelo teclado ou leitor: placa ou CPF e Enter, sem janelas de confirmação."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.balcao = balcao_expresso.BalcaoExpresso(operacoes)
+        self._criar_widgets()
+        self.after(INTERVALO_RECARGA_EXPRESSO_MS, self._recarregar_periodicamente)
+
+    def _criar_widgets(self):
+        criar_cabecalho_secao(self, "Leia a Placa ou o CPF e tecle Enter")
+        self.entrada = ttk.Entry(self, font=("Arial", 20), width=24, justify="center")
+        self.entrada.pack(pady=(0, 5))
+        self.entrada.bind("<Return>", self.ao_confirmar)
+        self.entrada.bind("<KP_Enter>", self.ao_confirmar)
+        self.entrada.bind("<Escape>", self.ao_cancelar)
+        self.label_aguardando = ttk.Label(self, font=("Arial", 12, "bold"))
+        self.label_aguardando.pack(pady=(0, 5))
+        ttk.Label(self, foreground="grey", text="Placa de carro alugado: devolução.  Placa disponível + CPF "
+                                                 "(em qualquer ordem): aluguel.  Esc: cancela a leitura em andamento.").pack()
+
+        criar_cabecalho_secao(self, "Registro do Balcão")
+        frame_registro = ttk.Frame(self)
+        frame_registro.pack(expand=True, fill="both", padx=10, pady=(0, 10))
+        self.registro = tk.Listbox(frame_registro, font=("Courier", 11), activestyle="none")
+        self.registro.pack(expand=True, fill="both", side="left")
+        scrollbar = ttk.Scrollbar(frame_registro, orient="vertical", command=self.registro.yview)
+        self.registro.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+
+    def ativar(self):
+        self.balcao.carregar()
+        self._mostrar_aguardando()
+        self.entrada.focus_set()
+
+    def aplicar_alteracoes(self, alteracoes):
+        placas, ids_alugueis = alteracoes.get("veiculos", ()), alteracoes.get("alugueis", ())
+        if placas is None or ids_alugueis is None:
+            self.balcao.carregar()
+        elif placas or ids_alugueis:
+            self.balcao.aplicar_alteracoes(placas, ids_alugueis)
+        else:
+            return
+        self._mostrar_aguardando()
+
+    def _recarregar_periodicamente(self):
+        if self.winfo_viewable() and not self.entrada.get():
+            self.balcao.carregar()
+            self._mostrar_aguardando()
+        self.after(INTERVALO_RECARGA_EXPRESSO_MS, self._recarregar_periodicamente)
+
+    def _mostrar_aguardando(self):
+        self.label_aguardando.config(text=self.balcao.aguardando() or "Pronto.")
+
+    def ao_confirmar(self, event=None):
+        inicio = time.perf_counter()
+        texto = self.entrada.get()
+        self.entrada.delete(0, tk.END)
+        sucesso, mensagem = self.balcao.processar(texto)
+        self._mostrar_aguardando()
+        # Mais recente no topo, com o tempo desde o Enter (índice em memória + banco)
+        milissegundos = (time.perf_counter() - inicio) * 1000
+        self.registro.insert(0, f"{datetime.now():%H:%M:%S}  {'✔' if sucesso else '✖'}  {mensagem}  ({milissegundos:.0f} ms)")
+        self.registro.itemconfig(0, foreground="dark green" if sucesso else "red")
+        if self.registro.size() > LINHAS_REGISTRO_EXPRESSO:
+            self.registro.delete(LINHAS_REGISTRO_EXPRESSO, tk.END)
+        return "break"
+
+    def ao_cancelar(self, event=None):
+        self.entrada.delete(0, tk.END)
+        self.balcao.cancelar()
+        self._mostrar_aguardando()
+        return "break"
+
 class AbaRelatorios(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.item_selecionado = None
+        self.cpf_filtrado = None
         self._criar_widgets()
 
     def _criar_widgets(self):
@@ -616,19 +1368,30 @@ class AbaRelatorios(ttk.Frame):
         self.entrada_cpf_hist.grid(row=0, column=1, padx=5, pady=5)
         ttk.Button(frame_acoes, text="🔍\u2009Buscar por CPF", style="Emoji.TButton", command=self.buscar_historico_por_cpf).grid(row=0, column=2, padx=5, pady=5)
         ttk.Button(frame_acoes, text="📜\u2009Ver Histórico Geral", style="Emoji.TButton", command=self.ver_historico_geral).grid(row=0, column=3, padx=20, pady=5)
+        ttk.Button(frame_acoes, text="🧾\u2009Emitir Documento", style="Emoji.TButton", command=self.emitir_documento).grid(row=0, column=4, padx=5, pady=5)
+
+        frame_filtros = ttk.Frame(frame_acoes)
+        frame_filtros.grid(row=1, column=0, columnspan=4, pady=(0, 5))
+        ttk.Label(frame_filtros, text="Placa:").grid(row=0, column=0, padx=(5, 2))
+        self.filtro_placa_hist = ttk.Entry(frame_filtros, width=10)
+        self.filtro_placa_hist.grid(row=0, column=1)
+        ttk.Label(frame_filtros, text="Status:").grid(row=0, column=2, padx=(10, 2))
+        self.filtro_status_hist = ttk.Combobox(frame_filtros, width=11, state="readonly", values=("", "Ativo", "Finalizado"))
+        self.filtro_status_hist.grid(row=0, column=3)
+        ttk.Label(frame_filtros, text="Retirada de:").grid(row=0, column=4, padx=(10, 2))
+        self.filtro_retirada_inicio = EntryComTextoDeAjuda(frame_filtros, texto_ajuda="AAAA-MM-DD", width=12)
+        self.filtro_retirada_inicio.grid(row=0, column=5)
+        ttk.Label(frame_filtros, text="até").grid(row=0, column=6, padx=2)
+        self.filtro_retirada_fim = EntryComTextoDeAjuda(frame_filtros, texto_ajuda="AAAA-MM-DD", width=12)
+        self.filtro_retirada_fim.grid(row=0, column=7)
         
         criar_cabecalho_secao(self, "Histórico de Aluguéis")
         frame_lista_hist = ttk.Frame(self)
         frame_lista_hist.pack(expand=True, fill="both", padx=10, pady=(0,5))
         colunas = ("cpf_cliente", "placa_carro", "data_retirada", "data_devolucao", "valor_total", "status")
-        self.tree_hist = ttk.Treeview(frame_lista_hist, columns=colunas, show="headings")
-        for col in colunas:
-            self.tree_hist.heading(col, text=obter_cabecalho_exibicao(col))
-            self.tree_hist.column(col, width=130, anchor=tk.CENTER)
-        self.tree_hist.pack(expand=True, fill="both", side="left")
-        scrollbar_hist = ttk.Scrollbar(frame_lista_hist, orient="vertical", command=self.tree_hist.yview)
-        self.tree_hist.configure(yscrollcommand=scrollbar_hist.set)
-        scrollbar_hist.pack(side="right", fill="y")
+        self.tree_hist = ListaVirtual(frame_lista_hist, colunas, coluna_chave="id", formatar_linha=self._formatar_historico,
+                                      largura_coluna=130, ao_ordenar=lambda *_: self._recarregar_historico())
+        self.tree_hist.pack(expand=True, fill="both")
         
         self.tree_hist.bind("<ButtonRelease-1>", self.ao_clicar_no_item)
         
@@ -648,6 +1411,9 @@ class AbaRelatorios(ttk.Frame):
         frame_botao_calcular = ttk.Frame(frame_faturamento)
         frame_botao_calcular.grid(row=0, column=2, rowspan=2, padx=10)
         ttk.Button(frame_botao_calcular, text="💲\u2009Calcular", style="Emoji.TButton", command=self.calcular_faturamento).pack()
+        ttk.Button(frame_botao_calcular, text="📈\u2009Análise da Frota", style="Emoji.TButton", command=self.abrir_analise_frota).pack(pady=(5, 0))
+        ttk.Button(frame_botao_calcular, text="🗂️\u2009Fechamento do Período", style="Emoji.TButton", command=self.abrir_fechamento).pack(pady=(5, 0))
+        ttk.Button(frame_botao_calcular, text="🧾\u2009Recibos do Período", style="Emoji.TButton", command=self.emitir_recibos_periodo).pack(pady=(5, 0))
 
         self.label_faturamento = ttk.Label(frame_faturamento, text="Faturamento Total: R$ 0,00", font=("Arial", 12, "bold"))
         self.label_faturamento.grid(row=0, column=3, rowspan=2, padx=20)
@@ -660,48 +1426,67 @@ class AbaRelatorios(ttk.Frame):
             self.entrada_cpf_hist.set('')
 
     def ao_clicar_no_item(self, event):
-        id_item_clicado = self.tree_hist.identify_row(event.y)
-        if not id_item_clicado: return
+        id_clicado = self.tree_hist.identificar_chave(event.y)
+        if id_clicado is None: return
         
-        if self.item_selecionado == id_item_clicado:
-            self.tree_hist.selection_remove(id_item_clicado)
+        if self.item_selecionado == id_clicado:
+            self.tree_hist.limpar_selecao()
             self.item_selecionado = None
         else:
-            self.tree_hist.selection_set(id_item_clicado)
-            self.item_selecionado = id_item_clicado
+            self.tree_hist.selecionar(id_clicado)
+            self.item_selecionado = id_clicado
+
+    @staticmethod
+    def _formatar_historico(item):
+        data_devolucao_val = item.get('data_devolucao')
+        data_devolucao_display = data_devolucao_val if data_devolucao_val else "Pendente"
+        valor = formatar_moeda(item.get('valor_total')) if data_devolucao_val else "N/A"
+        return (
+            formatar_cpf(item.get('cpf_cliente', 'N/A')),
+            item.get('placa_carro', 'N/A').upper(),
+            item.get('data_retirada', 'N/A'),
+            data_devolucao_display, valor,
+            item.get('status', 'N/A')
+        )
             
     def _popular_historico(self, historico_completo):
         self.item_selecionado = None
-        for linha in self.tree_hist.get_children(): self.tree_hist.delete(linha)
+        self.tree_hist.carregar(historico_completo)
         
         if not historico_completo:
             messagebox.showinfo("Histórico", "Nenhum registro encontrado.")
-            return
-            
-        for item in historico_completo:
-            data_devolucao_val = item.get('data_devolucao')
-            data_devolucao_display = data_devolucao_val if data_devolucao_val else "Pendente"
-            valor = formatar_moeda(item.get('valor_total')) if data_devolucao_val else "N/A"
-            valores_tupla = (
-                formatar_cpf(item.get('cpf_cliente', 'N/A')),
-                item.get('placa_carro', 'N/A').upper(),
-                item.get('data_retirada', 'N/A'),
-                data_devolucao_display, valor,
-                item.get('status', 'N/A')
-            )
-            self.tree_hist.insert("", "end", values=valores_tupla)
             
+    def _recarregar_historico(self):
+        """Consulta o histórico com o CPF escolhido, os filtros e a ordem do cabeçalho."""
+        datas = []
+        for entrada in (self.filtro_retirada_inicio, self.filtro_retirada_fim):
+            data = "" if entrada.mostrando_texto_ajuda else entrada.get().strip()
+            if data:
+                try:
+                    datetime.strptime(data, '%Y-%m-%d')
+                except ValueError:
+                    messagebox.showerror("Erro de Data", "Formato de data inválido. Use 'AAAA-MM-DD'.")
+                    return
+            datas.append(data)
+
+        coluna, decrescente = self.tree_hist.ordem_atual()
+        historico = db.buscar_historico(
+            filtro_cpf=self.cpf_filtrado, placa=self.filtro_placa_hist.get(), status=self.filtro_status_hist.get(),
+            data_inicio=datas[0], data_fim=datas[1], ordenar_por=coluna, decrescente=decrescente
+        )
+        self._popular_historico(historico)
+
     def buscar_historico_por_cpf(self):
         cpf = self.entrada_cpf_hist.get()
         if not cpf:
             messagebox.showwarning("Aviso", "Por favor, insira um CPF.")
             return
-        historico = db.buscar_historico(filtro_cpf=cpf)
-        self._popular_historico(historico)
+        self.cpf_filtrado = cpf
+        self._recarregar_historico()
             
     def ver_historico_geral(self):
-        historico = db.buscar_historico()
-        self._popular_historico(historico)
+        self.cpf_filtrado = None
+        self._recarregar_historico()
 
     def calcular_faturamento(self):
         data_inicio = self.entrada_data_inicio.get()
@@ -717,6 +1502,209 @@ class AbaRelatorios(ttk.Frame):
         else:
             messagebox.showerror("Erro de Data", resultado[0])
 
+    def abrir_analise_frota(self):
+        if self.entrada_data_inicio.mostrando_texto_ajuda or self.entrada_data_fim.mostrando_texto_ajuda:
+            messagebox.showwarning("Aviso", "As datas de início e fim são obrigatórias.")
+            return
+        JanelaAnaliseFrota(self, self.entrada_data_inicio.get(), self.entrada_data_fim.get())
+
+    def emitir_documento(self):
+        """Salva o recibo (aluguel finalizado) ou o contrato (ativo) do aluguel selecionado."""
+        if self.item_selecionado is None:
+            messagebox.showwarning("Aviso", "Selecione um aluguel no histórico.")
+            return
+        caminho = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".html", initialfile=f"aluguel-{self.item_selecionado:06d}.html",
+            filetypes=[("Página HTML", "*.html"), ("Texto", "*.txt")]
+        )
+        if not caminho:
+            return
+        formato = "texto" if caminho.lower().endswith(".txt") else "html"
+        sucesso, resultado = documentos.gerar_documento(self.item_selecionado, formato=formato)
+        if not sucesso:
+            messagebox.showerror("Erro", resultado[0])
+            return
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(resultado)
+        messagebox.showinfo("Documento", f"Documento salvo em {caminho}.")
+
+    def emitir_recibos_periodo(self):
+        if self.entrada_data_inicio.mostrando_texto_ajuda or self.entrada_data_fim.mostrando_texto_ajuda:
+            messagebox.showwarning("Aviso", "As datas de início e fim são obrigatórias.")
+            return
+        pasta = filedialog.askdirectory(parent=self, title="Pasta para os recibos")
+        if not pasta:
+            return
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            sucesso, msgs = documentos.emitir_recibos_periodo(self.entrada_data_inicio.get(), self.entrada_data_fim.get(), pasta)
+        finally:
+            self.config(cursor="")
+        if sucesso:
+            messagebox.showinfo("Recibos", msgs[0])
+        else:
+            messagebox.showerror("Erro", msgs[0])
+
+    def abrir_fechamento(self):
+        if self.entrada_data_inicio.mostrando_texto_ajuda or self.entrada_data_fim.mostrando_texto_ajuda:
+            messagebox.showwarning("Aviso", "As datas de início e fim são obrigatórias.")
+            return
+        JanelaFechamento(self, self.entrada_data_inicio.get(), self.entrada_data_fim.get())
+
+class JanelaAnaliseFrota(tk.Toplevel):
+    """Utilização, receita, custo de manutenção e margem por veículo, marca ou mês."""
+    VISOES = {
+        "Por Veículo": ("veiculo", "placa", ("placa", "marca", "modelo")),
+        "Por Marca": ("marca", "marca", ("marca", "qtd_veiculos")),
+        "Por Mês": ("mes", "mes", ("mes",)),
+    }
+    COLUNAS_METRICAS = ("dias_alugados", "dias_disponiveis", "utilizacao", "receita", "custo_manutencao", "margem")
+
+    def __init__(self, parent, data_inicio, data_fim):
+        super().__init__(parent)
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.title(f"Análise da Frota — {data_inicio} a {data_fim}")
+        self.geometry("1100x500")
+        self.lista = None
+
+        frame_topo = ttk.Frame(self)
+        frame_topo.pack(fill="x", padx=10, pady=10)
+        ttk.Label(frame_topo, text="Visão:").pack(side="left", padx=(0, 5))
+        self.combo_visao = ttk.Combobox(frame_topo, state="readonly", width=15, values=list(self.VISOES))
+        self.combo_visao.set("Por Veículo")
+        self.combo_visao.pack(side="left")
+        self.combo_visao.bind("<<ComboboxSelected>>", lambda *_: self.carregar())
+        self.label_resumo = ttk.Label(frame_topo, font=("Arial", 11, "bold"))
+        self.label_resumo.pack(side="right")
+
+        self.frame_lista = ttk.Frame(self)
+        self.frame_lista.pack(expand=True, fill="both", padx=10, pady=(0, 10))
+        self.carregar()
+
+    def _formatar_linha(self, linha):
+        valores = []
+        for col in self.lista.colunas:
+            valor = linha.get(col)
+            if col in ("receita", "custo_manutencao", "margem"):
+                valor = formatar_moeda(valor)
+            elif col == "utilizacao":
+                valor = formatar_percentual(valor)
+            elif col in ("marca", "modelo"):
+                valor = formatar_texto_capitalizado(valor)
+            valores.append(valor)
+        return tuple(valores)
+
+    def carregar(self):
+        visao, coluna_chave, colunas_descricao = self.VISOES[self.combo_visao.get()]
+        sucesso, resultado = analise.analisar_frota(self.data_inicio, self.data_fim, visao)
+        if not sucesso:
+            messagebox.showerror("Erro na Análise", resultado[0], parent=self)
+            return
+
+        if self.lista:
+            self.lista.destroy()
+        self.lista = ListaVirtual(self.frame_lista, colunas_descricao + self.COLUNAS_METRICAS,
+                                  coluna_chave=coluna_chave, formatar_linha=self._formatar_linha, largura_coluna=120)
+        self.lista.pack(expand=True, fill="both")
+        self.lista.carregar(resultado)
+
+        receita = sum(linha["receita"] for linha in resultado)
+        custo = sum(linha["custo_manutencao"] for linha in resultado)
+        self.label_resumo.config(text=f"Receita: {formatar_moeda(receita)}   Custo: {formatar_moeda(custo)}   "
+                                      f"Margem: {formatar_moeda(receita - custo)}")
+
+class JanelaFechamento(tk.Toplevel):
+    """Fechamento do período (relatorios.py), gerado em outros processos sem travar a janela."""
+    VISOES = {
+        "Receita por Dia": ("receita_por_dia", ("dia", "qtd_alugueis", "receita")),
+        "Receita por Veículo": ("receita_por_veiculo", ("placa", "qtd_alugueis", "receita")),
+        "Receita por Cliente": ("receita_por_cliente", ("cpf", "qtd_alugueis", "receita")),
+        "Manutenção por Veículo": ("manutencao_por_veiculo", ("placa", "qtd_manutencoes", "custo_manutencao")),
+        "Manutenção por Descrição": ("manutencao_por_descricao", ("descricao", "qtd_manutencoes", "custo_manutencao")),
+    }
+    INTERVALO_PROGRESSO_MS = 100
+
+    def __init__(self, parent, data_inicio, data_fim):
+        super().__init__(parent)
+        self.title(f"Fechamento — {data_inicio} a {data_fim}")
+        self.geometry("800x500")
+        self.lista = None
+        self.relatorio = None
+        self._progresso = (0, 0)
+        self._resultado = None
+
+        frame_topo = ttk.Frame(self)
+        frame_topo.pack(fill="x", padx=10, pady=10)
+        ttk.Label(frame_topo, text="Visão:").pack(side="left", padx=(0, 5))
+        self.combo_visao = ttk.Combobox(frame_topo, state="readonly", width=25, values=list(self.VISOES))
+        self.combo_visao.set("Receita por Dia")
+        self.combo_visao.pack(side="left")
+        self.combo_visao.bind("<<ComboboxSelected>>", lambda *_: self.mostrar())
+        self.label_resumo = ttk.Label(frame_topo, font=("Arial", 11, "bold"))
+        self.label_resumo.pack(side="right")
+
+        self.barra_progresso = ttk.Progressbar(self, mode="determinate")
+        self.barra_progresso.pack(fill="x", padx=10)
+        self.frame_lista = ttk.Frame(self)
+        self.frame_lista.pack(expand=True, fill="both", padx=10, pady=10)
+
+        # A thread só grava o progresso e o resultado; a janela os lê pelo after()
+        threading.Thread(target=self._gerar, args=(data_inicio, data_fim), daemon=True).start()
+        self.after(self.INTERVALO_PROGRESSO_MS, self._acompanhar)
+
+    def _gerar(self, data_inicio, data_fim):
+        def ao_progredir(concluidas, total):
+            self._progresso = (concluidas, total)
+        self._resultado = relatorios.gerar_fechamento(data_inicio, data_fim, ao_progredir=ao_progredir)
+
+    def _acompanhar(self):
+        if not self.winfo_exists():
+            return
+        concluidas, total = self._progresso
+        if total:
+            self.barra_progresso.config(maximum=total, value=concluidas)
+            self.label_resumo.config(text=f"Calculando... {concluidas}/{total} fatia(s)")
+        if self._resultado is None:
+            self.after(self.INTERVALO_PROGRESSO_MS, self._acompanhar)
+            return
+        sucesso, resultado = self._resultado
+        if not sucesso:
+            self.label_resumo.config(text="")
+            messagebox.showerror("Erro no Fechamento", resultado[0], parent=self)
+            return
+        self.relatorio = resultado
+        self.barra_progresso.pack_forget()
+        totais = resultado["totais"]
+        self.label_resumo.config(text=f"Receita: {formatar_moeda(totais['receita'])}   "
+                                      f"Manutenção: {formatar_moeda(totais['custo_manutencao'])}")
+        self.mostrar()
+
+    def _formatar_linha(self, linha):
+        valores = []
+        for col in self.lista.colunas:
+            valor = linha.get(col)
+            if col in ("receita", "custo_manutencao"):
+                valor = formatar_moeda(valor)
+            elif col == "cpf":
+                valor = formatar_cpf(valor)
+            elif col == "descricao":
+                valor = formatar_texto_capitalizado(valor)
+            valores.append(valor)
+        return tuple(valores)
+
+    def mostrar(self):
+        if self.relatorio is None:
+            return
+        nome, colunas = self.VISOES[self.combo_visao.get()]
+        if self.lista:
+            self.lista.destroy()
+        self.lista = ListaVirtual(self.frame_lista, colunas, coluna_chave=colunas[0],
+                                  formatar_linha=self._formatar_linha, largura_coluna=150)
+        self.lista.pack(expand=True, fill="both")
+        self.lista.carregar(self.relatorio[nome])
+
 # =============================================================================
 # ABA DE MANUTENÇÃO (MODIFICADA)
 # =============================================================================
@@ -725,9 +1713,9 @@ class AbaManutencao(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.item_selecionado_id = None
+        self.plano_selecionado_id = None
+        self._veiculos_desatualizados = True
         self._criar_widgets()
-        self.popular_manutencoes_ativas()
-        self.atualizar_veiculos_disponiveis()
 
     def _criar_widgets(self):
         criar_cabecalho_secao(self, "Gerenciar Manutenção de Veículos")
@@ -738,7 +1726,7 @@ class AbaManutencao(ttk.Frame):
         frame_formulario.pack()
         
         ttk.Label(frame_formulario, text="Veículo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-        self.combo_placa_enviar = ttk.Combobox(frame_formulario, width=25)
+        self.combo_placa_enviar = ttk.Combobox(frame_formulario, width=25, postcommand=self._atualizar_veiculos_se_preciso)
         self.combo_placa_enviar.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(frame_formulario, text="Motivo/Descrição:").grid(row=0, column=2, padx=(20, 5), pady=5, sticky="e")
@@ -774,6 +1762,8 @@ class AbaManutencao(ttk.Frame):
             self.tree.heading(col, text=obter_cabecalho_exibicao(col))
             self.tree.column(col, anchor=tk.CENTER, width=150)
         
+        self.ordem = configurar_ordenacao_cabecalho(self.tree, colunas, lambda *_: self.popular_manutencoes_ativas())
+
         self.tree.column("id", width=60)
         self.tree.column("descricao", width=350)
         
@@ -783,23 +1773,116 @@ class AbaManutencao(ttk.Frame):
         scrollbar.pack(side="right", fill="y")
 
         self.tree.bind("<ButtonRelease-1>", self.ao_clicar_no_item)
+
+        criar_cabecalho_secao(self, "Manutenções Preventivas Vencidas e Próximas")
+        self.label_resumo_agenda = ttk.Label(self, font=("Arial", 10), anchor="center")
+        self.label_resumo_agenda.pack(fill="x", padx=10)
+        frame_agenda = ttk.Frame(self)
+        frame_agenda.pack(fill="both", padx=10, pady=(5, 10))
+
+        colunas_agenda = ("placa", "descricao", "situacao", "vence_em", "alugueis_restantes", "custo_estimado")
+        self.tree_agenda = ttk.Treeview(frame_agenda, columns=colunas_agenda, show="headings", height=6)
+        for col in colunas_agenda:
+            self.tree_agenda.heading(col, text=obter_cabecalho_exibicao(col))
+            self.tree_agenda.column(col, anchor=tk.CENTER, width=150)
+        self.tree_agenda.column("descricao", width=300)
+        self.tree_agenda.tag_configure("Vencida", foreground="red")
+
+        self.tree_agenda.pack(side="left", fill="both", expand=True)
+        scrollbar_agenda = ttk.Scrollbar(frame_agenda, orient="vertical", command=self.tree_agenda.yview)
+        self.tree_agenda.configure(yscrollcommand=scrollbar_agenda.set)
+        scrollbar_agenda.pack(side="right", fill="y")
+
+        self.tree_agenda.bind("<ButtonRelease-1>", self.ao_clicar_na_agenda)
         self.limpar_campos()
 
+    def popular_agenda(self):
+        """Lista os planos preventivos vencidos ou próximos de vencer (manutencao_preventiva.py)."""
+        for i in self.tree_agenda.get_children(): self.tree_agenda.delete(i)
+        self._itens_agenda = {}
+        for item in manutencao_preventiva.listar_agenda():
+            restantes = item['alugueis_restantes']
+            valores = (
+                item['placa'],
+                item['descricao'],
+                item['situacao'],
+                item['vence_em'] or "-",
+                max(restantes, 0) if restantes is not None else "-",
+                formatar_moeda(item['custo_estimado'])
+            )
+            iid = self.tree_agenda.insert("", "end", values=valores, tags=(item['situacao'],))
+            self._itens_agenda[iid] = item
+
+        resumo = manutencao_preventiva.resumo_agenda()
+        self.label_resumo_agenda.config(
+            text=f"Vencidas: {resumo['vencidas']}   |   Próximas: {resumo['proximas']}   |   "
+                 f"Bloqueados para aluguel: {resumo['veiculos_bloqueados']}   |   "
+                 f"Custo previsto (30 dias): {formatar_moeda(resumo['custo_previsto'])}"
+        )
+
+    def ao_clicar_na_agenda(self, event):
+        """Preenche o formulário para enviar o veículo para a manutenção do plano selecionado."""
+        iid = self.tree_agenda.identify_row(event.y)
+        if not iid:
+            return
+        item = self._itens_agenda[iid]
+        self.limpar_campos()
+        self.plano_selecionado_id = item['plano_id']
+        self.combo_placa_enviar.set(item['placa'])
+
+        self.entry_descricao.delete(0, "end")
+        self.entry_descricao.insert(0, item['descricao'])
+        self.entry_descricao.mostrando_texto_ajuda = False
+
+        self.entry_custo.delete(0, "end")
+        self.entry_custo.insert(0, f"{item['custo_estimado']:.2f}".replace('.', ','))
+        self.entry_custo.mostrando_texto_ajuda = False
+        self.tree_agenda.selection_set(iid)
+
     def popular_manutencoes_ativas(self):
         for i in self.tree.get_children(): self.tree.delete(i)
-        manutencoes = db.listar_manutencoes(status_filtro='Em Andamento')
+        manutencoes = db.listar_manutencoes(status_filtro='Em Andamento', ordenar_por=self.ordem["coluna"],
+                                            decrescente=self.ordem["decrescente"])
         for item in manutencoes:
-            valores = (
-                item['id'], 
-                item['placa_carro'], 
-                item['descricao'], 
-                formatar_moeda(item['custo']), 
-                item['data_entrada']
-            )
-            self.tree.insert("", "end", values=valores)
+            self.tree.insert("", "end", iid=str(item['id']), values=self._formatar_manutencao(item))
+        self.popular_agenda()
         self.limpar_campos()
 
+    @staticmethod
+    def _formatar_manutencao(item):
+        return (item['id'], item['placa_carro'], item['descricao'], formatar_moeda(item['custo']), item['data_entrada'])
+
+    def aplicar_alteracoes(self, alteracoes):
+        if "veiculos" in alteracoes:
+            self._veiculos_desatualizados = True
+        if "manutencoes" not in alteracoes:
+            return
+        ids = alteracoes["manutencoes"]
+        if ids is None:
+            self.popular_manutencoes_ativas()
+            return
+        em_andamento = {item['id']: item for item in db.listar_manutencoes(status_filtro='Em Andamento', ids=ids)}
+        for id_manutencao in ids:
+            iid = str(id_manutencao)
+            if id_manutencao in em_andamento:
+                valores = self._formatar_manutencao(em_andamento[id_manutencao])
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=valores)
+                else:
+                    self.tree.insert("", 0, iid=iid, values=valores)
+            elif self.tree.exists(iid):
+                if self.item_selecionado_id == id_manutencao:
+                    self.limpar_campos()
+                self.tree.delete(iid)
+        if self.winfo_viewable():
+            self.popular_agenda()
+
+    def _atualizar_veiculos_se_preciso(self):
+        if self._veiculos_desatualizados:
+            self.atualizar_veiculos_disponiveis()
+
     def atualizar_veiculos_disponiveis(self):
+        self._veiculos_desatualizados = False
         veiculos = db.listar_veiculos(status_filtro='Disponível')
         placas = [v['placa'] for v in veiculos]
         self.combo_placa_enviar['values'] = placas
@@ -841,8 +1924,11 @@ class AbaManutencao(ttk.Frame):
 
     def limpar_campos(self):
         self.item_selecionado_id = None
+        self.plano_selecionado_id = None
         if self.tree.selection():
             self.tree.selection_remove(self.tree.selection())
+        if self.tree_agenda.selection():
+            self.tree_agenda.selection_remove(self.tree_agenda.selection())
 
         self.combo_placa_enviar.set('')
         self.combo_placa_enviar.config(state="normal")
@@ -861,7 +1947,7 @@ class AbaManutencao(ttk.Frame):
         if self.entry_descricao.mostrando_texto_ajuda: descricao = ""
         if self.entry_custo.mostrando_texto_ajuda: custo = ""
 
-        sucesso, msgs = db.enviar_para_manutencao(placa, descricao, custo)
+        sucesso, msgs = operacoes.enviar_para_manutencao(placa, descricao, custo, plano_id=self.plano_selecionado_id)
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
             self.popular_manutencoes_ativas()
@@ -877,7 +1963,7 @@ class AbaManutencao(ttk.Frame):
         descricao = self.entry_descricao.get()
         custo = self.entry_custo.get()
 
-        sucesso, msgs = db.atualizar_manutencao(self.item_selecionado_id, descricao, custo)
+        sucesso, msgs = operacoes.atualizar_manutencao(self.item_selecionado_id, descricao, custo)
 
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
@@ -893,7 +1979,7 @@ class AbaManutencao(ttk.Frame):
         if not messagebox.askyesno("Confirmar Retorno", "Deseja confirmar o retorno deste veículo da manutenção?"):
             return
             
-        sucesso, msgs = db.registrar_retorno_manutencao(self.item_selecionado_id)
+        sucesso, msgs = operacoes.registrar_retorno_manutencao(self.item_selecionado_id)
         
         if sucesso:
             messagebox.showinfo("Sucesso", msgs[0])
@@ -904,5 +1990,24 @@ class AbaManutencao(ttk.Frame):
 
 
 if __name__ == '__main__':
-    app = LocadoraApp()
+    # --medir-inicio: mostra o tempo até o primeiro quadro interativo e encerra.
+    # --terminal <banco_central> [--replica <arquivo>]: modo balcão, com réplica local.
+    # --leitura-relatorios principal|somente_leitura|copia: por onde os relatórios leem.
+    # --banco <arquivo|:memory:>: outro banco no lugar de locadora.db (':memory:' para demonstrações).
+    # --backup-automatico: backups periódicos em backup.PASTA_BACKUPS (INTERVALO_BACKUP_S, BACKUPS_MANTIDOS).
+    terminal_balcao = None
+    BACKUP_AUTOMATICO = "--backup-automatico" in sys.argv
+    if "--banco" in sys.argv:
+        db.definir_banco(sys.argv[sys.argv.index("--banco") + 1])
+    if "--leitura-relatorios" in sys.argv:
+        db.definir_destino_leitura(sys.argv[sys.argv.index("--leitura-relatorios") + 1])
+    if "--terminal" in sys.argv:
+        caminho_central = sys.argv[sys.argv.index("--terminal") + 1]
+        caminho_replica = (sys.argv[sys.argv.index("--replica") + 1] if "--replica" in sys.argv
+                           else terminal.ARQUIVO_REPLICA_PADRAO)
+        terminal_balcao = terminal.TerminalOffline(caminho_central, caminho_replica).preparar()
+        # As telas leem a réplica; as escritas passam pelo terminal
+        db.NOME_BANCO_DADOS = caminho_replica
+        operacoes = terminal_balcao
+    app = LocadoraApp(medir_inicio="--medir-inicio" in sys.argv, terminal_balcao=terminal_balcao)
     app.mainloop()
\ No newline at end of file
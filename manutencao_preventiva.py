@@ -0,0 +1,304 @@
+import sys
+from datetime import datetime, timedelta
+
+import database as db
+
+# =============================================================================
+# MANUTENÇÃO PREVENTIVA: PLANOS E AGENDA
+# =============================================================================
+# Um plano vale para toda a frota (placa vazia) ou para um veículo e vence a
+# cada `intervalo_dias` dias e/ou a cada `intervalo_alugueis` aluguéis desde a
+# última manutenção feita por ele (manutencoes.plano_id). A tabela
+# agenda_manutencao guarda, por veículo e plano, a última execução, a data de
+# vencimento e quantos aluguéis houve desde então. Ela é mantida pelos
+# gatilhos abaixo a cada aluguel, manutenção concluída e veículo cadastrado ou
+# removido; recalcular_agenda() a refaz inteira numa única consulta sobre
+# manutencoes e alugueis.
+#
+# A situação de cada linha ('Vencida', 'Próxima', 'Em dia') é calculada na
+# leitura, pois depende da data de hoje. Planos com `bloquear_aluguel`
+# vencidos impedem novos aluguéis do veículo (ver database.realizar_aluguel).
+#
+# Uso: python manutencao_preventiva.py [--recalcular]   (mostra a agenda)
+
+GATILHOS_AGENDA = (
+    # Cada aluguel conta para os planos por quantidade de aluguéis
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agenda_aluguel AFTER INSERT ON alugueis
+    BEGIN
+        UPDATE agenda_manutencao SET alugueis_desde = alugueis_desde + 1 WHERE placa = NEW.placa_carro;
+    END
+    """,
+    # Concluir a manutenção de um plano reinicia o prazo desse plano
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agenda_manutencao_concluida AFTER UPDATE OF status ON manutencoes
+    WHEN NEW.status = 'Concluída' AND NEW.plano_id IS NOT NULL
+    BEGIN
+        UPDATE agenda_manutencao SET
+            ultima_execucao = NEW.data_saida,
+            alugueis_desde = 0,
+            vence_em = (SELECT date(NEW.data_saida, '+' || intervalo_dias || ' days')
+                        FROM planos_manutencao WHERE id = NEW.plano_id)
+        WHERE placa = NEW.placa_carro AND plano_id = NEW.plano_id;
+    END
+    """,
+    # Veículos novos entram nos planos da frota contando a partir do cadastro
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agenda_veiculo_novo AFTER INSERT ON veiculos
+    BEGIN
+        INSERT OR IGNORE INTO agenda_manutencao (placa, plano_id, ultima_execucao, vence_em)
+        SELECT NEW.placa, id, datetime('now', 'localtime'), date('now', 'localtime', '+' || intervalo_dias || ' days')
+        FROM planos_manutencao WHERE placa IS NULL OR placa = NEW.placa;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agenda_veiculo_removido AFTER DELETE ON veiculos
+    BEGIN
+        DELETE FROM agenda_manutencao WHERE placa = OLD.placa;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agenda_plano_removido AFTER DELETE ON planos_manutencao
+    BEGIN
+        DELETE FROM agenda_manutencao WHERE plano_id = OLD.id;
+    END
+    """,
+)
+
+# Recalcula a agenda de um plano (ou de todos, com :plano NULL) de uma vez.
+# A última execução é a mais recente entre as manutenções concluídas do plano
+# e a já registrada na agenda (que sobrevive ao arquivamento das manutenções);
+# sem nenhuma, o prazo conta a partir da criação do plano. {manutencoes} e
+# {alugueis} são trocados por db.fonte_com_arquivo(): manutenções e aluguéis
+# já arquivados também contam.
+_RECALCULAR_AGENDA = """
+    WITH alvo AS (
+        SELECT v.placa, p.id AS plano_id, p.intervalo_dias, p.criado_em
+        FROM planos_manutencao AS p
+        JOIN veiculos AS v ON p.placa IS NULL OR v.placa = p.placa
+        WHERE :plano IS NULL OR p.id = :plano
+    ),
+    ultima AS (
+        SELECT placa_carro AS placa, plano_id, MAX(data_saida) AS data_saida
+        FROM {manutencoes}
+        WHERE plano_id IS NOT NULL AND (:plano IS NULL OR plano_id = :plano) AND status = 'Concluída'
+        GROUP BY plano_id, placa_carro
+    ),
+    execucao AS (
+        SELECT a.placa, a.plano_id, a.intervalo_dias, a.criado_em,
+               NULLIF(MAX(COALESCE(u.data_saida, ''), COALESCE(ag.ultima_execucao, '')), '') AS ultima_execucao
+        FROM alvo AS a
+        LEFT JOIN ultima AS u ON u.placa = a.placa AND u.plano_id = a.plano_id
+        LEFT JOIN agenda_manutencao AS ag ON ag.placa = a.placa AND ag.plano_id = a.plano_id
+    ),
+    base AS (
+        SELECT placa, plano_id, intervalo_dias, ultima_execucao,
+               COALESCE(ultima_execucao, criado_em) AS referencia
+        FROM execucao
+    )
+    INSERT OR REPLACE INTO agenda_manutencao (placa, plano_id, ultima_execucao, vence_em, alugueis_desde)
+    SELECT placa, plano_id, ultima_execucao,
+           date(referencia, '+' || intervalo_dias || ' days'),
+           (SELECT COUNT(*) FROM {alugueis} AS al
+            WHERE al.placa_carro = base.placa AND al.data_retirada > base.referencia)
+    FROM base
+"""
+
+_SITUACAO = """
+    CASE
+        WHEN ag.vence_em <= :hoje OR ag.alugueis_desde >= p.intervalo_alugueis THEN 'Vencida'
+        WHEN ag.vence_em <= date(:hoje, '+' || p.antecedencia_dias || ' days')
+             OR ag.alugueis_desde >= p.intervalo_alugueis - p.antecedencia_alugueis THEN 'Próxima'
+        ELSE 'Em dia'
+    END
+"""
+
+_CONSULTA_AGENDA = f"""
+    SELECT ag.placa, ag.plano_id, p.descricao, ag.ultima_execucao, ag.vence_em, ag.alugueis_desde,
+           p.intervalo_dias, p.intervalo_alugueis, p.custo_estimado, p.bloquear_aluguel,
+           v.status AS status_veiculo,
+           CAST(julianday(ag.vence_em) - julianday(:hoje) AS INTEGER) AS dias_restantes,
+           p.intervalo_alugueis - ag.alugueis_desde AS alugueis_restantes,
+           {_SITUACAO} AS situacao
+    FROM agenda_manutencao AS ag
+    JOIN planos_manutencao AS p ON p.id = ag.plano_id
+    JOIN veiculos AS v ON v.placa = ag.placa
+"""
+
+SITUACOES = ('Vencida', 'Próxima', 'Em dia')
+
+def _recalcular(cursor, plano_id):
+    fontes = {
+        "manutencoes": db.fonte_com_arquivo(cursor, "manutencoes", "fim",
+                                            colunas="placa_carro, plano_id, data_saida, status"),
+        "alugueis": db.fonte_com_arquivo(cursor, "alugueis", "inicio", colunas="placa_carro, data_retirada"),
+    }
+    cursor.execute(_RECALCULAR_AGENDA.format(**fontes), {"plano": plano_id})
+    # rowcount não é preenchido para comandos que começam com WITH
+    return cursor.execute("SELECT changes()").fetchone()[0]
+
+def _hoje():
+    return datetime.now().strftime('%Y-%m-%d')
+
+def manutencao_bloqueante(cursor, placa):
+    """Descrição de um plano vencido que bloqueia o aluguel do veículo (ou None)."""
+    cursor.execute("""
+        SELECT p.descricao FROM agenda_manutencao AS ag
+        JOIN planos_manutencao AS p ON p.id = ag.plano_id
+        WHERE ag.placa = ? AND p.bloquear_aluguel
+          AND (ag.vence_em <= ? OR ag.alugueis_desde >= p.intervalo_alugueis)
+        LIMIT 1
+    """, (placa, _hoje()))
+    linha = cursor.fetchone()
+    return linha[0] if linha else None
+
+# =============================================================================
+# PLANOS
+# =============================================================================
+
+def _inteiro_positivo(valor, campo, erros, opcional=True):
+    if valor in (None, ''):
+        if not opcional:
+            erros.append(f"O campo '{campo}' é obrigatório.")
+        return None
+    try:
+        numero = int(valor)
+    except (ValueError, TypeError):
+        erros.append(f"O campo '{campo}' deve ser um número inteiro.")
+        return None
+    if numero < 0 or (numero == 0 and opcional):
+        erros.append(f"O campo '{campo}' deve ser maior que zero.")
+    return numero
+
+def definir_plano(descricao, intervalo_dias=None, intervalo_alugueis=None, custo_estimado=0, placa=None,
+                  antecedencia_dias=7, antecedencia_alugueis=2, bloquear_aluguel=True):
+    """Cadastra um plano preventivo e já calcula a agenda dele para a frota."""
+    erros = []
+    if not descricao or not descricao.strip():
+        erros.append("O campo 'Descrição' é obrigatório.")
+    intervalo_dias = _inteiro_positivo(intervalo_dias, "Intervalo em dias", erros)
+    intervalo_alugueis = _inteiro_positivo(intervalo_alugueis, "Intervalo em aluguéis", erros)
+    if intervalo_dias is None and intervalo_alugueis is None and not erros:
+        erros.append("Informe o intervalo em dias, em aluguéis ou ambos.")
+    antecedencia_dias = _inteiro_positivo(antecedencia_dias, "Antecedência em dias", erros, opcional=False)
+    antecedencia_alugueis = _inteiro_positivo(antecedencia_alugueis, "Antecedência em aluguéis", erros, opcional=False)
+    try:
+        custo_estimado = float(str(custo_estimado or 0).replace(",", "."))
+        if custo_estimado < 0:
+            erros.append("O custo estimado não pode ser negativo.")
+    except (ValueError, TypeError):
+        erros.append("O custo estimado deve ser um número válido.")
+    if erros:
+        return (False, erros)
+
+    placa = placa.upper().strip() if placa else None
+    conn, cursor = db.conectar_bd()
+    try:
+        if placa and not cursor.execute("SELECT 1 FROM veiculos WHERE placa = ?", (placa,)).fetchone():
+            return (False, ["Veículo não encontrado."])
+        cursor.execute("""
+            INSERT INTO planos_manutencao (descricao, placa, intervalo_dias, intervalo_alugueis, custo_estimado,
+                                           antecedencia_dias, antecedencia_alugueis, bloquear_aluguel, criado_em)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (descricao.strip(), placa, intervalo_dias, intervalo_alugueis, custo_estimado,
+              antecedencia_dias, antecedencia_alugueis, int(bool(bloquear_aluguel)),
+              datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        plano_id = cursor.lastrowid
+        qtd = _recalcular(cursor, plano_id)
+        conn.commit()
+        return (True, [f"Plano '{descricao.strip()}' cadastrado para {qtd} veículo(s)."])
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao cadastrar plano: {e}"])
+    finally:
+        conn.close()
+
+def remover_plano(plano_id):
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute("DELETE FROM planos_manutencao WHERE id = ?", (plano_id,))
+        if cursor.rowcount == 0:
+            return (False, ["Plano não encontrado."])
+        conn.commit()
+        return (True, ["Plano removido."])
+    finally:
+        conn.close()
+
+def listar_planos():
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute("SELECT * FROM planos_manutencao ORDER BY descricao")
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+# =============================================================================
+# AGENDA
+# =============================================================================
+
+def recalcular_agenda(plano_id=None):
+    """Refaz a agenda de um plano, ou de todos, a partir de manutencoes e alugueis."""
+    conn, cursor = db.conectar_bd()
+    try:
+        qtd = _recalcular(cursor, plano_id)
+        conn.commit()
+        return (True, [f"Agenda recalculada: {qtd} item(ns)."])
+    except Exception as e:
+        conn.rollback()
+        return (False, [f"Erro ao recalcular agenda: {e}"])
+    finally:
+        conn.close()
+
+def listar_agenda(situacoes=('Vencida', 'Próxima'), placa=None):
+    """Itens da agenda nas situações pedidas, os vencidos primeiro e depois por data."""
+    query = f"SELECT * FROM ({_CONSULTA_AGENDA}"
+    params = {"hoje": _hoje()}
+    if placa:
+        query += " WHERE ag.placa = :placa"
+        params["placa"] = placa.upper().strip()
+    query += ")"
+    if situacoes:
+        marcadores = []
+        for i, situacao in enumerate(situacoes):
+            marcadores.append(f":situacao{i}")
+            params[f"situacao{i}"] = situacao
+        query += f" WHERE situacao IN ({', '.join(marcadores)})"
+    query += " ORDER BY situacao <> 'Vencida', vence_em IS NULL, vence_em, alugueis_restantes"
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def resumo_agenda(dias=30):
+    """Totais da agenda: vencidas, próximas, veículos bloqueados e custo previsto em `dias` dias."""
+    hoje = _hoje()
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(situacao = 'Vencida'), 0) AS vencidas,
+                   COALESCE(SUM(situacao = 'Próxima'), 0) AS proximas,
+                   COUNT(DISTINCT CASE WHEN situacao = 'Vencida' AND bloquear_aluguel THEN placa END) AS veiculos_bloqueados,
+                   TOTAL(CASE WHEN situacao <> 'Em dia' OR vence_em <= :limite THEN custo_estimado END) AS custo_previsto
+            FROM ({_CONSULTA_AGENDA})
+        """, {"hoje": hoje, "limite": (datetime.now() + timedelta(days=int(dias))).strftime('%Y-%m-%d')})
+        return dict(cursor.fetchone())
+    finally:
+        conn.close()
+
+def veiculos_bloqueados():
+    """Placas que não podem ser alugadas por terem um plano bloqueante vencido."""
+    return sorted({item["placa"] for item in listar_agenda(('Vencida',)) if item["bloquear_aluguel"]})
+
+
+if __name__ == '__main__':
+    db.criar_tabelas()
+    if "--recalcular" in sys.argv:
+        print(recalcular_agenda()[1][0])
+    for item in listar_agenda():
+        print(f"{item['situacao']:<8} {item['placa']:<9} {item['descricao']:<30} "
+              f"vence em {item['vence_em'] or '-':<10} aluguéis restantes: {item['alugueis_restantes'] if item['alugueis_restantes'] is not None else '-'}")
+    resumo = resumo_agenda()
+    print(f"Vencidas: {resumo['vencidas']}  Próximas: {resumo['proximas']}  "
+          f"Bloqueados: {resumo['veiculos_bloqueados']}  Custo previsto (30 dias): R$ {resumo['custo_previsto']:.2f}")
@@ -0,0 +1,314 @@
+import math
+from bisect import bisect_right
+from datetime import date, datetime
+from operator import itemgetter
+
+import database as db
+
+# =============================================================================
+# PRECIFICAÇÃO DOS ALUGUÉIS
+# =============================================================================
+# O valor de um aluguel é a soma das diárias cobradas, cada uma multiplicada
+# pelo fator da temporada e, aos sábados e domingos, pelo fator de fim de
+# semana. Sobre essa soma entram o desconto da faixa de duração (semanal,
+# mensal...) e o desconto do cliente; os dias depois da data prevista de
+# devolução pagam ainda a multa por atraso, sem desconto.
+#
+# As regras ficam em tabelas do banco (criadas por database.criar_tabelas) e
+# são compiladas numa TabelaPrecos em memória. Gatilhos nessas tabelas
+# incrementam a versão das regras em `estatisticas`; tabela_vigente() só
+# recompila quando a versão muda. Sem nenhuma regra cadastrada, o valor é o de
+# sempre: dias * valor_diaria.
+
+TABELAS_REGRAS = ("temporadas_preco", "faixas_duracao_preco", "descontos_clientes", "parametros_preco")
+CHAVE_VERSAO_REGRAS = "versao_regras_preco"
+
+PARAMETROS_PADRAO = {
+    "fator_fim_de_semana": 1.0,       # multiplica as diárias de sábado e domingo
+    "multa_atraso": 0.0,              # fração da diária cobrada a mais por dia de atraso
+    "tolerancia_atraso_horas": 1.0,   # atraso até aqui não gera multa
+}
+
+_SEGUNDOS_DIA = 86400
+_ANO_BISSEXTO = 2000  # índice do dia do ano com 29/02 incluído
+
+def como_datetime(valor):
+    """Converte 'AAAA-MM-DD', 'AAAA-MM-DD HH:MM:SS' ou datetime; ValueError se inválido."""
+    if isinstance(valor, datetime):
+        return valor
+    valor = str(valor).strip()
+    for formato in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor, formato)
+        except ValueError:
+            pass
+    raise ValueError(valor)
+
+def _indice_dia(mes, dia):
+    return date(_ANO_BISSEXTO, mes, dia).timetuple().tm_yday - 1
+
+def _indice_mmdd(texto):
+    mes, dia = (int(parte) for parte in texto.split("-"))
+    return _indice_dia(mes, dia)
+
+
+class TabelaPrecos:
+    """Regras de preço compiladas: fator por dia do ano, faixas, descontos e parâmetros."""
+
+    def __init__(self, fatores_temporada, faixas, descontos_clientes, parametros, versao=None):
+        self.fatores_temporada = fatores_temporada
+        self._faixas_dias = [dias for dias, _ in faixas]
+        self._faixas_desconto = [desconto for _, desconto in faixas]
+        self.descontos_clientes = descontos_clientes
+        self.parametros = parametros
+        self.versao = versao
+        self._fator_semana = (1.0,) * 5 + (parametros["fator_fim_de_semana"],) * 2
+
+    @classmethod
+    def carregar(cls, cursor, versao=None):
+        fatores = [1.0] * 366
+        # Temporadas sobrepostas: vale a cadastrada por último
+        cursor.execute("SELECT inicio, fim, fator FROM temporadas_preco ORDER BY id")
+        for inicio, fim, fator in cursor.fetchall():
+            i, f = _indice_mmdd(inicio), _indice_mmdd(fim)
+            dias = range(i, f + 1) if i <= f else [*range(i, 366), *range(0, f + 1)]  # ex.: 12-15 a 01-10
+            for indice in dias:
+                fatores[indice] = fator
+        faixas = cursor.execute(
+            "SELECT dias_minimos, desconto FROM faixas_duracao_preco ORDER BY dias_minimos").fetchall()
+        descontos = dict(cursor.execute("SELECT cpf, desconto FROM descontos_clientes").fetchall())
+        parametros = dict(PARAMETROS_PADRAO)
+        parametros.update(cursor.execute("SELECT chave, valor FROM parametros_preco").fetchall())
+        return cls(fatores, [tuple(faixa) for faixa in faixas], descontos, parametros, versao)
+
+    def dias_cobrados(self, retirada, devolucao):
+        return max(1, math.ceil((devolucao - retirada).total_seconds() / _SEGUNDOS_DIA))
+
+    def fatores_periodo(self, retirada, dias):
+        """Fator de cada diária cobrada, a partir do dia da retirada."""
+        inicio = retirada.toordinal()
+        fatores = []
+        for ordinal in range(inicio, inicio + dias):
+            dia = date.fromordinal(ordinal)
+            fatores.append(self.fatores_temporada[_indice_dia(dia.month, dia.day)] * self._fator_semana[dia.weekday()])
+        return fatores
+
+    def desconto_duracao(self, dias):
+        posicao = bisect_right(self._faixas_dias, dias)
+        return self._faixas_desconto[posicao - 1] if posicao else 0.0
+
+    def desconto_cliente(self, cpf):
+        return self.descontos_clientes.get(cpf, 0.0) if cpf else 0.0
+
+    def calcular(self, valor_diaria, retirada, devolucao, cpf=None, prevista=None):
+        """Valor de um aluguel, com o detalhamento de cada parcela (dicionário)."""
+        dias = self.dias_cobrados(retirada, devolucao)
+        fatores = self.fatores_periodo(retirada, dias)
+        soma = sum(fatores)
+        desconto_duracao = self.desconto_duracao(dias)
+        desconto_cliente = self.desconto_cliente(cpf)
+
+        dias_atraso, multa = 0, 0.0
+        if prevista is not None and self.parametros["multa_atraso"]:
+            atraso = (devolucao - prevista).total_seconds()
+            if atraso > self.parametros["tolerancia_atraso_horas"] * 3600:
+                dias_atraso = min(dias, math.ceil(atraso / _SEGUNDOS_DIA))
+                multa = valor_diaria * self.parametros["multa_atraso"] * sum(fatores[-dias_atraso:])
+
+        # Mesma conta de cotar(), para a cotação e a cobrança baterem
+        com_descontos = valor_diaria * (soma * (1 - desconto_duracao) * (1 - desconto_cliente))
+        base = valor_diaria * soma
+        return {
+            "dias": dias,
+            "base": round(base, 2),
+            "desconto_duracao": round(base * desconto_duracao, 2),
+            "desconto_cliente": round(base * (1 - desconto_duracao) * desconto_cliente, 2),
+            "dias_atraso": dias_atraso,
+            "multa_atraso": round(multa, 2),
+            "total": round(com_descontos + multa, 2),
+        }
+
+    def cotar(self, valores_diaria, retirada, devolucao, cpf=None):
+        """Valor do mesmo período para cada diária de `valores_diaria`, numa única passada."""
+        dias = self.dias_cobrados(retirada, devolucao)
+        fator = sum(self.fatores_periodo(retirada, dias)) * (1 - self.desconto_duracao(dias)) * (1 - self.desconto_cliente(cpf))
+        return [round(valor * fator, 2) for valor in valores_diaria]
+
+
+# Tabelas compiladas por arquivo de banco: {caminho: TabelaPrecos}
+_tabelas = {}
+
+def tabela_vigente(cursor):
+    """TabelaPrecos do banco do `cursor`, recompilada só se as regras mudaram."""
+    # Um banco em memória não tem arquivo: a chave é o URI dele
+    caminho = cursor.execute("PRAGMA database_list").fetchone()[2] or db.NOME_BANCO_DADOS
+    linha = cursor.execute("SELECT valor FROM estatisticas WHERE chave = ?", (CHAVE_VERSAO_REGRAS,)).fetchone()
+    versao = linha[0] if linha else None
+    tabela = _tabelas.get(caminho)
+    if tabela is None or tabela.versao != versao:
+        tabela = _tabelas[caminho] = TabelaPrecos.carregar(cursor, versao)
+    return tabela
+
+def descartar_tabelas():
+    """Esquece as tabelas compiladas (depois de restaurar um backup ou snapshot,
+    a versão das regras pode se repetir com regras diferentes)."""
+    _tabelas.clear()
+
+# =============================================================================
+# COTAÇÕES
+# =============================================================================
+
+def _periodo(data_retirada, data_devolucao):
+    try:
+        retirada, devolucao = como_datetime(data_retirada), como_datetime(data_devolucao)
+    except ValueError:
+        return None, None, "Formato de data inválido. Use 'AAAA-MM-DD' ou 'AAAA-MM-DD HH:MM:SS'."
+    if devolucao <= retirada:
+        return None, None, "A devolução deve ser posterior à retirada."
+    return retirada, devolucao, None
+
+def cotar_aluguel(placa, data_retirada, data_devolucao, cpf=None):
+    """Cotação de um veículo; retorna (True, [resumo], detalhes) ou (False, [erro], None)."""
+    retirada, devolucao, erro = _periodo(data_retirada, data_devolucao)
+    if erro:
+        return (False, [erro], None)
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute("SELECT valor_diaria FROM veiculos WHERE placa = ?", (placa.upper().strip(),))
+        veiculo = cursor.fetchone()
+        if not veiculo:
+            return (False, ["Veículo não encontrado."], None)
+        detalhes = tabela_vigente(cursor).calcular(veiculo["valor_diaria"], retirada, devolucao,
+                                                   db.limpar_cpf(cpf) if cpf else None)
+        return (True, [f"Cotação: R$ {detalhes['total']:.2f} ({detalhes['dias']} dia(s))."], detalhes)
+    finally:
+        conn.close()
+
+def cotar_frota(data_retirada, data_devolucao, cpf=None, apenas_disponiveis=True):
+    """Cotação do período para toda a frota, do menor para o maior valor.
+
+    Retorna (True, [], [{placa, marca, modelo, valor_diaria, valor_total}]) ou (False, [erro], []).
+    """
+    retirada, devolucao, erro = _periodo(data_retirada, data_devolucao)
+    if erro:
+        return (False, [erro], [])
+    conn, cursor = db.conectar_bd()
+    try:
+        query = "SELECT placa, marca, modelo, valor_diaria FROM veiculos"
+        if apenas_disponiveis:
+            query += " WHERE status = 'Disponível'"
+        linhas = cursor.execute(query).fetchall()
+        valores = tabela_vigente(cursor).cotar([linha[3] for linha in linhas], retirada, devolucao,
+                                               db.limpar_cpf(cpf) if cpf else None)
+    finally:
+        conn.close()
+    cotacoes = [
+        {"placa": placa, "marca": marca, "modelo": modelo, "valor_diaria": valor_diaria, "valor_total": valor}
+        for (placa, marca, modelo, valor_diaria), valor in zip(linhas, valores)
+    ]
+    cotacoes.sort(key=itemgetter("valor_total"))
+    return (True, [], cotacoes)
+
+# =============================================================================
+# CADASTRO DAS REGRAS
+# =============================================================================
+
+def _validar_fracao(valor, campo):
+    try:
+        valor = float(str(valor).replace(",", "."))
+    except (ValueError, TypeError):
+        return None, f"O campo '{campo}' deve ser um número."
+    if not 0 <= valor < 1:
+        return None, f"O campo '{campo}' deve estar entre 0 e 1 (ex.: 0.1 para 10%)."
+    return valor, None
+
+def _gravar(query, params, msg_sucesso):
+    conn, cursor = db.conectar_bd()
+    try:
+        cursor.execute(query, params)
+        conn.commit()
+        return (True, [msg_sucesso])
+    except Exception as e:
+        return (False, [f"Erro ao gravar regra de preço: {e}"])
+    finally:
+        conn.close()
+
+def definir_temporada(nome, inicio, fim, fator):
+    """Temporada de `inicio` a `fim` ('MM-DD', repetida todo ano) com o fator das diárias."""
+    erros = []
+    if not nome or not nome.strip():
+        erros.append("O campo 'Nome' é obrigatório.")
+    for campo, valor in (("Início", inicio), ("Fim", fim)):
+        try:
+            _indice_mmdd(valor)
+        except (ValueError, AttributeError):
+            erros.append(f"O campo '{campo}' deve estar no formato 'MM-DD'.")
+    try:
+        fator = float(str(fator).replace(",", "."))
+        if fator <= 0:
+            erros.append("O fator deve ser maior que zero.")
+    except (ValueError, TypeError):
+        erros.append("O fator deve ser um número.")
+    if erros:
+        return (False, erros)
+    return _gravar("INSERT INTO temporadas_preco (nome, inicio, fim, fator) VALUES (?, ?, ?, ?)",
+                   (nome.strip(), inicio, fim, fator), "Temporada cadastrada com sucesso.")
+
+def remover_temporada(temporada_id):
+    return _gravar("DELETE FROM temporadas_preco WHERE id = ?", (temporada_id,), "Temporada removida.")
+
+def definir_faixa_duracao(dias_minimos, desconto):
+    """Desconto para aluguéis de `dias_minimos` dias ou mais (ex.: 7 -> 0.1, 30 -> 0.25)."""
+    try:
+        dias_minimos = int(dias_minimos)
+    except (ValueError, TypeError):
+        return (False, ["A quantidade de dias deve ser um número inteiro."])
+    desconto, erro = _validar_fracao(desconto, "Desconto")
+    if erro or dias_minimos < 1:
+        return (False, [erro or "A quantidade de dias deve ser maior que zero."])
+    return _gravar("INSERT OR REPLACE INTO faixas_duracao_preco (dias_minimos, desconto) VALUES (?, ?)",
+                   (dias_minimos, desconto), "Faixa de duração gravada.")
+
+def remover_faixa_duracao(dias_minimos):
+    return _gravar("DELETE FROM faixas_duracao_preco WHERE dias_minimos = ?", (int(dias_minimos),),
+                   "Faixa de duração removida.")
+
+def definir_desconto_cliente(cpf, desconto):
+    erro_cpf = db.validar_cpf(cpf)
+    desconto, erro = _validar_fracao(desconto, "Desconto")
+    if erro_cpf or erro:
+        return (False, [e for e in (erro_cpf, erro) if e])
+    return _gravar("INSERT OR REPLACE INTO descontos_clientes (cpf, desconto) VALUES (?, ?)",
+                   (db.limpar_cpf(cpf), desconto), "Desconto do cliente gravado.")
+
+def remover_desconto_cliente(cpf):
+    return _gravar("DELETE FROM descontos_clientes WHERE cpf = ?", (db.limpar_cpf(cpf),),
+                   "Desconto do cliente removido.")
+
+def definir_parametro(chave, valor):
+    """Altera um dos PARAMETROS_PADRAO (fator de fim de semana, multa e tolerância de atraso)."""
+    if chave not in PARAMETROS_PADRAO:
+        return (False, [f"Parâmetro desconhecido: '{chave}'. Use um de: {', '.join(PARAMETROS_PADRAO)}."])
+    try:
+        valor = float(str(valor).replace(",", "."))
+    except (ValueError, TypeError):
+        return (False, ["O valor deve ser um número."])
+    if valor < 0:
+        return (False, ["O valor não pode ser negativo."])
+    return _gravar("INSERT OR REPLACE INTO parametros_preco (chave, valor) VALUES (?, ?)",
+                   (chave, valor), "Parâmetro de preço gravado.")
+
+def listar_regras():
+    """Regras cadastradas: temporadas, faixas de duração, descontos de clientes e parâmetros."""
+    conn, cursor = db.conectar_bd()
+    try:
+        parametros = dict(PARAMETROS_PADRAO)
+        parametros.update(cursor.execute("SELECT chave, valor FROM parametros_preco").fetchall())
+        return {
+            "temporadas": [dict(r) for r in cursor.execute("SELECT * FROM temporadas_preco ORDER BY inicio")],
+            "faixas_duracao": [dict(r) for r in cursor.execute("SELECT * FROM faixas_duracao_preco ORDER BY dias_minimos")],
+            "descontos_clientes": [dict(r) for r in cursor.execute("SELECT * FROM descontos_clientes ORDER BY cpf")],
+            "parametros": parametros,
+        }
+    finally:
+        conn.close()
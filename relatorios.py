@@ -0,0 +1,160 @@
+import os
+import sys
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import database as db
+
+# =============================================================================
+# FECHAMENTO DO PERÍODO EM VÁRIOS PROCESSOS
+# =============================================================================
+# O fechamento mensal agrega, para um período [data_inicio, data_fim]:
+#   receita por dia, por veículo e por cliente (aluguéis devolvidos no período)
+#   custo de manutenção por veículo e por descrição (manutenções iniciadas no período)
+# O período é dividido em fatias de dias consecutivos, e cada fatia é agregada
+# por um processo do pool com a sua própria conexão somente leitura ao banco
+# (em WAL, os leitores não bloqueiam os balcões). Cada processo devolve os
+# totais parciais da sua fatia, somados depois no processo que pediu o
+# relatório. Como nenhum aluguel ou manutenção cai em duas fatias, a soma das
+# fatias é igual ao relatório calculado de uma vez.
+#
+# Uso: python relatorios.py <data_inicio> <data_fim> [processos]
+
+FATIAS_POR_PROCESSO = 4
+
+# Agregados de cada fatia: nome -> (consulta, colunas da chave, colunas somadas).
+# {alugueis} e {manutencoes} são trocados por db.fonte_com_arquivo().
+_AGREGADOS = {
+    "receita_por_dia": ("""
+        SELECT date(data_devolucao), COUNT(*), TOTAL(valor_total) FROM {alugueis}
+        WHERE data_devolucao >= :inicio AND data_devolucao < :fim GROUP BY 1
+    """, ("dia",), ("qtd_alugueis", "receita")),
+    "receita_por_veiculo": ("""
+        SELECT placa_carro, COUNT(*), TOTAL(valor_total) FROM {alugueis}
+        WHERE data_devolucao >= :inicio AND data_devolucao < :fim GROUP BY 1
+    """, ("placa",), ("qtd_alugueis", "receita")),
+    "receita_por_cliente": ("""
+        SELECT cpf_cliente, COUNT(*), TOTAL(valor_total) FROM {alugueis}
+        WHERE data_devolucao >= :inicio AND data_devolucao < :fim GROUP BY 1
+    """, ("cpf",), ("qtd_alugueis", "receita")),
+    "manutencao_por_veiculo": ("""
+        SELECT placa_carro, COUNT(*), TOTAL(custo) FROM {manutencoes}
+        WHERE data_entrada >= :inicio AND data_entrada < :fim GROUP BY 1
+    """, ("placa",), ("qtd_manutencoes", "custo_manutencao")),
+    "manutencao_por_descricao": ("""
+        SELECT lower(trim(descricao)), COUNT(*), TOTAL(custo) FROM {manutencoes}
+        WHERE data_entrada >= :inicio AND data_entrada < :fim GROUP BY 1
+    """, ("descricao",), ("qtd_manutencoes", "custo_manutencao")),
+}
+
+def _fatias_do_periodo(data_inicio, fim_exclusivo, qtd_fatias):
+    """Divide [data_inicio, fim_exclusivo) em até `qtd_fatias` faixas de dias inteiros."""
+    inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+    total_dias = (datetime.strptime(fim_exclusivo, '%Y-%m-%d') - inicio).days
+    qtd_fatias = max(1, min(qtd_fatias, total_dias))
+    limites = [inicio + timedelta(days=total_dias * i // qtd_fatias) for i in range(qtd_fatias + 1)]
+    return [(a.strftime('%Y-%m-%d'), b.strftime('%Y-%m-%d')) for a, b in zip(limites, limites[1:])]
+
+def _agregar_fatia(uri_banco, inicio, fim_exclusivo):
+    """Executado em cada processo: os totais parciais de [inicio, fim_exclusivo)."""
+    conn = sqlite3.connect(uri_banco, uri=True)
+    try:
+        cursor = conn.cursor()
+        fontes = {
+            "alugueis": db.fonte_com_arquivo(cursor, "alugueis", "fim", inicio, fim_exclusivo),
+            "manutencoes": db.fonte_com_arquivo(cursor, "manutencoes", "inicio", inicio, fim_exclusivo),
+        }
+        parciais = {}
+        for nome, (consulta, _, _) in _AGREGADOS.items():
+            cursor.execute(consulta.format(**fontes), {"inicio": inicio, "fim": fim_exclusivo})
+            parciais[nome] = {chave: valores for chave, *valores in cursor.fetchall()}
+        return parciais
+    finally:
+        conn.close()
+
+def _somar(totais, parciais):
+    for nome, linhas in parciais.items():
+        destino = totais.setdefault(nome, {})
+        for chave, valores in linhas.items():
+            atuais = destino.get(chave)
+            destino[chave] = valores if atuais is None else [a + b for a, b in zip(atuais, valores)]
+
+def _montar_relatorio(totais):
+    relatorio = {}
+    for nome, (_, colunas_chave, colunas_valor) in _AGREGADOS.items():
+        linhas = [dict(zip(colunas_chave + colunas_valor, (chave, *valores)))
+                  for chave, valores in totais.get(nome, {}).items()]
+        # Por dia em ordem de data; os demais do maior valor para o menor
+        if colunas_chave == ("dia",):
+            linhas.sort(key=lambda linha: linha["dia"])
+        else:
+            linhas.sort(key=lambda linha: linha[colunas_valor[-1]], reverse=True)
+        relatorio[nome] = linhas
+    relatorio["totais"] = {
+        "qtd_alugueis": sum(linha["qtd_alugueis"] for linha in relatorio["receita_por_dia"]),
+        "receita": sum(linha["receita"] for linha in relatorio["receita_por_dia"]),
+        "qtd_manutencoes": sum(linha["qtd_manutencoes"] for linha in relatorio["manutencao_por_veiculo"]),
+        "custo_manutencao": sum(linha["custo_manutencao"] for linha in relatorio["manutencao_por_veiculo"]),
+    }
+    return relatorio
+
+def gerar_fechamento(data_inicio, data_fim, processos=None, ao_progredir=None):
+    """Gera o fechamento de [data_inicio, data_fim] (datas inclusivas, 'AAAA-MM-DD').
+
+    `processos` é o tamanho do pool (padrão: os núcleos da máquina); com 1, as
+    fatias são agregadas neste mesmo processo. `ao_progredir(concluidas, total)`
+    é chamada a cada fatia terminada. Retorna (True, relatorio) ou (False, [mensagem]).
+    """
+    try:
+        inicio = datetime.strptime(data_inicio, '%Y-%m-%d')
+        fim = datetime.strptime(data_fim, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return (False, ["Formato de data inválido. Use 'AAAA-MM-DD'."])
+    if fim < inicio:
+        return (False, ["A data de fim deve ser igual ou posterior à data de início."])
+
+    processos = max(1, processos or os.cpu_count() or 1)
+    if db.banco_em_memoria():
+        # Os outros processos não enxergam o banco em memória deste
+        processos = 1
+    fim_exclusivo = (fim + timedelta(days=1)).strftime('%Y-%m-%d')
+    fatias = _fatias_do_periodo(data_inicio, fim_exclusivo, processos * FATIAS_POR_PROCESSO)
+    uri_banco = db.uri_leitura()
+    totais = {}
+    try:
+        if processos == 1:
+            for i, (a, b) in enumerate(fatias, 1):
+                _somar(totais, _agregar_fatia(uri_banco, a, b))
+                if ao_progredir:
+                    ao_progredir(i, len(fatias))
+        else:
+            # spawn: os processos não herdam as threads nem a janela Tk de quem chamou
+            with ProcessPoolExecutor(min(processos, len(fatias)),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futuros = [pool.submit(_agregar_fatia, uri_banco, a, b) for a, b in fatias]
+                for i, futuro in enumerate(as_completed(futuros), 1):
+                    _somar(totais, futuro.result())
+                    if ao_progredir:
+                        ao_progredir(i, len(fatias))
+    except Exception as e:
+        return (False, [f"Erro ao gerar o fechamento: {e}"])
+    return (True, _montar_relatorio(totais))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Uso: python relatorios.py <data_inicio> <data_fim> [processos]")
+        sys.exit(1)
+    sucesso, resultado = gerar_fechamento(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None,
+                                          ao_progredir=lambda feitas, total: print(f"\r{feitas}/{total} fatias", end=""))
+    print()
+    if not sucesso:
+        print(resultado[0])
+        sys.exit(1)
+    totais = resultado["totais"]
+    print(f"Receita: R$ {totais['receita']:.2f} em {totais['qtd_alugueis']} aluguel(éis); "
+          f"manutenção: R$ {totais['custo_manutencao']:.2f} em {totais['qtd_manutencoes']} manutenção(ões).")
+    for linha in resultado["receita_por_veiculo"][:10]:
+        print(f"{linha['placa']:<9} {linha['qtd_alugueis']:>5} aluguel(éis)  R$ {linha['receita']:>12.2f}")
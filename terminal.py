@@ -0,0 +1,568 @@
+import os
+import sys
+import json
+import socket
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import database as db
+import precificacao
+from validacao import limpar_cpf
+
+# =============================================================================
+# TERMINAL DE BALCÃO COM RÉPLICA LOCAL E SINCRONIZAÇÃO
+# =============================================================================
+# Cada balcão trabalha sobre um banco local (réplica) com o mesmo esquema do
+# banco central, contendo os veículos, os clientes e seus totais, os aluguéis e
+# manutenções em andamento e as regras de preço. As telas leem só a réplica. As operações de balcão são
+# validadas e aplicadas na réplica pelas mesmas funções de database.py e
+# guardadas em operacoes_pendentes; sincronizar() envia a fila à central em
+# lotes (uma transação por lote, um SAVEPOINT por operação) e depois traz as
+# mudanças da central pelo log de eventos.
+#
+# Conflitos: a central valida cada operação de novo. Se o mesmo carro foi
+# alugado em dois balcões, a segunda operação a chegar falha na validação
+# ("Veículo não está disponível") e fica com status 'Conflito', assim como as
+# operações seguintes do mesmo balcão sobre o mesmo carro ou cliente. A
+# réplica volta a refletir a central e o atendente vê o conflito na fila.
+#
+# Uso: python terminal.py <banco_central> [banco_local]   (uma sincronização)
+
+ARQUIVO_REPLICA_PADRAO = 'terminal.db'
+TEMPO_LIMITE_CENTRAL = 2.0
+TAMANHO_LOTE_SINCRONIZACAO = 100
+INTERVALO_SINCRONIZACAO = 30
+
+# Ids dos aluguéis e manutenções criados na réplica antes de chegarem à
+# central: começam aqui para nunca coincidirem com ids da central.
+ID_PROVISORIO = 10 ** 12
+
+# Operações que o balcão registra sem a central, e o argumento que identifica
+# o carro ou o cliente afetado (placa e CPF são os mesmos nos dois bancos).
+OPERACOES_OFFLINE = {
+    "realizar_aluguel": "placa",
+    "realizar_devolucao": "placa",
+    "enviar_para_manutencao": "placa",
+    "adicionar_cliente": "cpf",
+    "atualizar_cliente": "cpf",
+}
+_COM_DATA_HORA = {"realizar_aluguel", "realizar_devolucao", "enviar_para_manutencao"}
+
+# Operações que dependem do estado atual da central (cadastro da frota,
+# remoções, manutenções pelo id): só são feitas com a central acessível.
+OPERACOES_ONLINE = {
+    "adicionar_veiculo", "atualizar_veiculo", "remover_veiculo", "remover_cliente",
+    "atualizar_manutencao", "registrar_retorno_manutencao", "definir_categoria_veiculo",
+}
+_COM_ID = {"atualizar_manutencao", "registrar_retorno_manutencao"}
+
+_DDL_TERMINAL = (
+    """
+    CREATE TABLE IF NOT EXISTS operacoes_pendentes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        criada_em TEXT NOT NULL,
+        operacao TEXT NOT NULL,
+        chave TEXT NOT NULL,
+        argumentos TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'Pendente',
+        sincronizada_em TEXT,
+        mensagens TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_operacoes_pendentes_status ON operacoes_pendentes (status, id)",
+    "CREATE TABLE IF NOT EXISTS estado_terminal (chave TEXT PRIMARY KEY, valor TEXT)",
+)
+
+def _agora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _normalizar_chave(operacao, valor):
+    if OPERACOES_OFFLINE[operacao] == "cpf":
+        return limpar_cpf(valor)
+    return str(valor).upper().strip()
+
+def _usando(conn):
+    """Faz as funções de database.py nesta thread usarem `conn`, num SAVEPOINT próprio."""
+    return db.usando_conexao(conn, "terminal")
+
+@contextmanager
+def _no_banco(caminho):
+    anterior = db.NOME_BANCO_DADOS
+    db.NOME_BANCO_DADOS = caminho
+    try:
+        yield
+    finally:
+        db.NOME_BANCO_DADOS = anterior
+
+
+class TerminalOffline:
+    """Balcão que registra operações na réplica local e as sincroniza com a central.
+
+    Os métodos de operação têm a mesma assinatura e o mesmo retorno das funções
+    de database.py, para a interface poder chamar um ou outro indistintamente.
+    """
+
+    def __init__(self, caminho_central, caminho_local=ARQUIVO_REPLICA_PADRAO, nome=None):
+        self.caminho_central = caminho_central
+        self.caminho_local = caminho_local
+        self.nome = nome or f"terminal:{socket.gethostname()}"
+        # Identifica as operações desta réplica na central (operacoes_recebidas);
+        # gravado na própria réplica por preparar()
+        self.id_replica = None
+        self.online = None
+        self.ultima_sincronizacao = None
+        self.ultimo_resultado = None
+        self._trava = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def preparar(self):
+        """Cria a réplica local (esquema da central mais a fila de operações)."""
+        with _no_banco(self.caminho_local):
+            db.criar_tabelas()
+        conn = self._conectar_local()
+        try:
+            for ddl in _DDL_TERMINAL:
+                conn.execute(ddl)
+            # Uma réplica recriada recomeça os ids da fila em 1: com um id novo por
+            # arquivo, as operações dela não se confundem com as da réplica anterior.
+            # Réplicas que já enviaram operações continuam com o nome usado até aqui.
+            ja_enviou = conn.execute("SELECT 1 FROM operacoes_pendentes LIMIT 1").fetchone() is not None
+            conn.execute("INSERT OR IGNORE INTO estado_terminal (chave, valor) VALUES ('id_replica', ?)",
+                         (self.nome if ja_enviou else f"{self.nome}:{uuid.uuid4()}",))
+            self.id_replica = self._estado(conn, "id_replica")
+        finally:
+            conn.close()
+        return self
+
+    # -------------------------------------------------------------------------
+    # Conexões
+    # -------------------------------------------------------------------------
+
+    def _conectar_local(self):
+        conn = sqlite3.connect(self.caminho_local, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _conectar_central(self):
+        # sqlite3.connect criaria um banco vazio se o compartilhamento não estiver montado
+        if not os.path.isfile(self.caminho_central):
+            raise sqlite3.OperationalError(f"banco central '{self.caminho_central}' não encontrado")
+        conn = sqlite3.connect(self.caminho_central, timeout=TEMPO_LIMITE_CENTRAL, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # As operações aplicadas na central conferem as chaves estrangeiras; a
+        # réplica local recebe cópias de linhas em qualquer ordem e fica sem
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    # -------------------------------------------------------------------------
+    # Operações de balcão
+    # -------------------------------------------------------------------------
+
+    def realizar_aluguel(self, placa_carro, cpf_cliente, data_prevista=None):
+        return self._registrar("realizar_aluguel", placa_carro, cpf_cliente, data_prevista=data_prevista)
+
+    def realizar_devolucao(self, placa_carro):
+        return self._registrar("realizar_devolucao", placa_carro)
+
+    def enviar_para_manutencao(self, placa, descricao, custo, plano_id=None):
+        return self._registrar("enviar_para_manutencao", placa, descricao, custo, plano_id=plano_id)
+
+    def adicionar_cliente(self, cpf, nome, telefone, email):
+        return self._registrar("adicionar_cliente", cpf, nome, telefone, email)
+
+    def atualizar_cliente(self, cpf, nome, telefone, email):
+        return self._registrar("atualizar_cliente", cpf, nome, telefone, email)
+
+    def _registrar(self, operacao, *args, **kwargs):
+        """Aplica a operação na réplica e, se ela for válida, coloca-a na fila."""
+        if operacao in _COM_DATA_HORA:
+            kwargs["data_hora"] = _agora()
+        conn = self._conectar_local()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            with _usando(conn):
+                resultado = getattr(db, operacao)(*args, **kwargs)
+            if not resultado[0]:
+                conn.execute("ROLLBACK")
+                return resultado
+            conn.execute(
+                "INSERT INTO operacoes_pendentes (criada_em, operacao, chave, argumentos) VALUES (?, ?, ?, ?)",
+                (_agora(), operacao, _normalizar_chave(operacao, args[0]),
+                 json.dumps([list(args), kwargs], ensure_ascii=False))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self._acordar.set()
+        aviso = "Registrado neste balcão; será enviado à central na próxima sincronização."
+        return (resultado[0], list(resultado[1]) + [aviso]) + tuple(resultado[2:])
+
+    def __getattr__(self, operacao):
+        if operacao not in OPERACOES_ONLINE:
+            raise AttributeError(operacao)
+        return lambda *args: self.executar_na_central(operacao, *args)
+
+    def executar_na_central(self, operacao, *args):
+        """Executa a operação direto na central (depois de enviar a fila) e atualiza a réplica."""
+        if operacao in _COM_ID and int(args[0]) >= ID_PROVISORIO:
+            return (False, ["Este registro ainda não foi enviado à central. Sincronize e tente novamente."])
+        sucesso, msgs = self.sincronizar()
+        if not sucesso:
+            return (False, ["Sem conexão com a central: esta operação não pode ser feita offline."])
+
+        with self._trava:
+            try:
+                central = self._conectar_central()
+                try:
+                    central.execute("BEGIN IMMEDIATE")
+                    with _usando(central):
+                        resultado = getattr(db, operacao)(*args)
+                    central.execute("COMMIT")
+                finally:
+                    if central.in_transaction:
+                        central.execute("ROLLBACK")
+                    central.close()
+            except sqlite3.Error as e:
+                self.online = False
+                return (False, [f"Sem conexão com a central: {e}"])
+        if resultado[0]:
+            self.sincronizar()
+        return resultado
+
+    # -------------------------------------------------------------------------
+    # Sincronização
+    # -------------------------------------------------------------------------
+
+    def sincronizar(self):
+        """Envia a fila de operações à central e traz as mudanças para a réplica.
+
+        Retorna (True, [mensagens]), ou (False, [erro]) se a central não
+        estiver acessível; nesse caso a fila continua guardada na réplica.
+        """
+        with self._trava:
+            local = None
+            try:
+                central = self._conectar_central()
+                try:
+                    local = self._conectar_local()
+                    enviadas, conflitos, chaves = self._enviar_pendentes(local, central)
+                    recebidos = self._atualizar_replica(local, central, chaves)
+                finally:
+                    central.close()
+            except sqlite3.Error as e:
+                self.online = False
+                self.ultimo_resultado = (False, [f"Central indisponível ({e}). As operações continuam na fila deste balcão."])
+                return self.ultimo_resultado
+            finally:
+                if local is not None:
+                    local.close()
+
+            self.ultima_sincronizacao = datetime.now()
+            self.online = True
+            mensagens = [f"{enviadas} operação(ões) enviada(s), {recebidos} alteração(ões) recebida(s) da central."]
+            if conflitos:
+                mensagens.append(f"{conflitos} operação(ões) em conflito com a central. Veja operações em conflito.")
+            self.ultimo_resultado = (True, mensagens)
+            return self.ultimo_resultado
+
+    def _enviar_pendentes(self, local, central):
+        """Envia as operações pendentes em lotes; retorna (enviadas, conflitos, chaves afetadas)."""
+        enviadas = conflitos = 0
+        chaves = {"placa": set(), "cpf": set()}
+        while True:
+            pendentes = local.execute(
+                "SELECT * FROM operacoes_pendentes WHERE status = 'Pendente' ORDER BY id LIMIT ?",
+                (TAMANHO_LOTE_SINCRONIZACAO,)
+            ).fetchall()
+            if not pendentes:
+                return enviadas, conflitos, chaves
+
+            resultados = []
+            em_conflito = set()
+            central.execute("BEGIN IMMEDIATE")
+            try:
+                for op in pendentes:
+                    chaves[OPERACOES_OFFLINE[op["operacao"]]].add(op["chave"])
+                    if op["chave"] in em_conflito:
+                        resultados.append((op, False, [f"Não enviada: uma operação anterior com '{op['chave']}' entrou em conflito."]))
+                        continue
+                    sucesso, msgs = self._aplicar_na_central(central, op)
+                    if not sucesso:
+                        em_conflito.add(op["chave"])
+                    resultados.append((op, sucesso, msgs))
+                central.execute("COMMIT")
+            finally:
+                if central.in_transaction:
+                    central.execute("ROLLBACK")
+
+            agora = _agora()
+            local.execute("BEGIN IMMEDIATE")
+            for op, sucesso, msgs in resultados:
+                local.execute(
+                    "UPDATE operacoes_pendentes SET status = ?, sincronizada_em = ?, mensagens = ? WHERE id = ?",
+                    ('Sincronizada' if sucesso else 'Conflito', agora, json.dumps(msgs, ensure_ascii=False), op["id"])
+                )
+            # As operações seguintes sobre a mesma placa ou CPF foram validadas
+            # contra um estado que a central não aceitou.
+            for chave in em_conflito:
+                local.execute(
+                    "UPDATE operacoes_pendentes SET status = 'Conflito', sincronizada_em = ?, mensagens = ? "
+                    "WHERE status = 'Pendente' AND chave = ?",
+                    (agora, json.dumps([f"Não enviada: uma operação anterior com '{chave}' entrou em conflito."],
+                                       ensure_ascii=False), chave)
+                )
+            local.execute("COMMIT")
+            enviadas += sum(1 for _, sucesso, _ in resultados if sucesso)
+            conflitos += sum(1 for _, sucesso, _ in resultados if not sucesso)
+
+    def _aplicar_na_central(self, central, op):
+        recebida = central.execute(
+            "SELECT sucesso, mensagens FROM operacoes_recebidas WHERE terminal = ? AND operacao_id = ?",
+            (self.id_replica, op["id"])
+        ).fetchone()
+        if recebida:
+            # Já aplicada num envio anterior cuja confirmação local não chegou a ser gravada
+            return bool(recebida["sucesso"]), json.loads(recebida["mensagens"])
+
+        args, kwargs = json.loads(op["argumentos"])
+        try:
+            with _usando(central):
+                resultado = getattr(db, op["operacao"])(*args, **kwargs)
+            sucesso, msgs = resultado[0], list(resultado[1])
+        except Exception as e:
+            sucesso, msgs = False, [f"Erro ao aplicar a operação na central: {e}"]
+        central.execute(
+            "INSERT INTO operacoes_recebidas (terminal, operacao_id, recebida_em, sucesso, mensagens) VALUES (?, ?, ?, ?, ?)",
+            (self.id_replica, op["id"], _agora(), int(sucesso), json.dumps(msgs, ensure_ascii=False))
+        )
+        return sucesso, msgs
+
+    def _atualizar_replica(self, local, central, chaves):
+        """Traz para a réplica as mudanças da central; retorna quantas linhas foram recebidas."""
+        ultimo_seq = self._estado(local, "ultimo_seq")
+        # Clientes cujos totais a réplica pode ter alterado desde a última sincronização
+        cpfs_resumo = {cpf for (cpf,) in local.execute("SELECT DISTINCT cpf_cliente FROM alugueis")}
+
+        # Uma única transação de leitura: linhas e seq do mesmo instante da central
+        central.execute("BEGIN")
+        try:
+            seq_central = central.execute("SELECT COALESCE(MAX(seq), 0) FROM eventos").fetchone()[0]
+            # Primeira sincronização, ou a central foi restaurada de um backup anterior
+            if ultimo_seq is None or int(ultimo_seq) > seq_central:
+                linhas = {
+                    "veiculos": [dict(r) for r in central.execute("SELECT * FROM veiculos")],
+                    "clientes": [dict(r) for r in central.execute("SELECT * FROM clientes")],
+                }
+                completa = True
+            else:
+                linhas = {"veiculos": {}, "clientes": {}}
+                for evento in central.execute(
+                    "SELECT entidade, chave, depois FROM eventos "
+                    "WHERE seq > ? AND seq <= ? AND entidade IN ('veiculos', 'clientes') ORDER BY seq",
+                    (int(ultimo_seq), seq_central)
+                ):
+                    linhas[evento["entidade"]][evento["chave"]] = json.loads(evento["depois"]) if evento["depois"] else None
+                # As linhas alteradas pelas operações deste balcão, mesmo as recusadas
+                for tabela, campo, valores in (("veiculos", "placa", chaves["placa"]), ("clientes", "cpf", chaves["cpf"])):
+                    for valor in valores - linhas[tabela].keys():
+                        linha = central.execute(f"SELECT * FROM {tabela} WHERE {campo} = ?", (valor,)).fetchone()
+                        linhas[tabela][valor] = dict(linha) if linha else None
+                completa = False
+            # Totais dos clientes (database.obter_resumo_cliente): os da central, para
+            # os clientes com aluguéis alterados lá ou nesta réplica
+            if completa:
+                resumos = [dict(r) for r in central.execute("SELECT * FROM resumo_clientes")]
+            else:
+                cpfs_resumo |= {cpf for (cpf,) in central.execute(
+                    "SELECT DISTINCT json_extract(COALESCE(depois, antes), '$.cpf_cliente') FROM eventos "
+                    "WHERE seq > ? AND seq <= ? AND entidade = 'alugueis'", (int(ultimo_seq), seq_central))}
+                resumos = [dict(r) for cpf in cpfs_resumo
+                           for r in central.execute("SELECT * FROM resumo_clientes WHERE cpf = ?", (cpf,))]
+            # Categorias: poucas linhas, copiadas inteiras a cada sincronização
+            categorias = [dict(r) for r in central.execute("SELECT * FROM categorias")]
+            em_andamento = {
+                "alugueis": [dict(r) for r in central.execute("SELECT * FROM alugueis WHERE status = 'Ativo'")],
+                "manutencoes": [dict(r) for r in central.execute("SELECT * FROM manutencoes WHERE status = 'Em Andamento'")],
+            }
+            # Regras de preço: copiadas inteiras quando a versão da central muda
+            versao_regras = central.execute("SELECT valor FROM estatisticas WHERE chave = ?",
+                                            (precificacao.CHAVE_VERSAO_REGRAS,)).fetchone()
+            versao_regras = versao_regras[0] if versao_regras else None
+            regras = None
+            if str(versao_regras) != self._estado(local, precificacao.CHAVE_VERSAO_REGRAS):
+                regras = {tabela: [dict(r) for r in central.execute(f"SELECT * FROM {tabela}")]
+                          for tabela in precificacao.TABELAS_REGRAS}
+        finally:
+            central.execute("COMMIT")
+
+        local.execute("BEGIN IMMEDIATE")
+        try:
+            recebidos = 0
+            # Antes dos veículos, que apontam para elas; sem REPLACE, que apagaria
+            # a linha ainda referenciada
+            local.executemany(
+                "INSERT INTO categorias (id, nome, valor_diaria_padrao) VALUES (:id, :nome, :valor_diaria_padrao) "
+                "ON CONFLICT (id) DO UPDATE SET nome = excluded.nome, valor_diaria_padrao = excluded.valor_diaria_padrao",
+                categorias
+            )
+            for tabela, campo in (("veiculos", "placa"), ("clientes", "cpf")):
+                if completa:
+                    local.execute(f"DELETE FROM {tabela}")
+                    recebidos += self._inserir(local, tabela, linhas[tabela])
+                    continue
+                for chave, linha in linhas[tabela].items():
+                    if linha is None:
+                        local.execute(f"DELETE FROM {tabela} WHERE {campo} = ?", (chave,))
+                    else:
+                        self._inserir(local, tabela, [linha])
+                    recebidos += 1
+            local.execute("DELETE FROM categorias WHERE id NOT IN (SELECT value FROM json_each(?))",
+                          (json.dumps([c["id"] for c in categorias]),))
+            if completa:
+                local.execute("DELETE FROM resumo_clientes")
+            else:
+                local.executemany("DELETE FROM resumo_clientes WHERE cpf = ?", [(cpf,) for cpf in cpfs_resumo])
+            self._inserir(local, "resumo_clientes", resumos)
+            for tabela, registros in em_andamento.items():
+                local.execute(f"DELETE FROM {tabela}")
+                self._inserir(local, tabela, registros)
+                local.execute("DELETE FROM sqlite_sequence WHERE name = ?", (tabela,))
+                local.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (tabela, ID_PROVISORIO))
+            if regras is not None:
+                for tabela, registros in regras.items():
+                    local.execute(f"DELETE FROM {tabela}")
+                    self._inserir(local, tabela, registros)
+                local.execute("INSERT OR REPLACE INTO estado_terminal (chave, valor) VALUES (?, ?)",
+                              (precificacao.CHAVE_VERSAO_REGRAS, str(versao_regras)))
+
+            # Reaplica por cima do estado da central o que ainda não foi enviado
+            for op in local.execute("SELECT * FROM operacoes_pendentes WHERE status = 'Pendente' ORDER BY id").fetchall():
+                args, kwargs = json.loads(op["argumentos"])
+                with _usando(local):
+                    getattr(db, op["operacao"])(*args, **kwargs)
+
+            with _usando(local):
+                sucesso, msgs = db.reconciliar_contadores()
+            if not sucesso:
+                raise sqlite3.OperationalError(msgs[0])
+            local.execute("INSERT OR REPLACE INTO estado_terminal (chave, valor) VALUES ('ultimo_seq', ?)", (seq_central,))
+            local.execute("COMMIT")
+        finally:
+            if local.in_transaction:
+                local.execute("ROLLBACK")
+
+        # Registra a posição deste balcão para compactar_eventos() não apagar o que ele ainda não leu
+        with _usando(central):
+            db.confirmar_eventos(self.nome, seq_central)
+        return recebidos
+
+    @staticmethod
+    def _inserir(conn, tabela, linhas):
+        for linha in linhas:
+            colunas = ", ".join(linha)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {tabela} ({colunas}) VALUES ({', '.join('?' * len(linha))})",
+                tuple(linha.values())
+            )
+        return len(linhas)
+
+    @staticmethod
+    def _estado(conn, chave, padrao=None):
+        linha = conn.execute("SELECT valor FROM estado_terminal WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else padrao
+
+    # -------------------------------------------------------------------------
+    # Fila de operações
+    # -------------------------------------------------------------------------
+
+    def listar_operacoes(self, status=None, limite=200):
+        """Operações da fila, das mais recentes para as mais antigas."""
+        query = "SELECT * FROM operacoes_pendentes"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limite))
+        conn = self._conectar_local()
+        try:
+            operacoes = []
+            for linha in conn.execute(query, params):
+                op = dict(linha)
+                op["mensagens"] = json.loads(op["mensagens"]) if op["mensagens"] else []
+                operacoes.append(op)
+            return operacoes
+        finally:
+            conn.close()
+
+    def contar_operacoes(self):
+        """Quantidade de operações por status ({'Pendente': 3, 'Conflito': 1, ...})."""
+        conn = self._conectar_local()
+        try:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM operacoes_pendentes GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+    def dispensar_conflito(self, operacao_id):
+        """Marca um conflito como visto pelo atendente ('Dispensada')."""
+        conn = self._conectar_local()
+        try:
+            conn.execute(
+                "UPDATE operacoes_pendentes SET status = 'Dispensada' WHERE id = ? AND status = 'Conflito'",
+                (operacao_id,)
+            )
+            return (True, ["Conflito dispensado."])
+        finally:
+            conn.close()
+
+    # -------------------------------------------------------------------------
+    # Sincronização periódica
+    # -------------------------------------------------------------------------
+
+    def iniciar(self, intervalo=INTERVALO_SINCRONIZACAO):
+        """Sincroniza numa thread própria a cada `intervalo` segundos e logo após cada operação."""
+        if self._thread is None:
+            self.intervalo = intervalo
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name="sincronizacao-terminal", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        if self._thread is not None:
+            self._parar.set()
+            self._acordar.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _laco(self):
+        while not self._parar.is_set():
+            self.sincronizar()
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python terminal.py <banco_central> [banco_local]")
+        sys.exit(1)
+    terminal = TerminalOffline(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_REPLICA_PADRAO).preparar()
+    sucesso, msgs = terminal.sincronizar()
+    print("\n".join(msgs))
+    sys.exit(0 if sucesso else 1)
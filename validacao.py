@@ -0,0 +1,155 @@
+import re
+from datetime import datetime
+from operator import mul
+
+# =============================================================================
+# VALIDAÇÃO DE CAMPOS E REGISTROS
+# =============================================================================
+# Os padrões e tabelas são montados uma única vez, na importação do módulo.
+# Cada validador de campo retorna a mensagem de erro ou None; os validadores
+# de registro retornam a lista de mensagens (vazia quando o registro é válido),
+# na mesma ordem usada pelas funções de database.py.
+
+PADRAO_PLACA = re.compile(r'[A-Z]{3}(?:\d[A-Z]\d{2}|-\d{4})')  # Mercosul (ABC1D23) ou antigo (ABC-1234)
+_NAO_DIGITOS = re.compile(r'\D')
+
+# Pesos dos dígitos verificadores do CPF e o dígito resultante para cada resto de 11.
+_PESOS_D1 = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_D2 = (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)
+_DIGITO_POR_RESTO = tuple((resto * 10) % 11 % 10 for resto in range(11))
+_VALOR_DIGITO = {str(d): d for d in range(10)}
+
+MSG_CPF_INVALIDO = "CPF inválido. Verifique o número digitado."
+
+def limpar_cpf(cpf):
+    """Remove tudo o que não for dígito do CPF."""
+    numeros = _NAO_DIGITOS.sub('', str(cpf))
+    # \D mantém dígitos de outras escritas ('٥'), que passam a 0-9 como o int() faria
+    return numeros if numeros.isascii() else ''.join(str(int(c)) for c in numeros)
+
+def validar_placa(placa):
+    """Valida placas no formato antigo (ABC-1234) e Mercosul (ABC1D23)."""
+    if not isinstance(placa, str) or not placa.strip():
+        return "O campo 'Placa' é obrigatório."
+    if PADRAO_PLACA.fullmatch(placa.upper().strip()):
+        return None
+    return "Formato de placa inválido. Use 'ABC1D23' ou 'ABC-1234'."
+
+def validar_ano(ano, ano_atual=None):
+    if not ano: return "O campo 'Ano' é obrigatório."
+    try:
+        ano_int = int(ano)
+    except (ValueError, TypeError):
+        return "O ano deve ser um número inteiro válido."
+    if ano_atual is None:
+        ano_atual = datetime.now().year
+    if not (1950 <= ano_int <= ano_atual + 1):
+        return f"Ano inválido. Deve ser entre 1950 e {ano_atual + 1}."
+    return None
+
+def validar_valor(valor):
+    if not valor: return "O campo 'Valor' é obrigatório."
+    try:
+        valor_float = float(str(valor).replace(",", "."))
+    except (ValueError, TypeError):
+        return "O valor deve ser um número válido."
+    if valor_float < 0:
+        return "O valor não pode ser negativo."
+    return None
+
+def validar_cpf(cpf):
+    if not cpf: return "O campo 'CPF' é obrigatório."
+    cpf_numerico = limpar_cpf(cpf)
+    if len(cpf_numerico) != 11 or cpf_numerico == cpf_numerico[0] * 11:
+        return MSG_CPF_INVALIDO
+
+    digitos = [_VALOR_DIGITO[c] for c in cpf_numerico]
+    if _DIGITO_POR_RESTO[sum(map(mul, digitos, _PESOS_D1)) % 11] != digitos[9]:
+        return MSG_CPF_INVALIDO
+    if _DIGITO_POR_RESTO[sum(map(mul, digitos, _PESOS_D2)) % 11] != digitos[10]:
+        return MSG_CPF_INVALIDO
+    return None
+
+def _obrigatorio(valor, campo):
+    return f"O campo '{campo}' é obrigatório." if not valor.strip() else None
+
+def validar_veiculo(placa, marca, modelo, ano, cor, valor_diaria, com_placa=True, ano_atual=None):
+    """Erros de um veículo. Com com_placa=False a placa não é validada (atualização)."""
+    erros = []
+    for erro in (
+        validar_placa(placa) if com_placa else None,
+        _obrigatorio(marca, 'Marca'),
+        _obrigatorio(modelo, 'Modelo'),
+        validar_ano(ano, ano_atual),
+        _obrigatorio(cor, 'Cor'),
+        validar_valor(valor_diaria),
+    ):
+        if erro:
+            erros.append(erro)
+    return erros
+
+def validar_cliente(cpf, nome, telefone=None, email=None):
+    """Erros de um cliente (telefone e e-mail são opcionais)."""
+    erros = []
+    erro_cpf = validar_cpf(cpf)
+    if erro_cpf:
+        erros.append(erro_cpf)
+    if not nome.strip():
+        erros.append("O campo 'Nome' é obrigatório.")
+    return erros
+
+# =============================================================================
+# VALIDAÇÃO EM LOTE
+# =============================================================================
+
+CAMPOS_VEICULO = ("placa", "marca", "modelo", "ano", "cor", "valor_diaria")
+CAMPOS_CLIENTE = ("cpf", "nome", "telefone", "email")
+
+def _como_tupla(registro, campos):
+    if isinstance(registro, dict):
+        return tuple(registro.get(campo, '') for campo in campos)
+    return tuple(registro)
+
+def validar_lote_veiculos(registros):
+    """Valida vários veículos de uma vez; retorna uma lista de erros por registro.
+
+    Cada registro pode ser um dicionário com CAMPOS_VEICULO ou uma tupla na
+    mesma ordem. Placas repetidas dentro do lote também são apontadas.
+    """
+    ano_atual = datetime.now().year
+    vistas = set()
+    resultado = []
+    for registro in registros:
+        dados = _como_tupla(registro, CAMPOS_VEICULO)
+        erros = validar_veiculo(*dados, ano_atual=ano_atual)
+        if not erros:
+            placa = dados[0].upper().strip()
+            if placa in vistas:
+                erros.append(f"A placa '{placa}' aparece mais de uma vez no lote.")
+            vistas.add(placa)
+        resultado.append(erros)
+    return resultado
+
+def validar_lote_clientes(registros):
+    """Valida vários clientes de uma vez; retorna uma lista de erros por registro.
+
+    Cada registro pode ser um dicionário com CAMPOS_CLIENTE ou uma tupla na
+    mesma ordem. CPFs e e-mails repetidos dentro do lote também são apontados.
+    """
+    cpfs_vistos, emails_vistos = set(), set()
+    resultado = []
+    for registro in registros:
+        dados = _como_tupla(registro, CAMPOS_CLIENTE)
+        erros = validar_cliente(*dados)
+        if not erros:
+            cpf = limpar_cpf(dados[0])
+            email = (dados[3] or '').strip().lower() if len(dados) > 3 else ''
+            if cpf in cpfs_vistos:
+                erros.append(f"O CPF '{cpf}' aparece mais de uma vez no lote.")
+            if email and email in emails_vistos:
+                erros.append(f"O e-mail '{email}' aparece mais de uma vez no lote.")
+            cpfs_vistos.add(cpf)
+            if email:
+                emails_vistos.add(email)
+        resultado.append(erros)
+    return resultado